@@ -0,0 +1,200 @@
+import logging
+import math
+from bisect import bisect_left
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+
+from .gazetteer import normalize_text
+
+logger = logging.getLogger(__name__)
+
+_MAX_CHAR = "\uffff"
+
+class AutocompleteIndex:
+    """In-process typeahead index over approved vendors.
+
+    Suggestions are business names, categories, style tags and locations.
+    Every word position of a suggestion's normalized text is stored as a key
+    in one sorted array, so a prefix lookup is two bisections and
+    "barn" completes "Rustic Barn Photography". A parallel numpy array holds
+    each key's suggestion weight, so even a one-letter prefix matching most
+    of the catalog is reduced to its top-k with a single ``argpartition``.
+    Business names are weighted by rating and review count; categories, tags
+    and locations by how many vendors carry them.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self._reset()
+
+    def _reset(self):
+        self._keys: List[Tuple[str, str, str]] = []
+        self._weights = np.zeros(0, dtype=np.float64)
+        self._entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._vendor_entries: Dict[str, List[Tuple[Tuple[str, str], float]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _suffixes(text: str) -> List[str]:
+        words = text.split()
+        return [" ".join(words[i:]) for i in range(len(words))]
+
+    @staticmethod
+    def _vendor_weight(profile: Dict[str, Any]) -> float:
+        return 1.0 + (profile.get("average_rating") or 0.0) + math.log1p(profile.get("total_reviews") or 0)
+
+    def _profile_suggestions(self, profile: Dict[str, Any]) -> List[Tuple[Tuple[str, str], str, float]]:
+        """(entry key, label, weight) for everything a vendor contributes"""
+        suggestions = []
+        if profile.get("business_name"):
+            suggestions.append((("vendor", profile["id"]), profile["business_name"], self._vendor_weight(profile)))
+
+        category = profile.get("category")
+        category = getattr(category, "value", category)
+        if category:
+            suggestions.append((("category", normalize_text(category)), category, 1.0))
+
+        labels = [("style_tag", tag) for tag in profile.get("style_tags", [])]
+        labels += [("location", area) for area in [profile.get("location")] + list(profile.get("service_areas", []))]
+        seen = set()
+        for kind, label in labels:
+            value = normalize_text(label)
+            if value and (kind, value) not in seen:
+                seen.add((kind, value))
+                suggestions.append(((kind, value), label.strip(), 1.0))
+        return suggestions
+
+    def load(self, profiles: List[Dict[str, Any]]):
+        """Replace the index contents with a full snapshot of vendor profiles"""
+        self._reset()
+        for profile in profiles:
+            self._add(profile)
+        self._keys = sorted(
+            (suffix, kind, value)
+            for (kind, value), entry in self._entries.items()
+            for suffix in self._suffixes(entry["text"])
+        )
+        self._weights = np.array(
+            [self._entries[(kind, value)]["weight"] for _, kind, value in self._keys], dtype=np.float64
+        )
+        self.ready = True
+
+    def _add(self, profile: Dict[str, Any]) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+        """Register a vendor's suggestions; returns (new entries, reweighted existing entries)"""
+        if profile.get("status") != "approved":
+            return [], []
+
+        created, changed = [], []
+        contributed = []
+        for entry_key, label, weight in self._profile_suggestions(profile):
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                entry = {"label": label, "text": normalize_text(label), "weight": 0.0, "count": 0}
+                self._entries[entry_key] = entry
+                created.append(entry_key)
+            else:
+                changed.append(entry_key)
+            entry["weight"] += weight
+            entry["count"] += 1
+            contributed.append((entry_key, weight))
+        self._vendor_entries[profile["id"]] = contributed
+        return created, changed
+
+    def _key_positions(self, entry_key: Tuple[str, str], text: str) -> List[int]:
+        kind, value = entry_key
+        positions = []
+        for suffix in self._suffixes(text):
+            key = (suffix, kind, value)
+            position = bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                positions.append(position)
+        return positions
+
+    def _set_weight(self, entry_key: Tuple[str, str]):
+        entry = self._entries[entry_key]
+        for position in self._key_positions(entry_key, entry["text"]):
+            self._weights[position] = entry["weight"]
+
+    def upsert(self, profile: Dict[str, Any]):
+        """Add or replace a vendor's suggestions"""
+        self.remove(profile["id"])
+        created, changed = self._add(profile)
+        for entry_key in changed:
+            self._set_weight(entry_key)
+        for entry_key in created:
+            kind, value = entry_key
+            entry = self._entries[entry_key]
+            for suffix in self._suffixes(entry["text"]):
+                key = (suffix, kind, value)
+                position = bisect_left(self._keys, key)
+                self._keys.insert(position, key)
+                self._weights = np.insert(self._weights, position, entry["weight"])
+
+    def remove(self, vendor_id: str):
+        """Drop a vendor's suggestions if present"""
+        contributed = self._vendor_entries.pop(vendor_id, None)
+        if contributed is None:
+            return
+
+        for entry_key, weight in contributed:
+            entry = self._entries[entry_key]
+            entry["weight"] -= weight
+            entry["count"] -= 1
+            if entry["count"] > 0:
+                self._set_weight(entry_key)
+                continue
+
+            del self._entries[entry_key]
+            positions = self._key_positions(entry_key, entry["text"])
+            for position in sorted(positions, reverse=True):
+                self._keys.pop(position)
+            self._weights = np.delete(self._weights, positions)
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[Dict[str, Any]]:
+        """Top suggestions by weight whose text has a word starting with ``prefix``"""
+        text = normalize_text(prefix)
+        if not text or limit <= 0:
+            return []
+
+        start = bisect_left(self._keys, (text,))
+        end = bisect_left(self._keys, (text + _MAX_CHAR,))
+        weights = self._weights[start:end]
+
+        # One suggestion can own several matching keys (one per word), so
+        # over-select and widen until there are enough distinct suggestions
+        top: List[Tuple[str, str]] = []
+        candidates = limit * 4
+        while True:
+            if candidates < len(weights):
+                positions = np.argpartition(-weights, candidates)[:candidates]
+            else:
+                positions = np.arange(len(weights))
+            positions = positions[np.argsort(-weights[positions], kind="stable")]
+
+            top = []
+            for position in positions.tolist():
+                _, kind, value = self._keys[start + position]
+                if (kind, value) not in top:
+                    top.append((kind, value))
+                    if len(top) == limit:
+                        break
+            if len(top) == limit or candidates >= len(weights):
+                break
+            candidates *= 4
+
+        suggestions = []
+        for kind, value in top:
+            entry = self._entries[(kind, value)]
+            suggestion = {"type": kind, "label": entry["label"], "count": entry["count"]}
+            if kind == "vendor":
+                suggestion["vendor_id"] = value
+            else:
+                suggestion["value"] = value
+            suggestions.append(suggestion)
+        return suggestions
+
+# Process-wide autocomplete index, populated at startup alongside the catalog index
+autocomplete_index = AutocompleteIndex()
@@ -0,0 +1,110 @@
+import logging
+from datetime import date, datetime
+from typing import List, Dict, Any, Iterable, Optional, Set
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Rolling window of days covered, starting today
+HORIZON_DAYS = 731
+_WORDS = (HORIZON_DAYS + 63) // 64
+
+def as_day(value: Any) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+class AvailabilityIndex:
+    """Per-vendor availability bitmaps over a rolling two-year horizon.
+
+    Bit ``d`` of a vendor's row is set when day ``start + d`` falls in an
+    availability interval that is available and not booked. A query is a
+    bitmap of the requested days, so "free on all of these dates" is
+    ``row & mask == mask`` and "free on any of them" is ``row & mask != 0``,
+    each evaluated across the whole catalog as one numpy operation over the
+    ``uint64`` words holding the requested days (12 words per vendor).
+    """
+
+    def __init__(self):
+        self.ready = False
+        self._reset(date.today())
+
+    def _reset(self, start: date, rows: int = 0):
+        self.start = start
+        self._ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._free_rows: List[int] = []
+        self._bits = np.zeros((max(rows, 16), _WORDS), dtype=np.uint64)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def day_offset(self, day: Any) -> Optional[int]:
+        """Bit position of a day, or None outside the horizon"""
+        offset = (as_day(day) - self.start).days
+        return offset if 0 <= offset < HORIZON_DAYS else None
+
+    def covers(self, days: Iterable[Any]) -> bool:
+        return all(self.day_offset(day) is not None for day in days)
+
+    def _mask(self, days: Iterable[Any]) -> np.ndarray:
+        offsets = np.array(
+            [offset for offset in map(self.day_offset, days) if offset is not None], dtype=np.int64
+        )
+        mask = np.zeros(_WORDS, dtype=np.uint64)
+        np.bitwise_or.at(mask, offsets // 64, np.left_shift(np.uint64(1), (offsets % 64).astype(np.uint64)))
+        return mask
+
+    def _row(self, vendor_id: str) -> int:
+        row = self._rows.get(vendor_id)
+        if row is not None:
+            return row
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self._ids[row] = vendor_id
+        else:
+            row = len(self._ids)
+            if row == self._bits.shape[0]:
+                self._bits = np.pad(self._bits, ((0, row), (0, 0)))
+            self._ids.append(vendor_id)
+        self._rows[vendor_id] = row
+        return row
+
+    def load(self, vendor_days: Dict[str, Iterable[Any]], start: Optional[date] = None):
+        """Replace the index with every vendor's available days"""
+        self._reset(start or date.today(), len(vendor_days))
+        for vendor_id, days in vendor_days.items():
+            self.set_days(vendor_id, days)
+        self.ready = True
+
+    def set_days(self, vendor_id: str, days: Iterable[Any]):
+        """Replace one vendor's available days"""
+        days = list(days)
+        if not days:
+            self.remove(vendor_id)
+            return
+        self._bits[self._row(vendor_id)] = self._mask(days)
+
+    def remove(self, vendor_id: str):
+        """Drop a vendor's bitmap if present"""
+        row = self._rows.pop(vendor_id, None)
+        if row is None:
+            return
+        self._bits[row] = 0
+        self._ids[row] = None
+        self._free_rows.append(row)
+
+    def match(self, days: Iterable[Any], match_all: bool = True) -> Set[str]:
+        """Vendors free on all (or any) of ``days``; every day must be inside the horizon"""
+        mask = self._mask(days)
+        # Only the words holding a requested day matter
+        words = np.flatnonzero(mask)
+        mask = mask[words]
+        overlap = self._bits[:len(self._ids), words] & mask
+        if match_all:
+            matched = np.all(overlap == mask, axis=1)
+        else:
+            matched = np.any(overlap != 0, axis=1)
+        return {self._ids[row] for row in np.flatnonzero(matched).tolist() if self._ids[row] is not None}
+
+# Process-wide availability index, populated at startup alongside the catalog index
+availability_index = AvailabilityIndex()
@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import DeleteOne, InsertOne
+from pymongo.errors import DuplicateKeyError
+
+from .availability_index import as_day
+from .models import VendorAvailability, VendorAvailabilityInterval
+
+logger = logging.getLogger(__name__)
+
+# Settings of one calendar day: (is_available, is_booked, pricing_tier, notes)
+DayState = Tuple[bool, bool, str, Optional[str]]
+
+_ONE_DAY = timedelta(days=1)
+
+# A calendar write holds its vendor's lease for at most this long; a crashed
+# writer's lease expires after it
+WRITE_LEASE_SECONDS = 30
+# Attempts (with a growing pause) to take a lease held by another writer
+WRITE_LEASE_ATTEMPTS = 20
+
+def day_start(day: Any) -> datetime:
+    return datetime.combine(as_day(day), datetime.min.time())
+
+def day_state(record: Dict[str, Any]) -> DayState:
+    """Settings of a per-day record or an interval"""
+    return (
+        record.get("is_available", True),
+        record.get("is_booked", False),
+        record.get("pricing_tier", "standard"),
+        record.get("notes")
+    )
+
+def merge_days(days: Dict[date, DayState]) -> List[Tuple[date, date, DayState]]:
+    """Collapse per-day settings into (first, last, state) runs of consecutive equal days"""
+    runs = []
+    for day in sorted(days):
+        state = days[day]
+        if runs and runs[-1][2] == state and runs[-1][1] + _ONE_DAY == day:
+            runs[-1] = (runs[-1][0], day, state)
+        else:
+            runs.append((day, day, state))
+    return runs
+
+def _interval_days(interval: Dict[str, Any], first: date, last: date) -> Iterator[date]:
+    day = max(as_day(interval["start_date"]), first)
+    end = min(as_day(interval["end_date"]), last)
+    while day <= end:
+        yield day
+        day += _ONE_DAY
+
+def expand_intervals(intervals: Iterable[Dict[str, Any]], first: Any, last: Any) -> Iterator[VendorAvailability]:
+    """Per-day calendar entries of intervals clipped to [first, last], generated on demand"""
+    first, last = as_day(first), as_day(last)
+    for interval in sorted(intervals, key=lambda i: i["start_date"]):
+        for day in _interval_days(interval, first, last):
+            yield VendorAvailability(
+                id=f"{interval['id']}:{day.isoformat()}",
+                vendor_id=interval["vendor_id"],
+                date=day_start(day),
+                is_available=interval.get("is_available", True),
+                is_booked=interval.get("is_booked", False),
+                pricing_tier=interval.get("pricing_tier", "standard"),
+                notes=interval.get("notes")
+            )
+
+async def _acquire_write_lease(db: AsyncIOMotorDatabase, vendor_id: str) -> str:
+    """Take the vendor's calendar write lease, waiting for another writer to finish"""
+    token = uuid.uuid4().hex
+    for attempt in range(WRITE_LEASE_ATTEMPTS):
+        now = datetime.utcnow()
+        try:
+            # Matches a free or expired lease; otherwise the upsert hits the
+            # unique vendor_id index and the lease is still held
+            await db.vendor_availability_leases.update_one(
+                {"vendor_id": vendor_id, "$or": [{"expires_at": None}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"token": token, "expires_at": now + timedelta(seconds=WRITE_LEASE_SECONDS)}},
+                upsert=True
+            )
+            return token
+        except DuplicateKeyError:
+            await asyncio.sleep(0.05 * (attempt + 1))
+    raise RuntimeError(f"Availability calendar of vendor {vendor_id} is locked by another write")
+
+async def _release_write_lease(db: AsyncIOMotorDatabase, vendor_id: str, token: str):
+    result = await db.vendor_availability_leases.update_one(
+        {"vendor_id": vendor_id, "token": token},
+        {"$set": {"token": None, "expires_at": None}}
+    )
+    if result.modified_count == 0:
+        logger.warning(f"Availability write lease of vendor {vendor_id} expired before the write finished")
+
+async def write_availability(
+    db: AsyncIOMotorDatabase,
+    vendor_id: str,
+    updates: Dict[date, DayState],
+    overwrite: bool = True
+) -> int:
+    """Apply per-day settings to a vendor's intervals as one bulk_write diff.
+
+    Only intervals touching the updated span (or adjacent to it, so runs can
+    merge) are read and rewritten. Returns the number of write operations.
+    With ``overwrite`` False, days already covered by an interval are kept.
+
+    The read and the diff are computed under a per-vendor write lease, so
+    concurrent writes to one calendar apply one after the other instead of
+    both diffing against the same intervals and losing one update. Raises
+    RuntimeError if the lease can't be taken.
+    """
+    if not updates:
+        return 0
+
+    token = await _acquire_write_lease(db, vendor_id)
+    try:
+        return await _write_intervals(db, vendor_id, updates, overwrite)
+    finally:
+        await _release_write_lease(db, vendor_id, token)
+
+async def _write_intervals(
+    db: AsyncIOMotorDatabase,
+    vendor_id: str,
+    updates: Dict[date, DayState],
+    overwrite: bool
+) -> int:
+    first, last = min(updates), max(updates)
+    existing = await db.vendor_availability_intervals.find({
+        "vendor_id": vendor_id,
+        "start_date": {"$lte": day_start(last + _ONE_DAY)},
+        "end_date": {"$gte": day_start(first - _ONE_DAY)}
+    }).to_list(length=None)
+
+    days: Dict[date, DayState] = {}
+    for interval in existing:
+        state = day_state(interval)
+        for day in _interval_days(interval, date.min, date.max):
+            days[day] = state
+    for day, state in updates.items():
+        if overwrite or day not in days:
+            days[day] = state
+
+    runs = set(merge_days(days))
+    current = {
+        (as_day(interval["start_date"]), as_day(interval["end_date"]), day_state(interval)): interval
+        for interval in existing
+    }
+
+    # Deletes run first so a replacement can reuse its predecessor's start date
+    operations = [DeleteOne({"_id": interval["_id"]}) for run, interval in current.items() if run not in runs]
+    for start, end, state in sorted(runs - set(current)):
+        is_available, is_booked, pricing_tier, notes = state
+        operations.append(InsertOne(VendorAvailabilityInterval(
+            vendor_id=vendor_id,
+            start_date=day_start(start),
+            end_date=day_start(end),
+            is_available=is_available,
+            is_booked=is_booked,
+            pricing_tier=pricing_tier,
+            notes=notes
+        ).dict()))
+
+    if operations:
+        await db.vendor_availability_intervals.bulk_write(operations, ordered=True)
+    return len(operations)
+
+def _bookable_query(first: date, last: date) -> Dict[str, Any]:
+    return {
+        "is_available": True,
+        "is_booked": False,
+        "start_date": {"$lte": day_start(last)},
+        "end_date": {"$gte": day_start(first)}
+    }
+
+async def bookable_days(
+    db: AsyncIOMotorDatabase,
+    first: date,
+    last: date,
+    vendor_id: Optional[str] = None
+) -> Dict[str, List[date]]:
+    """Available, unbooked days in [first, last] per vendor"""
+    query = _bookable_query(first, last)
+    if vendor_id:
+        query["vendor_id"] = vendor_id
+
+    vendor_days = defaultdict(list)
+    async for interval in db.vendor_availability_intervals.find(
+        query, {"_id": 0, "vendor_id": 1, "start_date": 1, "end_date": 1}
+    ):
+        vendor_days[interval["vendor_id"]].extend(_interval_days(interval, first, last))
+    return vendor_days
+
+async def available_vendors(db: AsyncIOMotorDatabase, days: List[date], match_all: bool = True) -> List[str]:
+    """Vendors free on all (or any) of ``days``, from the stored intervals"""
+    query = _bookable_query(min(days), max(days))
+    query["$or"] = [
+        {"start_date": {"$lte": day_start(day)}, "end_date": {"$gte": day_start(day)}}
+        for day in days
+    ]
+
+    covered = defaultdict(set)
+    async for interval in db.vendor_availability_intervals.find(
+        query, {"_id": 0, "vendor_id": 1, "start_date": 1, "end_date": 1}
+    ):
+        start, end = as_day(interval["start_date"]), as_day(interval["end_date"])
+        covered[interval["vendor_id"]].update(day for day in days if start <= day <= end)
+
+    required = len(set(days)) if match_all else 1
+    return [vendor_id for vendor_id, hits in covered.items() if len(hits) >= required]
+
+async def migrate_daily_records(db: AsyncIOMotorDatabase) -> int:
+    """Fold legacy one-document-per-day ``vendor_availability`` records into intervals.
+
+    A vendor's legacy records are deleted only once the stored intervals are
+    read back and cover every migrated day; otherwise they are kept and the
+    vendor is retried on the next run.
+    """
+    migrated = 0
+    try:
+        vendor_ids = await db.vendor_availability.distinct("vendor_id")
+    except Exception as e:
+        logger.error(f"Availability record migration failed: {str(e)}")
+        return migrated
+
+    for vendor_id in vendor_ids:
+        try:
+            records = await db.vendor_availability.find({"vendor_id": vendor_id}).to_list(length=None)
+            updates = {as_day(record["date"]): day_state(record) for record in records}
+            if not updates:
+                continue
+            # Intervals written since the upgrade are newer than any legacy record
+            await write_availability(db, vendor_id, updates, overwrite=False)
+
+            first, last = min(updates), max(updates)
+            intervals = await db.vendor_availability_intervals.find({
+                "vendor_id": vendor_id,
+                "start_date": {"$lte": day_start(last)},
+                "end_date": {"$gte": day_start(first)}
+            }).to_list(length=None)
+            covered = {day for interval in intervals for day in _interval_days(interval, first, last)}
+            missing = updates.keys() - covered
+            if missing:
+                logger.warning(
+                    f"Kept {len(records)} legacy availability records of vendor {vendor_id}: "
+                    f"{len(missing)} days are not covered by intervals yet"
+                )
+                continue
+
+            await db.vendor_availability.delete_many({"_id": {"$in": [record["_id"] for record in records]}})
+            migrated += len(records)
+        except Exception as e:
+            logger.error(f"Availability record migration failed for vendor {vendor_id}: {str(e)}")
+    return migrated
@@ -0,0 +1,25 @@
+from typing import Any, Dict, Iterable, Optional
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+async def load_by_ids(
+    collection: AsyncIOMotorCollection,
+    ids: Iterable[Optional[str]],
+    projection: Optional[Dict[str, Any]] = None,
+    key: str = "id"
+) -> Dict[str, Dict[str, Any]]:
+    """Resolve the documents referenced by a page of results in one ``$in`` query.
+
+    Ids are de-duplicated and ``None`` is skipped, so callers can pass the
+    reference field of every item on the page. Returns documents keyed by
+    ``key``; ids with no document are simply absent.
+    """
+    wanted = {value for value in ids if value is not None}
+    if not wanted:
+        return {}
+    # Inclusion projections must still return the key the results are indexed by
+    if projection is not None and any(projection.values()):
+        projection = {**projection, key: 1}
+    return {
+        document[key]: document
+        async for document in collection.find({key: {"$in": list(wanted)}}, projection)
+    }
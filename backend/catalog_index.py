@@ -0,0 +1,368 @@
+import heapq
+import logging
+import math
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+import numpy as np
+
+from .search_facets import count_facets
+
+logger = logging.getLogger(__name__)
+
+_INF = float("inf")
+_MAX_ID = "\uffff"
+
+# Mean earth radius, shared with the $centerSphere query so both radius paths agree
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180
+
+def haversine_km(latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Great-circle distance in km from one point to arrays of points"""
+    lat1 = math.radians(latitude)
+    lat2 = np.radians(latitudes)
+    dlat = lat2 - lat1
+    dlon = np.radians(longitudes) - math.radians(longitude)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+class VendorCatalogIndex:
+    """In-process index of vendor profiles for filtered, sorted search.
+
+    Equality filters resolve through inverted posting lists (field value ->
+    set of vendor ids) and range filters through presorted key arrays, so the
+    common search filter combinations are answered without querying
+    ``vendor_profiles``. Geocoded vendors are also bucketed into a fixed
+    lat/lng grid so radius searches only measure distances to vendors in the
+    cells the search circle overlaps. The index is kept fresh by ``upsert``/``remove`` calls
+    on every profile write and a periodic full reload.
+    """
+
+    # Fields with an inverted posting list; list-valued fields post every element
+    POSTING_FIELDS = ("status", "category", "style_tags", "service_areas", "location_tokens", "verified", "featured")
+
+    # Presorted arrays, each entry is a tuple ending with the vendor id
+    SORT_ORDERS = ("rating", "reviews", "price", "created")
+
+    # Grid cell size for the geo index (~55km of latitude)
+    GEO_CELL_DEGREES = 0.5
+
+    def __init__(self):
+        self.ready = False
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._postings: Dict[str, Dict[Any, Set[str]]] = {
+            field: defaultdict(set) for field in self.POSTING_FIELDS
+        }
+        self._sorted: Dict[str, List[Tuple]] = {order: [] for order in self.SORT_ORDERS}
+        self._sort_keys: Dict[str, Dict[str, Tuple]] = {}
+        self._geo: Dict[str, Tuple[float, float]] = {}
+        self._geo_cells: Dict[Tuple[int, int], Set[str]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    @staticmethod
+    def _posting_values(doc: Dict[str, Any], field: str) -> List[Any]:
+        value = doc.get(field)
+        if value is None:
+            return []
+        if isinstance(value, (list, tuple, set)):
+            return list(value)
+        return [value]
+
+    @staticmethod
+    def _make_sort_keys(doc: Dict[str, Any]) -> Dict[str, Tuple]:
+        vendor_id = doc["id"]
+        created_at = doc.get("created_at")
+        created_ts = created_at.timestamp() if isinstance(created_at, datetime) else 0.0
+        rating = doc.get("average_rating") or 0.0
+        reviews = doc.get("total_reviews") or 0
+        price = doc.get("pricing_from")
+
+        return {
+            # Matches the enhanced search order: rating, reviews, newest first
+            "rating": (-rating, -reviews, -created_ts, vendor_id),
+            "reviews": (-reviews, vendor_id),
+            "price": (_INF if price is None else price, vendor_id),
+            "created": (created_ts, vendor_id)
+        }
+
+    @staticmethod
+    def _geo_coordinates(doc: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+        """(latitude, longitude) from a profile's GeoJSON point, if geocoded"""
+        geo = doc.get("geo")
+        if not geo or not geo.get("coordinates"):
+            return None
+        longitude, latitude = geo["coordinates"]
+        return latitude, longitude
+
+    def _geo_cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return (
+            math.floor(latitude / self.GEO_CELL_DEGREES),
+            math.floor(longitude / self.GEO_CELL_DEGREES)
+        )
+
+    def _add_geo(self, vendor_id: str, doc: Dict[str, Any]):
+        coordinates = self._geo_coordinates(doc)
+        if coordinates is not None:
+            self._geo[vendor_id] = coordinates
+            self._geo_cells[self._geo_cell(*coordinates)].add(vendor_id)
+
+    @classmethod
+    def sort_key(cls, doc: Dict[str, Any], sort: str) -> Tuple:
+        """Position of a (possibly partial) profile in one of the presorted orders"""
+        return cls._make_sort_keys(doc)[sort]
+
+    def load(self, docs: List[Dict[str, Any]]):
+        """Replace the index contents with a full snapshot of vendor profiles"""
+        self._docs = {}
+        self._postings = {field: defaultdict(set) for field in self.POSTING_FIELDS}
+        self._sort_keys = {}
+        self._geo = {}
+        self._geo_cells = defaultdict(set)
+        sorted_entries = {order: [] for order in self.SORT_ORDERS}
+
+        for doc in docs:
+            vendor_id = doc["id"]
+            self._docs[vendor_id] = doc
+            for field in self.POSTING_FIELDS:
+                for value in self._posting_values(doc, field):
+                    self._postings[field][value].add(vendor_id)
+            self._add_geo(vendor_id, doc)
+            keys = self._make_sort_keys(doc)
+            self._sort_keys[vendor_id] = keys
+            for order, key in keys.items():
+                sorted_entries[order].append(key)
+
+        for entries in sorted_entries.values():
+            entries.sort()
+        self._sorted = sorted_entries
+        self.ready = True
+
+    def upsert(self, doc: Dict[str, Any]):
+        """Add or replace a single vendor profile"""
+        self.remove(doc["id"])
+
+        vendor_id = doc["id"]
+        self._docs[vendor_id] = doc
+        for field in self.POSTING_FIELDS:
+            for value in self._posting_values(doc, field):
+                self._postings[field][value].add(vendor_id)
+        self._add_geo(vendor_id, doc)
+        keys = self._make_sort_keys(doc)
+        self._sort_keys[vendor_id] = keys
+        for order, key in keys.items():
+            insort(self._sorted[order], key)
+
+    def remove(self, vendor_id: str):
+        """Drop a vendor profile from the index if present"""
+        doc = self._docs.pop(vendor_id, None)
+        if doc is None:
+            return
+
+        for field in self.POSTING_FIELDS:
+            postings = self._postings[field]
+            for value in self._posting_values(doc, field):
+                ids = postings.get(value)
+                if ids is not None:
+                    ids.discard(vendor_id)
+                    if not ids:
+                        del postings[value]
+
+        coordinates = self._geo.pop(vendor_id, None)
+        if coordinates is not None:
+            cell = self._geo_cell(*coordinates)
+            self._geo_cells[cell].discard(vendor_id)
+            if not self._geo_cells[cell]:
+                del self._geo_cells[cell]
+
+        for order, key in self._sort_keys.pop(vendor_id).items():
+            entries = self._sorted[order]
+            position = bisect_left(entries, key)
+            if position < len(entries) and entries[position] == key:
+                entries.pop(position)
+
+    def _range_ids(self, field: str, minimum: Optional[float], maximum: Optional[float]) -> Set[str]:
+        """Resolve a numeric range filter from the presorted arrays"""
+        if field == "average_rating":
+            entries = self._sorted["rating"]
+            # Entries are ordered by descending rating (stored negated)
+            start = 0 if maximum is None else bisect_left(entries, (-maximum,))
+            end = len(entries) if minimum is None else bisect_right(entries, (-minimum, _INF))
+        elif field == "pricing_from":
+            entries = self._sorted["price"]
+            start = 0 if minimum is None else bisect_left(entries, (minimum,))
+            # Vendors without a price sort last as +inf and never match a range
+            if maximum is None:
+                end = bisect_left(entries, (_INF,))
+            else:
+                end = bisect_right(entries, (maximum, _MAX_ID))
+        else:
+            raise ValueError(f"No presorted array for {field}")
+
+        return {entry[-1] for entry in entries[start:end]}
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> Dict[str, float]:
+        """Vendor id -> distance in km for every geocoded vendor inside the radius"""
+        lat_cells = math.ceil(radius_km / KM_PER_DEGREE_LAT / self.GEO_CELL_DEGREES)
+        # Longitude degrees shrink towards the poles; widen the cell span to match
+        lng_km = KM_PER_DEGREE_LAT * max(math.cos(math.radians(latitude)), 0.01)
+        lng_cells = math.ceil(radius_km / lng_km / self.GEO_CELL_DEGREES)
+        center_lat, center_lng = self._geo_cell(latitude, longitude)
+
+        candidate_ids = []
+        for lat_cell in range(center_lat - lat_cells, center_lat + lat_cells + 1):
+            for lng_cell in range(center_lng - lng_cells, center_lng + lng_cells + 1):
+                candidate_ids.extend(self._geo_cells.get((lat_cell, lng_cell), ()))
+        if not candidate_ids:
+            return {}
+
+        coordinates = np.array([self._geo[vendor_id] for vendor_id in candidate_ids], dtype=float)
+        distances = haversine_km(latitude, longitude, coordinates[:, 0], coordinates[:, 1])
+        inside = np.nonzero(distances <= radius_km)[0]
+        return {candidate_ids[i]: float(distances[i]) for i in inside}
+
+    def _candidates(
+        self,
+        equals: Optional[Dict[str, Any]],
+        any_of: Optional[Dict[str, List[Any]]],
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]],
+        ids: Optional[Set[str]],
+        near: Optional[Tuple[float, float, float]],
+        scores: Optional[Dict[str, float]]
+    ) -> Tuple[Optional[Set[str]], Dict[str, float]]:
+        """Ids matching every filter (None when unfiltered) and distances for ``near``"""
+        candidate_sets = []
+
+        distances: Dict[str, float] = {}
+        if near is not None:
+            distances = self.within(*near)
+            candidate_sets.append(set(distances))
+
+        if scores is not None:
+            candidate_sets.append(scores.keys() & self._docs.keys())
+
+        for field, value in (equals or {}).items():
+            candidate_sets.append(self._postings[field].get(value, set()))
+
+        for field, values in (any_of or {}).items():
+            postings = self._postings[field]
+            matched = set()
+            for value in values:
+                matched |= postings.get(value, set())
+            candidate_sets.append(matched)
+
+        for field, (minimum, maximum) in (ranges or {}).items():
+            candidate_sets.append(self._range_ids(field, minimum, maximum))
+
+        if ids is not None:
+            candidate_sets.append(ids & self._docs.keys())
+
+        candidates: Optional[Set[str]] = None
+        for id_set in sorted(candidate_sets, key=len):
+            candidates = set(id_set) if candidates is None else candidates & id_set
+            if not candidates:
+                break
+        return candidates, distances
+
+    def facet_counts(
+        self,
+        equals: Dict[str, Any] = None,
+        any_of: Dict[str, List[Any]] = None,
+        ranges: Dict[str, Tuple[Optional[float], Optional[float]]] = None,
+        ids: Optional[Set[str]] = None,
+        near: Optional[Tuple[float, float, float]] = None,
+        scores: Optional[Dict[str, float]] = None
+    ) -> Dict[str, Dict[str, int]]:
+        """Facet histograms over every vendor matching the same filters as ``search``"""
+        candidates, _ = self._candidates(equals, any_of, ranges, ids, near, scores)
+        if candidates is None:
+            return count_facets(self._docs.values())
+        return count_facets(self._docs[vendor_id] for vendor_id in candidates)
+
+    def search(
+        self,
+        equals: Dict[str, Any] = None,
+        any_of: Dict[str, List[Any]] = None,
+        ranges: Dict[str, Tuple[Optional[float], Optional[float]]] = None,
+        ids: Optional[Set[str]] = None,
+        near: Optional[Tuple[float, float, float]] = None,
+        scores: Optional[Dict[str, float]] = None,
+        after: Optional[Tuple] = None,
+        sort: str = "rating",
+        offset: int = 0,
+        limit: int = 20,
+        prices: Optional[Dict[str, float]] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Resolve a filtered, sorted page of vendors.
+
+        ``equals`` maps a posting field to a required value, ``any_of`` maps a
+        posting field to accepted values (Mongo ``$in``), ``ranges`` maps
+        ``average_rating``/``pricing_from`` to inclusive bounds and ``ids``
+        restricts the result to a precomputed id set. ``near`` is a
+        ``(latitude, longitude, radius_km)`` circle; matches carry a
+        ``distance_km`` and can be ordered with ``sort="distance"``.
+        ``scores`` restricts the result to text search matches, ordered
+        best-first with ``sort="relevance"``. ``prices`` (quoted prices) orders
+        cheapest-first with ``sort="quote"``; vendors without a price sort
+        last. ``after`` is a sort key from
+        ``sort_key`` (a keyset cursor) for the presorted orders; the page
+        starts just past it. Returns copies of the matching profiles for the
+        page and the total match count (ignoring ``after``).
+        """
+        if near is None and sort == "distance":
+            raise ValueError("Distance sort requires a near filter")
+        if scores is None and sort == "relevance":
+            raise ValueError("Relevance sort requires text search scores")
+        if prices is None and sort == "quote":
+            raise ValueError("Quote sort requires prices")
+
+        candidates, distances = self._candidates(equals, any_of, ranges, ids, near, scores)
+
+        window = offset + limit
+        if after is not None and sort not in self.SORT_ORDERS:
+            raise ValueError(f"Cursor paging is not supported for {sort} order")
+
+        if sort == "quote":
+            candidates = self._docs.keys() if candidates is None else candidates
+            total = len(candidates)
+            page_ids = heapq.nsmallest(
+                window, candidates,
+                key=lambda vendor_id: (vendor_id not in prices, prices.get(vendor_id, 0.0), vendor_id)
+            )[offset:]
+        elif candidates is None:
+            total = len(self._docs)
+            entries = self._sorted[sort]
+            start = offset if after is None else bisect_right(entries, after) + offset
+            page_ids = [entry[-1] for entry in entries[start:start + limit]]
+        elif sort == "distance":
+            total = len(candidates)
+            page_ids = heapq.nsmallest(
+                window, candidates, key=lambda vendor_id: (distances[vendor_id], vendor_id)
+            )[offset:]
+        elif sort == "relevance":
+            total = len(candidates)
+            page_ids = heapq.nsmallest(
+                window, candidates, key=lambda vendor_id: (-scores[vendor_id], vendor_id)
+            )[offset:]
+        else:
+            total = len(candidates)
+            if after is not None:
+                candidates = [vendor_id for vendor_id in candidates if self._sort_keys[vendor_id][sort] > after]
+            page_ids = heapq.nsmallest(
+                window, candidates, key=lambda vendor_id: self._sort_keys[vendor_id][sort]
+            )[offset:]
+
+        page = [dict(self._docs[vendor_id]) for vendor_id in page_ids]
+        if near is not None:
+            for vendor in page:
+                vendor["distance_km"] = round(distances[vendor["id"]], 2)
+        if scores is not None:
+            for vendor in page:
+                vendor["relevance_score"] = round(scores[vendor["id"]], 4)
+        return page, total
+
+# Process-wide catalog index, populated at startup when enabled
+catalog_index = VendorCatalogIndex()
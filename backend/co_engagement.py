@@ -0,0 +1,239 @@
+import asyncio
+import heapq
+import logging
+import math
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Any, Iterable, Optional, Set
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne
+
+logger = logging.getLogger(__name__)
+
+# Engagement sources: (collection, timestamp field)
+ENGAGEMENT_SOURCES = [("recently_viewed", "viewed_at"), ("wishlist_items", "added_at")]
+
+class CoEngagementService:
+    """Item-to-item "couples who liked X also liked Y" model.
+
+    A couple engages with a vendor by viewing or wishlisting it. Two vendors
+    are similar when the same couples engage with both, scored as the cosine
+    of their engagement vectors: shared couples / sqrt(couples(X) * couples(Y)).
+    Only the top neighbours of each vendor are kept, one document per vendor
+    in ``vendor_neighbors``, so serving is a single indexed lookup.
+
+    The model is rebuilt in full when empty and once a day; in between, the
+    vendors of couples with new engagement are recomputed incrementally.
+    Pair counting runs in a worker process so it never stalls the event loop.
+    """
+
+    NEIGHBORS_PER_VENDOR = 20
+    # Pairs seen together by fewer couples than this are noise
+    MIN_SHARED_USERS = 2
+    # Bounds the pairs one very active couple can contribute; their most recent vendors count
+    MAX_VENDORS_PER_USER = 100
+    REFRESH_INTERVAL_SECONDS = 600
+    FULL_REBUILD_INTERVAL_SECONDS = 24 * 3600
+    BATCH_SIZE = 500
+
+    @staticmethod
+    async def _engagement(db: AsyncIOMotorDatabase, query: Dict[str, Any]) -> Dict[str, Dict[str, datetime]]:
+        """Vendors each couple engaged with over both sources, with the latest engagement time"""
+        engaged = defaultdict(dict)
+        for collection, time_field in ENGAGEMENT_SOURCES:
+            async for row in db[collection].find(query, {"_id": 0, "user_id": 1, "vendor_id": 1, time_field: 1}):
+                vendors = engaged[row["user_id"]]
+                engaged_at = row.get(time_field) or datetime.min
+                if engaged_at >= vendors.get(row["vendor_id"], datetime.min):
+                    vendors[row["vendor_id"]] = engaged_at
+        return engaged
+
+    @staticmethod
+    async def _users_per_vendor(db: AsyncIOMotorDatabase, vendor_ids: List[str]) -> Dict[str, int]:
+        """Distinct engaged couples per vendor, counted in Mongo"""
+        (first, _), (second, _) = ENGAGEMENT_SOURCES
+        pipeline = [
+            {"$match": {"vendor_id": {"$in": vendor_ids}}},
+            {"$project": {"_id": 0, "user_id": 1, "vendor_id": 1}},
+            {"$unionWith": {"coll": second, "pipeline": [
+                {"$match": {"vendor_id": {"$in": vendor_ids}}},
+                {"$project": {"_id": 0, "user_id": 1, "vendor_id": 1}}
+            ]}},
+            {"$group": {"_id": "$vendor_id", "users": {"$addToSet": "$user_id"}}},
+            {"$project": {"count": {"$size": "$users"}}}
+        ]
+        return {row["_id"]: row["count"] async for row in db[first].aggregate(pipeline)}
+
+    @staticmethod
+    def _recent_vendors(vendors: Dict[str, datetime]) -> List[str]:
+        """A couple's most recently engaged vendors, up to MAX_VENDORS_PER_USER"""
+        if len(vendors) <= CoEngagementService.MAX_VENDORS_PER_USER:
+            return list(vendors)
+        return heapq.nlargest(
+            CoEngagementService.MAX_VENDORS_PER_USER, vendors, key=lambda vendor_id: (vendors[vendor_id], vendor_id)
+        )
+
+    @staticmethod
+    def _neighbors(
+        engaged: Dict[str, Dict[str, datetime]],
+        user_counts: Optional[Dict[str, int]] = None,
+        targets: Optional[Set[str]] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Top neighbours for each target vendor (every vendor when targets is None).
+
+        ``user_counts`` defaults to the couples per vendor in ``engaged``.
+        """
+        if user_counts is None:
+            user_counts = Counter(vendor_id for vendors in engaged.values() for vendor_id in vendors)
+
+        shared: Dict[str, Counter] = defaultdict(Counter)
+        for vendors in engaged.values():
+            vendors = CoEngagementService._recent_vendors(vendors)
+            for vendor_id in vendors:
+                if targets is not None and vendor_id not in targets:
+                    continue
+                counts = shared[vendor_id]
+                for other_id in vendors:
+                    if other_id != vendor_id:
+                        counts[other_id] += 1
+
+        neighbors = {}
+        for vendor_id in (targets if targets is not None else shared):
+            scored = []
+            for other_id, count in shared.get(vendor_id, Counter()).items():
+                if count < CoEngagementService.MIN_SHARED_USERS:
+                    continue
+                norm = math.sqrt(user_counts.get(vendor_id, count) * user_counts.get(other_id, count))
+                scored.append({"vendor_id": other_id, "score": round(count / norm, 4), "shared_users": count})
+            scored.sort(key=lambda n: (-n["score"], -n["shared_users"], n["vendor_id"]))
+            neighbors[vendor_id] = scored[:CoEngagementService.NEIGHBORS_PER_VENDOR]
+        return neighbors
+
+    @staticmethod
+    async def _compute_neighbors(
+        engaged: Dict[str, Dict[str, datetime]],
+        user_counts: Optional[Dict[str, int]] = None,
+        targets: Optional[Set[str]] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Run ``_neighbors`` in a worker process"""
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            return await asyncio.get_running_loop().run_in_executor(
+                pool, CoEngagementService._neighbors, engaged, user_counts, targets
+            )
+
+    @staticmethod
+    async def _store(db: AsyncIOMotorDatabase, neighbors: Dict[str, List[Dict[str, Any]]], now: datetime):
+        operations = [
+            ReplaceOne(
+                {"vendor_id": vendor_id},
+                {"vendor_id": vendor_id, "neighbors": vendor_neighbors, "updated_at": now},
+                upsert=True
+            )
+            for vendor_id, vendor_neighbors in neighbors.items()
+        ]
+        for start in range(0, len(operations), CoEngagementService.BATCH_SIZE):
+            await db.vendor_neighbors.bulk_write(operations[start:start + CoEngagementService.BATCH_SIZE], ordered=False)
+
+    @staticmethod
+    async def rebuild(db: AsyncIOMotorDatabase) -> int:
+        """Recompute every vendor's neighbours from all stored engagement"""
+        try:
+            now = datetime.utcnow()
+            engaged = await CoEngagementService._engagement(db, {})
+            neighbors = await CoEngagementService._compute_neighbors(engaged)
+
+            await CoEngagementService._store(db, neighbors, now)
+            await db.vendor_neighbors.delete_many({"updated_at": {"$lt": now}})
+            return len(neighbors)
+
+        except Exception as e:
+            logger.error(f"Co-engagement rebuild failed: {str(e)}")
+            return 0
+
+    @staticmethod
+    async def refresh_since(db: AsyncIOMotorDatabase, since: datetime) -> int:
+        """Recompute the neighbours of vendors touched by engagement after ``since``.
+
+        New engagement by a couple changes the shared counts between every
+        pair of vendors that couple has engaged with, so all of them are
+        recomputed. Wishlist removals, and the small normalisation shift on
+        other vendors' lists, are picked up by the daily rebuild.
+        """
+        try:
+            now = datetime.utcnow()
+            active_users = set()
+            for collection, time_field in ENGAGEMENT_SOURCES:
+                active_users.update(await db[collection].distinct("user_id", {time_field: {"$gte": since}}))
+            if not active_users:
+                return 0
+
+            active = await CoEngagementService._engagement(db, {"user_id": {"$in": list(active_users)}})
+            dirty = sorted({vendor_id for vendors in active.values() for vendor_id in vendors})
+
+            for start in range(0, len(dirty), CoEngagementService.BATCH_SIZE):
+                targets = set(dirty[start:start + CoEngagementService.BATCH_SIZE])
+                # Every couple who engaged with a target, with all their vendors
+                engaged_users = set()
+                for collection, _ in ENGAGEMENT_SOURCES:
+                    engaged_users.update(await db[collection].distinct("user_id", {"vendor_id": {"$in": list(targets)}}))
+                engaged = await CoEngagementService._engagement(db, {"user_id": {"$in": list(engaged_users)}})
+
+                related = {vendor_id for vendors in engaged.values() for vendor_id in vendors}
+                user_counts = await CoEngagementService._users_per_vendor(db, list(related))
+                neighbors = await CoEngagementService._compute_neighbors(engaged, user_counts, targets)
+                await CoEngagementService._store(db, neighbors, now)
+
+            return len(dirty)
+
+        except Exception as e:
+            logger.error(f"Co-engagement refresh failed: {str(e)}")
+            return 0
+
+    @staticmethod
+    async def get_neighbors(db: AsyncIOMotorDatabase, vendor_id: str) -> List[Dict[str, Any]]:
+        """Stored neighbours of one vendor, most similar first"""
+        try:
+            entry = await db.vendor_neighbors.find_one({"vendor_id": vendor_id}, {"_id": 0, "neighbors": 1})
+            return entry["neighbors"] if entry else []
+        except Exception as e:
+            logger.error(f"Co-engagement lookup failed: {str(e)}")
+            return []
+
+    @staticmethod
+    async def neighbor_scores(db: AsyncIOMotorDatabase, vendor_ids: Iterable[str]) -> Dict[str, float]:
+        """Summed similarity to a set of seed vendors, in one lookup"""
+        vendor_ids = list(set(vendor_ids))
+        scores = defaultdict(float)
+        if not vendor_ids:
+            return scores
+
+        try:
+            async for entry in db.vendor_neighbors.find(
+                {"vendor_id": {"$in": vendor_ids}}, {"_id": 0, "neighbors": 1}
+            ):
+                for neighbor in entry["neighbors"]:
+                    scores[neighbor["vendor_id"]] += neighbor["score"]
+        except Exception as e:
+            logger.error(f"Co-engagement lookup failed: {str(e)}")
+        return scores
+
+    @staticmethod
+    async def run_maintenance(db: AsyncIOMotorDatabase):
+        """Periodic job: full rebuild when empty or stale, incremental refreshes in between"""
+        latest = await db.vendor_neighbors.find_one({}, {"updated_at": 1}, sort=[("updated_at", -1)])
+        last_refresh = latest["updated_at"] if latest else None
+        last_rebuild = datetime.utcnow() if latest else None
+
+        while True:
+            started = datetime.utcnow()
+            if last_rebuild is None or (started - last_rebuild).total_seconds() >= CoEngagementService.FULL_REBUILD_INTERVAL_SECONDS:
+                rebuilt = await CoEngagementService.rebuild(db)
+                logger.info(f"Co-engagement model rebuilt for {rebuilt} vendors")
+                last_rebuild = started
+            else:
+                refreshed = await CoEngagementService.refresh_since(db, last_refresh)
+                if refreshed:
+                    logger.info(f"Co-engagement neighbours refreshed for {refreshed} vendors")
+            last_refresh = started
+            await asyncio.sleep(CoEngagementService.REFRESH_INTERVAL_SECONDS)
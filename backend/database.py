@@ -32,6 +32,7 @@ async def create_indexes():
     # Users collection indexes
     await db.db.users.create_index("email", unique=True)
     await db.db.users.create_index("user_type")
+    await db.db.users.create_index([("created_at", -1), ("id", -1)])
     
     # Vendor profiles indexes
     await db.db.vendor_profiles.create_index("user_id", unique=True)
@@ -40,6 +41,25 @@ async def create_indexes():
     await db.db.vendor_profiles.create_index("verified")
     await db.db.vendor_profiles.create_index("featured")
     await db.db.vendor_profiles.create_index("average_rating")
+    await db.db.vendor_profiles.create_index("id")
+    await db.db.vendor_profiles.create_index("location_tokens")
+    await db.db.vendor_profiles.create_index([("geo", "2dsphere")])
+    await db.db.vendor_profiles.create_index(
+        [("business_name", "text"), ("style_tags", "text"), ("description", "text")],
+        weights={"business_name": 3, "style_tags": 2, "description": 1},
+        name="vendor_profiles_text"
+    )
+    
+    # Keyset pagination sort orders (rating-ordered search, created_at listings)
+    await db.db.vendor_profiles.create_index(
+        [("average_rating", -1), ("total_reviews", -1), ("created_at", -1), ("id", 1)]
+    )
+    await db.db.vendor_profiles.create_index([("created_at", 1), ("id", 1)])
+    await db.db.reviews.create_index([("vendor_id", 1), ("created_at", -1), ("id", -1)])
+    await db.db.reviews.create_index("sentiment_version")
+    await db.db.reviews.create_index("lsh_bands")
+    await db.db.review_aggregates.create_index("vendor_id", unique=True)
+    await db.db.review_buckets.create_index([("vendor_id", 1), ("source", 1), ("day", 1)], unique=True)
     
     # Couple profiles indexes
     await db.db.couple_profiles.create_index("user_id", unique=True)
@@ -87,6 +107,7 @@ async def create_indexes():
     await db.db.vendor_reviews.create_index("overall_rating")
     await db.db.vendor_reviews.create_index("created_at")
     await db.db.vendor_reviews.create_index("verified")
+    await db.db.vendor_reviews.create_index([("vendor_id", 1), ("created_at", -1)])
     
     # Trust scores indexes
     await db.db.vendor_trust_scores.create_index("vendor_id", unique=True)
@@ -107,6 +128,9 @@ async def create_indexes():
     await db.db.vendor_availability.create_index("date")
     await db.db.vendor_availability.create_index([("vendor_id", 1), ("date", 1)], unique=True)
     await db.db.vendor_availability.create_index("is_available")
+    await db.db.vendor_availability_intervals.create_index([("vendor_id", 1), ("start_date", 1)], unique=True)
+    await db.db.vendor_availability_intervals.create_index([("start_date", 1), ("end_date", 1)])
+    await db.db.vendor_availability_leases.create_index("vendor_id", unique=True)
     
     # Vendor packages indexes
     await db.db.vendor_packages.create_index("vendor_id")
@@ -128,13 +152,24 @@ async def create_indexes():
     await db.db.file_uploads.create_index("category")
     await db.db.file_uploads.create_index("upload_date")
     await db.db.file_uploads.create_index("tags")
+    await db.db.file_uploads.create_index([("user_id", 1), ("upload_date", -1), ("file_id", -1)])
     
     # Phase 3: Enhanced search indexes
     await db.db.wishlist_items.create_index([("user_id", 1), ("vendor_id", 1)], unique=True)
     await db.db.wishlist_items.create_index("added_at")
+    await db.db.wishlist_items.create_index("vendor_id")
     await db.db.recently_viewed.create_index([("user_id", 1), ("vendor_id", 1)], unique=True)
     await db.db.recently_viewed.create_index("viewed_at")
     await db.db.recently_viewed.create_index("user_id")
+    await db.db.recently_viewed.create_index([("vendor_id", 1), ("viewed_at", -1)])
+    
+    # Trending leaderboard indexes
+    await db.db.trending_vendors.create_index("vendor_id", unique=True)
+    await db.db.trending_vendors.create_index([("epoch", 1), ("score", -1)])
+    
+    # Co-engagement neighbour indexes
+    await db.db.vendor_neighbors.create_index("vendor_id", unique=True)
+    await db.db.vendor_neighbors.create_index("updated_at")
     
     # Phase 3: Communication indexes
     await db.db.chat_rooms.create_index([("couple_id", 1), ("vendor_id", 1)], unique=True)
@@ -1,15 +1,43 @@
+import asyncio
 import os
-import re
 import uuid
-from datetime import datetime, timedelta
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from typing import List, Dict, Optional, Any
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 import logging
 import base64
 
+from .search_service import TrendingService
+from .batch_loader import load_by_ids
+from .pagination import decode_cursor, keyset_query
+from .recompute_queue import recompute_queue
+from .review_stats import ReviewStatsService
+from .review_buckets import ReviewBucketService
+from .review_photos import process_review_photos
+from .search_indexes import refresh_vendor
+from .review_dedup import DUPLICATE_THRESHOLD, DuplicateClusters, lsh_bands, minhash, review_text, similarity
+from .sentiment import LEXICON_VERSION, score_text, score_texts
+from .vote_buffer import helpful_vote_buffer
+
 logger = logging.getLogger(__name__)
 
 class EnhancedReviewService:
+    # Newest first; cursors encode these fields of the last review on a page
+    LISTING_SORT = [('created_at', -1), ('id', -1)]
+    
+    # Review statuses that count towards a vendor's rating
+    RATED_STATUSES = ('verified', 'pending')
+    
+    # LSH candidates compared against a new review before it is accepted as original
+    DUPLICATE_CANDIDATE_LIMIT = 200
+    
+    # Full rescans attempted while concurrent review writes keep moving the aggregate
+    AGGREGATE_REBUILD_ATTEMPTS = 5
+    
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
         self.reviews_collection = db.reviews
@@ -17,26 +45,7 @@ class EnhancedReviewService:
         self.users_collection = db.users
         self.review_analytics_collection = db.review_analytics
         self.quality_scores_collection = db.quality_scores
-        
-        # Sentiment analysis keywords (simple implementation)
-        self.positive_keywords = [
-            'excellent', 'amazing', 'fantastic', 'wonderful', 'perfect', 'outstanding', 
-            'incredible', 'awesome', 'brilliant', 'exceptional', 'superb', 'magnificent',
-            'beautiful', 'stunning', 'gorgeous', 'lovely', 'delightful', 'charming',
-            'professional', 'responsive', 'helpful', 'friendly', 'accommodating',
-            'creative', 'talented', 'skilled', 'experienced', 'knowledgeable',
-            'punctual', 'reliable', 'organized', 'efficient', 'thorough',
-            'recommend', 'loved', 'satisfied', 'pleased', 'impressed', 'exceeded'
-        ]
-        
-        self.negative_keywords = [
-            'terrible', 'awful', 'horrible', 'worst', 'disappointing', 'unprofessional',
-            'rude', 'late', 'delayed', 'cancelled', 'expensive', 'overpriced',
-            'poor', 'bad', 'unsatisfied', 'unhappy', 'frustrated', 'angry',
-            'disorganized', 'unreliable', 'unresponsive', 'difficult', 'stressful',
-            'mistake', 'error', 'problem', 'issue', 'complaint', 'regret',
-            'avoid', 'never', 'waste', 'money', 'time'
-        ]
+        self.review_aggregates_collection = db.review_aggregates
     
     async def create_review(self, customer_id: str, review_data: dict) -> dict:
         """Create a new review with sentiment analysis and photo processing"""
@@ -46,13 +55,18 @@ class EnhancedReviewService:
             # Process photos if provided
             processed_photos = []
             if review_data.get('photos'):
-                processed_photos = await self._process_review_photos(review_data['photos'])
+                processed_photos = await self._process_review_photos(
+                    review_data['photos'], customer_id, review_data['vendor_id'], review_id
+                )
             
             # Analyze sentiment
             sentiment_data = await self._analyze_sentiment(
                 review_data.get('title', '') + ' ' + review_data.get('content', '')
             )
             
+            # Near-duplicate fingerprint
+            signature = minhash(review_text(review_data))
+            
             # Create review document
             review_doc = {
                 'id': review_id,
@@ -69,6 +83,9 @@ class EnhancedReviewService:
                 'status': 'pending',  # Will be verified later
                 'sentiment': sentiment_data['sentiment'],
                 'sentiment_score': sentiment_data['score'],
+                'sentiment_version': LEXICON_VERSION,
+                'minhash': signature,
+                'lsh_bands': lsh_bands(signature) if signature else [],
                 'verified': False,
                 'helpful_votes': 0,
                 'total_votes': 0,
@@ -80,15 +97,20 @@ class EnhancedReviewService:
             
             # Insert review
             await self.reviews_collection.insert_one(review_doc)
+            await ReviewBucketService.record_review(
+                self.db, 'reviews', review_doc['vendor_id'], review_doc['created_at'],
+                review_doc['rating'], review_doc['sentiment']
+            )
             
-            # Update vendor ratings
-            await self._update_vendor_ratings(review_data['vendor_id'])
+            # Fold it into the vendor's running aggregate; ratings, analytics
+            # and quality score are derived from that instead of a rescan
+            await self._apply_review_change(review_data['vendor_id'], None, review_doc)
             
-            # Update analytics
-            await self._update_review_analytics(review_data['vendor_id'])
+            # Feed the trending leaderboard
+            await TrendingService.record_review(self.db, review_data['vendor_id'])
             
-            # Calculate quality score
-            await self._calculate_quality_score(review_data['vendor_id'])
+            # Copy-pasted reviews go to moderation
+            await self._check_duplicates(review_doc)
             
             return {
                 'review_id': review_id,
@@ -101,327 +123,441 @@ class EnhancedReviewService:
             logger.error(f"Error creating review: {e}")
             raise
     
-    async def _process_review_photos(self, photos: List[str]) -> List[dict]:
+    async def _process_review_photos(self, photos: List[str], customer_id: str, vendor_id: str, review_id: str) -> List[dict]:
         """Process and store review photos"""
-        processed_photos = []
-        
-        for photo_base64 in photos:
-            try:
-                # Generate unique photo ID
-                photo_id = f"photo_{uuid.uuid4().hex[:12]}"
-                
-                # In a real implementation, you would:
-                # 1. Decode base64 image
-                # 2. Validate image format and size
-                # 3. Upload to cloud storage (S3, Supabase, etc.)
-                # 4. Generate public URL
+        try:
+            return await process_review_photos(self.db, photos, customer_id, vendor_id, review_id)
+            
+        except Exception as e:
+            logger.error(f"Error processing review photos: {e}")
+            return []
+    
+    async def _find_duplicates(self, review: dict) -> List[str]:
+        """Ids of other reviews whose text is a near-duplicate, from LSH bucket candidates"""
+        if not review.get('minhash'):
+            return []
+        duplicates = []
+        async for candidate in self.reviews_collection.find(
+            {'lsh_bands': {'$in': review['lsh_bands']}, 'id': {'$ne': review['id']}},
+            {'_id': 0, 'id': 1, 'minhash': 1}
+        ).limit(self.DUPLICATE_CANDIDATE_LIMIT):
+            if candidate.get('minhash') and similarity(review['minhash'], candidate['minhash']) >= DUPLICATE_THRESHOLD:
+                duplicates.append(candidate['id'])
+        return duplicates
+    
+    async def _check_duplicates(self, review: dict):
+        """Flag a new review that near-duplicates an existing one"""
+        try:
+            duplicates = await self._find_duplicates(review)
+            if duplicates:
+                await self.flag_review(review['id'], f"Near-duplicate of review {', '.join(duplicates[:5])}")
                 
-                # For now, we'll simulate this
-                photo_doc = {
-                    'photo_id': photo_id,
-                    'photo_url': f"https://storage.example.com/reviews/{photo_id}.jpg",
-                    'caption': None,
-                    'verified': False
-                }
+        except Exception as e:
+            logger.error(f"Error checking for duplicate reviews: {e}")
+    
+    async def detect_duplicate_reviews(self, batch_size: int = 1000) -> int:
+        """Batch pass: fingerprint unsigned reviews and flag every near-duplicate but the earliest of each cluster"""
+        flagged = 0
+        try:
+            if not await self.reviews_collection.find_one({'minhash': {'$exists': False}}, {'_id': 1}):
+                return 0
+            
+            ids, statuses, signatures = [], [], []
+            buckets: Dict[str, List[int]] = {}
+            clusters = DuplicateClusters()
+            updates = []
+            
+            async for review in self.reviews_collection.find(
+                {}, {'_id': 1, 'id': 1, 'title': 1, 'content': 1, 'status': 1, 'minhash': 1, 'lsh_bands': 1}
+            ).sort([('created_at', 1), ('id', 1)]):
+                if 'minhash' not in review:
+                    review['minhash'] = minhash(review_text(review))
+                    review['lsh_bands'] = lsh_bands(review['minhash']) if review['minhash'] else []
+                    updates.append(UpdateOne(
+                        {'_id': review['_id']},
+                        {'$set': {'minhash': review['minhash'], 'lsh_bands': review['lsh_bands']}}
+                    ))
+                    if len(updates) >= batch_size:
+                        await self.reviews_collection.bulk_write(updates, ordered=False)
+                        updates = []
+                if not review['minhash']:
+                    continue
                 
-                processed_photos.append(photo_doc)
+                position = len(ids)
+                ids.append(review['id'])
+                statuses.append(review.get('status'))
+                signatures.append(review['minhash'])
                 
-            except Exception as e:
-                logger.error(f"Error processing photo: {e}")
-                continue
+                # Compare only against earlier reviews sharing a band
+                candidates = set()
+                for key in review['lsh_bands']:
+                    candidates.update(buckets.setdefault(key, []))
+                    buckets[key].append(position)
+                for candidate in candidates:
+                    if similarity(review['minhash'], signatures[candidate]) >= DUPLICATE_THRESHOLD:
+                        clusters.union(ids[candidate], review['id'])
+            
+            if updates:
+                await self.reviews_collection.bulk_write(updates, ordered=False)
+            
+            positions = {review_id: position for position, review_id in enumerate(ids)}
+            for members in clusters.clusters():
+                members.sort(key=positions.get)
+                original = members[0]
+                for review_id in members[1:]:
+                    if statuses[positions[review_id]] in ('flagged', 'rejected'):
+                        continue
+                    if await self.flag_review(review_id, f"Near-duplicate of review {original}"):
+                        flagged += 1
+            
+            logger.info(f"Duplicate review scan flagged {flagged} reviews")
+            
+        except Exception as e:
+            logger.error(f"Error detecting duplicate reviews: {e}")
         
-        return processed_photos
+        return flagged
     
     async def _analyze_sentiment(self, text: str) -> dict:
         """Analyze sentiment of review text"""
         try:
-            # Clean and normalize text
-            text_clean = re.sub(r'[^\w\s]', '', text.lower())
-            words = text_clean.split()
-            
-            positive_count = sum(1 for word in words if word in self.positive_keywords)
-            negative_count = sum(1 for word in words if word in self.negative_keywords)
-            
-            # Calculate sentiment score (-1 to 1)
-            total_sentiment_words = positive_count + negative_count
-            if total_sentiment_words == 0:
-                sentiment_score = 0
-                sentiment = 'neutral'
-            else:
-                sentiment_score = (positive_count - negative_count) / total_sentiment_words
-                
-                if sentiment_score > 0.2:
-                    sentiment = 'positive'
-                elif sentiment_score < -0.2:
-                    sentiment = 'negative'
-                else:
-                    sentiment = 'neutral'
-            
-            return {
-                'sentiment': sentiment,
-                'score': sentiment_score,
-                'positive_words': positive_count,
-                'negative_words': negative_count
-            }
+            return score_text(text)
             
         except Exception as e:
             logger.error(f"Error analyzing sentiment: {e}")
             return {'sentiment': 'neutral', 'score': 0}
     
-    async def _update_vendor_ratings(self, vendor_id: str):
-        """Update vendor's overall rating and review count"""
+    async def rescore_sentiment(self, batch_size: int = 1000, workers: Optional[int] = None) -> int:
+        """Re-score reviews scored under an older lexicon, in chunks across a process pool"""
+        stale = {'sentiment_version': {'$ne': LEXICON_VERSION}}
+        rescored = 0
         try:
-            # Get all verified reviews for vendor
-            reviews_cursor = self.reviews_collection.find({
-                'vendor_id': vendor_id,
-                'status': {'$in': ['verified', 'pending']}
-            })
-            reviews = await reviews_cursor.to_list(length=None)
+            if not await self.reviews_collection.find_one(stale, {'_id': 1}):
+                return 0
             
-            if not reviews:
-                return
-            
-            # Calculate overall rating
-            total_rating = sum(review['rating'] for review in reviews)
-            average_rating = total_rating / len(reviews)
-            
-            # Calculate category averages
-            category_totals = {}
-            category_counts = {}
-            
-            for review in reviews:
-                for cat_rating in review.get('category_ratings', []):
-                    category = cat_rating['category']
-                    rating = cat_rating['rating']
-                    
-                    if category not in category_totals:
-                        category_totals[category] = 0
-                        category_counts[category] = 0
-                    
-                    category_totals[category] += rating
-                    category_counts[category] += 1
-            
-            category_averages = {
-                cat: category_totals[cat] / category_counts[cat]
-                for cat in category_totals
-            }
-            
-            # Update vendor record
-            await self.vendors_collection.update_one(
-                {'id': vendor_id},
-                {
-                    '$set': {
-                        'average_rating': round(average_rating, 2),
-                        'review_count': len(reviews),
-                        'category_ratings': category_averages,
-                        'updated_at': datetime.utcnow()
-                    }
-                }
-            )
+            workers = workers or os.cpu_count() or 1
+            cursor = self.reviews_collection.find(
+                stale, {'_id': 1, 'vendor_id': 1, 'title': 1, 'content': 1, 'sentiment': 1, 'created_at': 1}
+            ).batch_size(batch_size)
+            
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # Keep every worker busy while earlier chunks are written back
+                in_flight = deque()
+                batch = []
+                async for review in cursor:
+                    batch.append(review)
+                    if len(batch) < batch_size:
+                        continue
+                    in_flight.append(asyncio.ensure_future(self._score_batch(pool, batch)))
+                    batch = []
+                    if len(in_flight) >= workers:
+                        rescored += await self._store_sentiment(*await in_flight.popleft())
+                if batch:
+                    in_flight.append(asyncio.ensure_future(self._score_batch(pool, batch)))
+                while in_flight:
+                    rescored += await self._store_sentiment(*await in_flight.popleft())
+            
+            logger.info(f"Re-scored sentiment of {rescored} reviews with lexicon v{LEXICON_VERSION}")
+            # Platform sentiment counts are rebuilt rather than shifted review by review
+            await ReviewStatsService.refresh(self.db)
             
         except Exception as e:
-            logger.error(f"Error updating vendor ratings: {e}")
+            logger.error(f"Error re-scoring review sentiment: {e}")
+        
+        return rescored
+    
+    @staticmethod
+    async def _score_batch(pool: ProcessPoolExecutor, batch: List[dict]) -> tuple:
+        texts = [f"{review.get('title', '')} {review.get('content', '')}" for review in batch]
+        scores = await asyncio.get_running_loop().run_in_executor(pool, score_texts, texts)
+        return batch, scores
+    
+    async def _store_sentiment(self, batch: List[dict], scores: List[dict]) -> int:
+        """Write re-scored sentiment back and shift the vendors' sentiment counts"""
+        operations = []
+        vendor_deltas: Dict[str, Dict[str, int]] = {}
+        bucket_shifts = []
+        for review, result in zip(batch, scores):
+            operations.append(UpdateOne(
+                {'_id': review['_id']},
+                {'$set': {
+                    'sentiment': result['sentiment'],
+                    'sentiment_score': result['score'],
+                    'sentiment_version': LEXICON_VERSION
+                }}
+            ))
+            previous = review.get('sentiment', 'neutral')
+            if previous != result['sentiment']:
+                if review.get('created_at'):
+                    bucket_shifts.append((review['vendor_id'], review['created_at'], previous, result['sentiment']))
+                delta = vendor_deltas.setdefault(review['vendor_id'], {})
+                delta[f"sentiment.{previous}"] = delta.get(f"sentiment.{previous}", 0) - 1
+                delta[f"sentiment.{result['sentiment']}"] = delta.get(f"sentiment.{result['sentiment']}", 0) + 1
+        
+        await self.reviews_collection.bulk_write(operations, ordered=False)
+        
+        aggregate_updates = [
+            UpdateOne({'vendor_id': vendor_id}, self._aggregate_increment(delta), upsert=True)
+            for vendor_id, delta in vendor_deltas.items()
+        ]
+        if aggregate_updates:
+            await self.review_aggregates_collection.bulk_write(aggregate_updates, ordered=False)
+        await ReviewBucketService.shift_sentiment(self.db, 'reviews', bucket_shifts)
+        for vendor_id in vendor_deltas:
+            recompute_queue.mark('review_stats', vendor_id)
+        
+        return len(operations)
     
-    async def _update_review_analytics(self, vendor_id: str):
-        """Update comprehensive review analytics for vendor"""
+    @staticmethod
+    def _review_contribution(review: Optional[dict]) -> Dict[str, float]:
+        """$inc deltas one review adds to its vendor's running aggregate"""
+        if not review:
+            return {}
+        
+        rating = review['rating']
+        contribution = {
+            'count': 1,
+            'rating_sum': rating,
+            f"rating_hist.{int(rating)}": 1,
+            f"sentiment.{review.get('sentiment', 'neutral')}": 1,
+            'recommend': 1 if review.get('would_recommend', True) else 0,
+            'verified': 1 if review.get('verified', False) else 0,
+            'responded': 1 if review.get('vendor_response') else 0
+        }
+        for cat_rating in review.get('category_ratings', []):
+            category = cat_rating['category']
+            contribution[f"category_sums.{category}"] = contribution.get(f"category_sums.{category}", 0) + cat_rating['rating']
+            contribution[f"category_counts.{category}"] = contribution.get(f"category_counts.{category}", 0) + 1
+        
+        # Vendor ratings only count reviews that haven't been flagged or rejected
+        if review.get('status') in EnhancedReviewService.RATED_STATUSES:
+            for field in ['count', 'rating_sum']:
+                contribution[f"rated.{field}"] = contribution[field]
+            for field, value in list(contribution.items()):
+                if field.startswith('category_'):
+                    contribution[f"rated.{field}"] = value
+        
+        return contribution
+    
+    @staticmethod
+    def _aggregate_increment(delta: Dict[str, float]) -> dict:
+        """Upsert applying ``delta`` to an aggregate.
+        
+        Every increment bumps ``version`` so a concurrent rebuild can tell its
+        scan is out of date. An aggregate created by the upsert only holds the
+        deltas since, so it is marked for a full rebuild.
+        """
+        return {
+            '$inc': {**delta, 'version': 1},
+            '$set': {'updated_at': datetime.utcnow()},
+            '$setOnInsert': {'needs_rebuild': True}
+        }
+    
+    async def _apply_review_change(self, vendor_id: str, before: Optional[dict], after: Optional[dict]):
+        """Move a vendor's aggregate from ``before`` to ``after`` of one review and queue derived stats"""
         try:
-            # Get all reviews for vendor
-            reviews_cursor = self.reviews_collection.find({'vendor_id': vendor_id})
-            reviews = await reviews_cursor.to_list(length=None)
-            
-            if not reviews:
-                return
-            
-            # Calculate analytics
-            total_reviews = len(reviews)
-            ratings = [review['rating'] for review in reviews]
-            average_rating = sum(ratings) / len(ratings)
-            
-            # Rating distribution
-            rating_distribution = {}
-            for i in range(1, 6):
-                rating_distribution[str(i)] = sum(1 for r in ratings if int(r) == i)
-            
-            # Category averages
-            category_totals = {}
-            category_counts = {}
-            
-            for review in reviews:
-                for cat_rating in review.get('category_ratings', []):
-                    category = cat_rating['category']
-                    rating = cat_rating['rating']
-                    
-                    if category not in category_totals:
-                        category_totals[category] = 0
-                        category_counts[category] = 0
-                    
-                    category_totals[category] += rating
-                    category_counts[category] += 1
-            
-            category_averages = {
-                cat: category_totals[cat] / category_counts[cat]
-                for cat in category_totals
-            }
+            delta = self._review_contribution(after)
+            for field, value in self._review_contribution(before).items():
+                delta[field] = delta.get(field, 0) - value
+            delta = {field: value for field, value in delta.items() if value}
+            
+            if delta:
+                await self.review_aggregates_collection.update_one(
+                    {'vendor_id': vendor_id}, self._aggregate_increment(delta), upsert=True
+                )
             
-            # Sentiment breakdown
-            sentiment_breakdown = {
-                'positive': sum(1 for r in reviews if r.get('sentiment') == 'positive'),
-                'neutral': sum(1 for r in reviews if r.get('sentiment') == 'neutral'),
-                'negative': sum(1 for r in reviews if r.get('sentiment') == 'negative')
-            }
+            # Ratings, analytics and quality score are rewritten off the request path,
+            # once per vendor however many reviews change within the window
+            recompute_queue.mark('review_stats', vendor_id)
             
-            # Recent trend (last 30 days vs previous 30 days)
-            thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-            sixty_days_ago = datetime.utcnow() - timedelta(days=60)
-            
-            recent_reviews = [r for r in reviews if r['created_at'] > thirty_days_ago]
-            previous_reviews = [r for r in reviews if sixty_days_ago < r['created_at'] <= thirty_days_ago]
-            
-            recent_avg = sum(r['rating'] for r in recent_reviews) / len(recent_reviews) if recent_reviews else 0
-            previous_avg = sum(r['rating'] for r in previous_reviews) / len(previous_reviews) if previous_reviews else 0
-            
-            if recent_avg > previous_avg + 0.2:
-                trend = 'improving'
-            elif recent_avg < previous_avg - 0.2:
-                trend = 'declining'
-            else:
-                trend = 'stable'
-            
-            # Recommendation rate
-            recommend_count = sum(1 for r in reviews if r.get('would_recommend', True))
-            recommendation_rate = recommend_count / total_reviews if total_reviews > 0 else 0
-            
-            # Verified review percentage
-            verified_count = sum(1 for r in reviews if r.get('verified', False))
-            verified_percentage = verified_count / total_reviews if total_reviews > 0 else 0
-            
-            # Create analytics document
-            analytics_doc = {
-                'vendor_id': vendor_id,
-                'total_reviews': total_reviews,
-                'average_rating': round(average_rating, 2),
-                'rating_distribution': rating_distribution,
-                'category_averages': category_averages,
-                'sentiment_breakdown': sentiment_breakdown,
-                'recent_trend': trend,
-                'recommendation_rate': round(recommendation_rate, 2),
-                'verified_review_percentage': round(verified_percentage, 2),
-                'updated_at': datetime.utcnow()
-            }
-            
-            # Upsert analytics
-            await self.review_analytics_collection.update_one(
-                {'vendor_id': vendor_id},
-                {'$set': analytics_doc},
-                upsert=True
-            )
+            await ReviewStatsService.record_review_change(self.db, before, after)
             
         except Exception as e:
-            logger.error(f"Error updating review analytics: {e}")
+            logger.error(f"Error updating review aggregate: {e}")
     
-    async def _calculate_quality_score(self, vendor_id: str):
-        """Calculate comprehensive quality score for vendor"""
-        try:
-            # Get vendor data and reviews
-            vendor = await self.vendors_collection.find_one({'id': vendor_id})
-            reviews_cursor = self.reviews_collection.find({'vendor_id': vendor_id})
-            reviews = await reviews_cursor.to_list(length=None)
-            
-            if not vendor or not reviews:
-                return
-            
-            # Component scores (0-100 scale)
-            
-            # 1. Rating Score (40% weight)
-            avg_rating = vendor.get('average_rating', 0)
-            rating_score = (avg_rating / 5.0) * 100
-            
-            # 2. Review Volume Score (20% weight)
-            review_count = len(reviews)
-            volume_score = min(review_count * 5, 100)  # 5 points per review, max 100
-            
-            # 3. Response Rate Score (15% weight)
-            responses = sum(1 for r in reviews if r.get('vendor_response'))
-            response_rate = responses / review_count if review_count > 0 else 0
-            response_rate_score = response_rate * 100
-            
-            # 4. Sentiment Score (10% weight)
-            positive_reviews = sum(1 for r in reviews if r.get('sentiment') == 'positive')
-            sentiment_score = (positive_reviews / review_count) * 100 if review_count > 0 else 0
-            
-            # 5. Verification Score (10% weight)
-            verified_reviews = sum(1 for r in reviews if r.get('verified', False))
-            verification_score = (verified_reviews / review_count) * 100 if review_count > 0 else 0
-            
-            # 6. Trend Score (5% weight)
-            thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-            recent_reviews = [r for r in reviews if r['created_at'] > thirty_days_ago]
-            
-            if recent_reviews:
-                recent_avg = sum(r['rating'] for r in recent_reviews) / len(recent_reviews)
-                trend_score = (recent_avg / 5.0) * 100
-            else:
-                trend_score = rating_score  # Use overall rating if no recent reviews
-            
-            # Calculate weighted overall score
-            overall_score = (
-                rating_score * 0.40 +
-                volume_score * 0.20 +
-                response_rate_score * 0.15 +
-                sentiment_score * 0.10 +
-                verification_score * 0.10 +
-                trend_score * 0.05
-            )
-            
-            # Create quality score document
-            quality_doc = {
-                'vendor_id': vendor_id,
-                'overall_score': round(overall_score, 2),
-                'rating_score': round(rating_score, 2),
-                'review_volume_score': round(volume_score, 2),
-                'response_rate_score': round(response_rate_score, 2),
-                'sentiment_score': round(sentiment_score, 2),
-                'verification_score': round(verification_score, 2),
-                'trend_score': round(trend_score, 2),
-                'last_calculated': datetime.utcnow()
-            }
-            
-            # Upsert quality score
-            await self.quality_scores_collection.update_one(
-                {'vendor_id': vendor_id},
-                {'$set': quality_doc},
-                upsert=True
-            )
+    async def recompute_review_stats(self, vendor_id: str):
+        """Rewrite a vendor's derived review stats from its aggregate"""
+        aggregate = await self.review_aggregates_collection.find_one({'vendor_id': vendor_id})
+        # First write for a vendor since aggregates were introduced
+        if aggregate is None or aggregate.get('needs_rebuild'):
+            aggregate = await self.rebuild_review_aggregate(vendor_id)
+        await self._write_review_stats(vendor_id, aggregate)
+    
+    async def rebuild_review_aggregate(self, vendor_id: str) -> dict:
+        """Recompute a vendor's aggregate from its full review history.
+        
+        The result replaces the stored aggregate only if its ``version`` hasn't
+        moved since the scan started; an increment landing mid-scan may be for
+        a review the scan missed, so the scan is retried.
+        """
+        for _ in range(self.AGGREGATE_REBUILD_ATTEMPTS):
+            current = await self.review_aggregates_collection.find_one({'vendor_id': vendor_id}, {'version': 1})
+            version = current.get('version') if current else None
+            
+            totals = {}
+            async for review in self.reviews_collection.find({'vendor_id': vendor_id}):
+                for field, value in self._review_contribution(review).items():
+                    totals[field] = totals.get(field, 0) + value
+            
+            aggregate = {'vendor_id': vendor_id, 'version': (version or 0) + 1, 'updated_at': datetime.utcnow()}
+            for field, value in totals.items():
+                target = aggregate
+                *parents, leaf = field.split('.')
+                for parent in parents:
+                    target = target.setdefault(parent, {})
+                target[leaf] = value
             
-            # Update vendor with quality score
+            try:
+                if current is None:
+                    await self.review_aggregates_collection.insert_one(aggregate)
+                    return aggregate
+                result = await self.review_aggregates_collection.replace_one(
+                    {'vendor_id': vendor_id, 'version': version}, aggregate
+                )
+                if result.matched_count:
+                    return aggregate
+            except DuplicateKeyError:
+                # An increment created the aggregate mid-scan
+                pass
+        
+        logger.warning(f"Review aggregate of vendor {vendor_id} kept changing during rebuild; will retry on next change")
+        return aggregate
+    
+    @staticmethod
+    def _category_averages(scope: dict) -> Dict[str, float]:
+        counts = scope.get('category_counts', {})
+        return {
+            category: total / counts[category]
+            for category, total in scope.get('category_sums', {}).items()
+            if counts.get(category)
+        }
+    
+    async def _write_review_stats(self, vendor_id: str, aggregate: dict):
+        """Derive vendor ratings, analytics and quality score from the aggregate"""
+        total_reviews = aggregate.get('count', 0)
+        if not total_reviews:
+            return
+        
+        now = datetime.utcnow()
+        
+        # Vendor ratings (verified and pending reviews)
+        rated = aggregate.get('rated', {})
+        rated_average = rated['rating_sum'] / rated['count'] if rated.get('count') else None
+        if rated_average is not None:
             await self.vendors_collection.update_one(
                 {'id': vendor_id},
-                {'$set': {'quality_score': round(overall_score, 2)}}
+                {
+                    '$set': {
+                        'average_rating': round(rated_average, 2),
+                        'review_count': rated['count'],
+                        'category_ratings': self._category_averages(rated),
+                        'updated_at': now
+                    }
+                }
             )
-            
-        except Exception as e:
-            logger.error(f"Error calculating quality score: {e}")
+            await refresh_vendor(self.db, vendor_id)
+        
+        # Recent trend (last 30 days vs previous 30 days) from daily buckets
+        recent = await ReviewBucketService.window(self.db, 'reviews', vendor_id, 30)
+        previous = await ReviewBucketService.window(self.db, 'reviews', vendor_id, 60, 30)
+        
+        recent_avg = recent['rating_sum'] / recent['count'] if recent['count'] else 0
+        previous_avg = previous['rating_sum'] / previous['count'] if previous['count'] else 0
+        
+        if recent_avg > previous_avg + 0.2:
+            trend = 'improving'
+        elif recent_avg < previous_avg - 0.2:
+            trend = 'declining'
+        else:
+            trend = 'stable'
+        
+        # Analytics (all reviews)
+        rating_hist = aggregate.get('rating_hist', {})
+        sentiment = aggregate.get('sentiment', {})
+        analytics_doc = {
+            'vendor_id': vendor_id,
+            'total_reviews': total_reviews,
+            'average_rating': round(aggregate['rating_sum'] / total_reviews, 2),
+            'rating_distribution': {str(i): rating_hist.get(str(i), 0) for i in range(1, 6)},
+            'category_averages': self._category_averages(aggregate),
+            'sentiment_breakdown': {
+                'positive': sentiment.get('positive', 0),
+                'neutral': sentiment.get('neutral', 0),
+                'negative': sentiment.get('negative', 0)
+            },
+            'recent_trend': trend,
+            'recommendation_rate': round(aggregate.get('recommend', 0) / total_reviews, 2),
+            'verified_review_percentage': round(aggregate.get('verified', 0) / total_reviews, 2),
+            'updated_at': now
+        }
+        
+        await self.review_analytics_collection.update_one(
+            {'vendor_id': vendor_id},
+            {'$set': analytics_doc},
+            upsert=True
+        )
+        
+        # Quality score components (0-100 scale)
+        rating_score = ((rated_average or 0) / 5.0) * 100                               # 40% weight
+        volume_score = min(total_reviews * 5, 100)                                      # 20%: 5 points per review
+        response_rate_score = aggregate.get('responded', 0) / total_reviews * 100       # 15% weight
+        sentiment_score = sentiment.get('positive', 0) / total_reviews * 100            # 10% weight
+        verification_score = aggregate.get('verified', 0) / total_reviews * 100         # 10% weight
+        # Trend (5% weight); overall rating if no recent reviews
+        trend_score = (recent_avg / 5.0) * 100 if recent['count'] else rating_score
+        
+        overall_score = (
+            rating_score * 0.40 +
+            volume_score * 0.20 +
+            response_rate_score * 0.15 +
+            sentiment_score * 0.10 +
+            verification_score * 0.10 +
+            trend_score * 0.05
+        )
+        
+        quality_doc = {
+            'vendor_id': vendor_id,
+            'overall_score': round(overall_score, 2),
+            'rating_score': round(rating_score, 2),
+            'review_volume_score': round(volume_score, 2),
+            'response_rate_score': round(response_rate_score, 2),
+            'sentiment_score': round(sentiment_score, 2),
+            'verification_score': round(verification_score, 2),
+            'trend_score': round(trend_score, 2),
+            'last_calculated': now
+        }
+        
+        await self.quality_scores_collection.update_one(
+            {'vendor_id': vendor_id},
+            {'$set': quality_doc},
+            upsert=True
+        )
+        
+        await self.vendors_collection.update_one(
+            {'id': vendor_id},
+            {'$set': {'quality_score': round(overall_score, 2)}}
+        )
     
     async def add_vendor_response(self, vendor_id: str, review_id: str, response: str) -> bool:
         """Add vendor response to a review"""
         try:
-            result = await self.reviews_collection.update_one(
+            now = datetime.utcnow()
+            update = {
+                'vendor_response': response,
+                'vendor_response_date': now,
+                'updated_at': now
+            }
+            before = await self.reviews_collection.find_one_and_update(
                 {
                     'id': review_id,
                     'vendor_id': vendor_id
                 },
-                {
-                    '$set': {
-                        'vendor_response': response,
-                        'vendor_response_date': datetime.utcnow(),
-                        'updated_at': datetime.utcnow()
-                    }
-                }
+                {'$set': update},
+                return_document=ReturnDocument.BEFORE
             )
             
-            if result.modified_count > 0:
-                # Recalculate quality score (response rate improved)
-                await self._calculate_quality_score(vendor_id)
+            if before:
+                # Response rate feeds the quality score
+                await self._apply_review_change(vendor_id, before, {**before, **update})
                 return True
             
             return False
@@ -433,23 +569,19 @@ class EnhancedReviewService:
     async def verify_review(self, review_id: str, verified: bool = True) -> bool:
         """Verify or unverify a review"""
         try:
-            result = await self.reviews_collection.update_one(
+            update = {
+                'verified': verified,
+                'status': 'verified' if verified else 'pending',
+                'updated_at': datetime.utcnow()
+            }
+            before = await self.reviews_collection.find_one_and_update(
                 {'id': review_id},
-                {
-                    '$set': {
-                        'verified': verified,
-                        'status': 'verified' if verified else 'pending',
-                        'updated_at': datetime.utcnow()
-                    }
-                }
+                {'$set': update},
+                return_document=ReturnDocument.BEFORE
             )
             
-            if result.modified_count > 0:
-                # Get vendor_id and update scores
-                review = await self.reviews_collection.find_one({'id': review_id})
-                if review:
-                    await self._update_review_analytics(review['vendor_id'])
-                    await self._calculate_quality_score(review['vendor_id'])
+            if before:
+                await self._apply_review_change(before['vendor_id'], before, {**before, **update})
                 return True
             
             return False
@@ -458,19 +590,29 @@ class EnhancedReviewService:
             logger.error(f"Error verifying review: {e}")
             return False
     
-    async def get_vendor_reviews(self, vendor_id: str, limit: int = 20, offset: int = 0) -> List[dict]:
-        """Get reviews for a vendor with pagination"""
+    async def get_vendor_reviews(
+        self, vendor_id: str, limit: int = 20, offset: int = 0, cursor: Optional[str] = None
+    ) -> List[dict]:
+        """Get reviews for a vendor with offset or keyset cursor pagination"""
+        after = decode_cursor(cursor, self.LISTING_SORT) if cursor else None
         try:
-            cursor = self.reviews_collection.find(
-                {'vendor_id': vendor_id, 'status': {'$ne': 'rejected'}}
-            ).sort('created_at', -1).skip(offset).limit(limit)
+            query = {'vendor_id': vendor_id, 'status': {'$ne': 'rejected'}}
+            if after:
+                query = keyset_query(query, self.LISTING_SORT, after)
+            
+            cursor = self.reviews_collection.find(query).sort(self.LISTING_SORT).skip(offset).limit(limit)
             
             reviews = await cursor.to_list(length=limit)
             
-            # Add customer names (if not anonymous)
+            # Add customer names (if not anonymous), fetched for the whole page at once
+            customers = await load_by_ids(
+                self.users_collection,
+                (review['customer_id'] for review in reviews if not review.get('anonymous', False)),
+                {'_id': 0, 'first_name': 1, 'last_name': 1}
+            )
             for review in reviews:
                 if not review.get('anonymous', False):
-                    customer = await self.users_collection.find_one({'id': review['customer_id']})
+                    customer = customers.get(review['customer_id'])
                     if customer:
                         review['customer_name'] = f"{customer.get('first_name', '')} {customer.get('last_name', '')}"
                 else:
@@ -505,49 +647,40 @@ class EnhancedReviewService:
     async def flag_review(self, review_id: str, reason: str) -> bool:
         """Flag a review for moderation"""
         try:
-            result = await self.reviews_collection.update_one(
+            now = datetime.utcnow()
+            update = {
+                'status': 'flagged',
+                'flag_reason': reason,
+                'flagged_at': now,
+                'updated_at': now
+            }
+            before = await self.reviews_collection.find_one_and_update(
                 {'id': review_id},
-                {
-                    '$set': {
-                        'status': 'flagged',
-                        'flag_reason': reason,
-                        'flagged_at': datetime.utcnow(),
-                        'updated_at': datetime.utcnow()
-                    }
-                }
+                {'$set': update},
+                return_document=ReturnDocument.BEFORE
             )
             
-            return result.modified_count > 0
+            if before:
+                # Flagged reviews stop counting towards the vendor's rating
+                await self._apply_review_change(before['vendor_id'], before, {**before, **update})
+                return True
+            
+            return False
             
         except Exception as e:
             logger.error(f"Error flagging review: {e}")
             return False
     
-    async def vote_helpful(self, review_id: str, helpful: bool) -> bool:
-        """Vote on review helpfulness"""
+    async def vote_helpful(self, review_id: str, helpful: bool, user_id: Optional[str] = None) -> bool:
+        """Vote on review helpfulness; counts are buffered and written in batches"""
         try:
-            if helpful:
-                result = await self.reviews_collection.update_one(
-                    {'id': review_id},
-                    {
-                        '$inc': {
-                            'helpful_votes': 1,
-                            'total_votes': 1
-                        },
-                        '$set': {'updated_at': datetime.utcnow()}
-                    }
-                )
-            else:
-                result = await self.reviews_collection.update_one(
-                    {'id': review_id},
-                    {
-                        '$inc': {'total_votes': 1},
-                        '$set': {'updated_at': datetime.utcnow()}
-                    }
-                )
-            
-            return result.modified_count > 0
+            return await helpful_vote_buffer.add(self.db, review_id, helpful, user_id)
             
         except Exception as e:
             logger.error(f"Error voting on review: {e}")
-            return False
\ No newline at end of file
+            return False
+
+async def _recompute_review_stats(db: AsyncIOMotorDatabase, vendor_id: str):
+    await EnhancedReviewService(db).recompute_review_stats(vendor_id)
+
+recompute_queue.register('review_stats', _recompute_review_stats)
@@ -1,3 +1,4 @@
+import asyncio
 import io
 import uuid
 import os
@@ -17,12 +18,16 @@ import logging
 
 from .supabase_client import get_supabase, get_bucket_name, get_public_url, get_optimized_url
 from .models import FileMetadata
+from .pagination import decode_cursor, keyset_query
 
 logger = logging.getLogger(__name__)
 
 class FileUploadService:
     """Service for handling file uploads with optimization and storage"""
     
+    # Newest first; cursors encode these fields of the last file on a page
+    LISTING_SORT = [("upload_date", -1), ("file_id", -1)]
+    
     # File type configurations
     ALLOWED_IMAGE_TYPES = ["image/jpeg", "image/png", "image/webp", "image/gif"]
     ALLOWED_VIDEO_TYPES = ["video/mp4", "video/avi", "video/mov", "video/webm"]
@@ -171,75 +176,108 @@ class FileUploadService:
         file_path = FileUploadService.generate_file_path(file.filename, file_category, user_id)
         
         try:
-            supabase = get_supabase()
-            bucket_name = get_bucket_name()
-            
             upload_content = contents
             optimization_metadata = {}
-            thumbnail_path = None
+            thumbnail_content = None
             
             # Optimize images
             if file_category == "image":
-                optimized_content, thumbnail_content, opt_metadata = await FileUploadService.optimize_image(contents)
-                upload_content = optimized_content
-                optimization_metadata = opt_metadata
-                
-                # Upload thumbnail
-                thumbnail_path = file_path.replace(f".{file_path.split('.')[-1]}", "_thumb.webp")
-                supabase.storage.from_(bucket_name).upload(
-                    path=thumbnail_path,
-                    file=thumbnail_content,
-                    file_options={"content-type": "image/webp"}
-                )
-            
-            # Upload main file
-            upload_response = supabase.storage.from_(bucket_name).upload(
-                path=file_path,
-                file=upload_content,
-                file_options={"content-type": mime_type if file_category != "image" else "image/webp"}
-            )
+                upload_content, thumbnail_content, optimization_metadata = await FileUploadService.optimize_image(contents)
             
-            # Create file metadata
-            file_id = str(uuid.uuid4())
-            file_metadata = FileMetadata(
-                file_id=file_id,
-                original_name=file.filename,
+            return await FileUploadService.store_file(
+                db,
                 file_path=file_path,
-                file_type=file_category,
+                original_name=file.filename,
+                file_category=file_category,
                 mime_type=mime_type,
-                size=len(upload_content),
+                content=upload_content,
                 original_size=file_size,
                 user_id=user_id,
-                tags=tags or [],
+                tags=tags,
                 optimization_metadata=optimization_metadata,
-                thumbnail_path=thumbnail_path,
-                upload_date=datetime.utcnow(),
-                **(metadata_extra or {})
+                thumbnail_content=thumbnail_content,
+                metadata_extra=metadata_extra
             )
             
-            # Save metadata to database
-            await db.file_uploads.insert_one(file_metadata.dict())
-            
-            # Generate URLs
-            public_url = get_public_url(file_path)
-            thumbnail_url = get_public_url(thumbnail_path) if thumbnail_path else None
-            
-            return {
-                "file_id": file_id,
-                "file_path": file_path,
-                "public_url": public_url,
-                "thumbnail_url": thumbnail_url,
-                "file_type": file_category,
-                "mime_type": mime_type,
-                "size": len(upload_content),
-                "original_size": file_size,
-                "optimization_metadata": optimization_metadata
-            }
-            
         except Exception as e:
             logger.error(f"File upload failed: {str(e)}")
             raise HTTPException(status_code=500, detail=f"File upload failed: {str(e)}")
     
+    @staticmethod
+    async def store_file(
+        db: AsyncIOMotorDatabase,
+        file_path: str,
+        original_name: str,
+        file_category: str,
+        mime_type: str,
+        content: bytes,
+        original_size: int,
+        user_id: str,
+        tags: List[str] = None,
+        optimization_metadata: Dict[str, Any] = None,
+        thumbnail_content: Optional[bytes] = None,
+        metadata_extra: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """Upload prepared content (and its thumbnail) to storage and record its metadata"""
+        supabase = get_supabase()
+        bucket_name = get_bucket_name()
+        stored_type = "image/webp" if file_category == "image" else mime_type
+        
+        # The storage client is synchronous; keep its network calls off the event loop
+        thumbnail_path = None
+        if thumbnail_content is not None:
+            thumbnail_path = file_path.replace(f".{file_path.split('.')[-1]}", "_thumb.webp")
+            await asyncio.to_thread(
+                supabase.storage.from_(bucket_name).upload,
+                path=thumbnail_path,
+                file=thumbnail_content,
+                file_options={"content-type": "image/webp"}
+            )
+        
+        await asyncio.to_thread(
+            supabase.storage.from_(bucket_name).upload,
+            path=file_path,
+            file=content,
+            file_options={"content-type": stored_type}
+        )
+        
+        # Create file metadata
+        file_id = str(uuid.uuid4())
+        file_metadata = FileMetadata(
+            file_id=file_id,
+            original_name=original_name,
+            file_path=file_path,
+            file_type=file_category,
+            mime_type=mime_type,
+            size=len(content),
+            original_size=original_size,
+            user_id=user_id,
+            tags=tags or [],
+            optimization_metadata=optimization_metadata or {},
+            thumbnail_path=thumbnail_path,
+            upload_date=datetime.utcnow(),
+            **(metadata_extra or {})
+        )
+        
+        # Save metadata to database
+        await db.file_uploads.insert_one(file_metadata.dict())
+        
+        # Generate URLs
+        public_url = get_public_url(file_path)
+        thumbnail_url = get_public_url(thumbnail_path) if thumbnail_path else None
+        
+        return {
+            "file_id": file_id,
+            "file_path": file_path,
+            "public_url": public_url,
+            "thumbnail_url": thumbnail_url,
+            "file_type": file_category,
+            "mime_type": mime_type,
+            "size": len(content),
+            "original_size": original_size,
+            "optimization_metadata": optimization_metadata or {}
+        }
+    
     @staticmethod
     async def delete_file(file_id: str, db: AsyncIOMotorDatabase) -> bool:
         """Delete file from storage and database"""
@@ -274,15 +312,19 @@ class FileUploadService:
         file_category: str,
         db: AsyncIOMotorDatabase,
         limit: int = 50,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        """Get files uploaded by a specific user"""
+        """Get files uploaded by a specific user, paged by offset or a keyset cursor"""
+        after = decode_cursor(cursor, FileUploadService.LISTING_SORT) if cursor else None
         try:
             query = {"user_id": user_id}
             if file_category:
                 query["file_type"] = file_category
+            if after:
+                query = keyset_query(query, FileUploadService.LISTING_SORT, after)
             
-            cursor = db.file_uploads.find(query).sort("upload_date", -1).skip(offset).limit(limit)
+            cursor = db.file_uploads.find(query).sort(FileUploadService.LISTING_SORT).skip(offset).limit(limit)
             files = await cursor.to_list(length=limit)
             
             # Add public URLs
@@ -0,0 +1,173 @@
+import logging
+from collections import defaultdict
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
+
+from .gazetteer import gazetteer, normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Words shorter than this are too ambiguous to correct
+MIN_WORD_LENGTH = 4
+
+def trigrams(word: str) -> Set[str]:
+    """Padded character trigrams, so word starts and ends carry extra weight"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def max_edits(word: str) -> int:
+    """Edit budget for a word: one typo for short words, two for longer ones"""
+    return 1 if len(word) <= 5 else 2
+
+def bounded_levenshtein(a: str, b: str, limit: int) -> Optional[int]:
+    """Levenshtein distance between a and b, or None once it must exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return None
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            )
+        if min(current) > limit:
+            return None
+        previous = current
+
+    return previous[-1] if previous[-1] <= limit else None
+
+class TrigramIndex:
+    """Trigram index over the words of vendor names and locations.
+
+    Fuzzy lookups only touch vocabulary words sharing trigrams with the query
+    word, never the vendor catalog itself. A word within ``d`` edits of the
+    query keeps all but at most ``3d`` of its trigrams, which prunes the
+    candidates before the bounded edit distance check. Gazetteer suburb and
+    region names are always in the vocabulary so misspelled places like
+    "Paramatta" can be corrected even before any vendor lists them.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self._static_terms: Set[str] = set()
+        self._gram_terms: Dict[str, Set[str]] = defaultdict(set)
+        self._term_vendors: Dict[str, Set[str]] = defaultdict(set)
+        self._vendor_terms: Dict[str, Set[str]] = {}
+        self.add_static_terms(
+            [place.suburb for place in gazetteer.places] + [place.region for place in gazetteer.places]
+        )
+
+    @staticmethod
+    def _words(texts: Iterable[Optional[str]]) -> Set[str]:
+        words = set()
+        for text in texts:
+            words.update(word for word in normalize_text(text).split() if len(word) >= MIN_WORD_LENGTH)
+        return words
+
+    @staticmethod
+    def _profile_texts(profile: Dict[str, Any]) -> List[Optional[str]]:
+        return [profile.get("business_name"), profile.get("location")] + list(profile.get("service_areas", []))
+
+    def _index_term(self, term: str):
+        for gram in trigrams(term):
+            self._gram_terms[gram].add(term)
+
+    def _unindex_term(self, term: str):
+        for gram in trigrams(term):
+            terms = self._gram_terms.get(gram)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self._gram_terms[gram]
+
+    def add_static_terms(self, texts: Iterable[str]):
+        """Vocabulary that isn't tied to a vendor (gazetteer place names)"""
+        for term in self._words(texts) - self._static_terms:
+            self._static_terms.add(term)
+            self._index_term(term)
+
+    def load(self, profiles: List[Dict[str, Any]]):
+        """Replace the vendor vocabulary with a full snapshot of vendor profiles"""
+        self._gram_terms = defaultdict(set)
+        self._term_vendors = defaultdict(set)
+        self._vendor_terms = {}
+        for term in self._static_terms:
+            self._index_term(term)
+        for profile in profiles:
+            self._add(profile)
+        self.ready = True
+
+    def _add(self, profile: Dict[str, Any]):
+        terms = self._words(self._profile_texts(profile))
+        for term in terms:
+            if term not in self._term_vendors and term not in self._static_terms:
+                self._index_term(term)
+            self._term_vendors[term].add(profile["id"])
+        self._vendor_terms[profile["id"]] = terms
+
+    def upsert(self, profile: Dict[str, Any]):
+        """Add or replace a vendor's vocabulary"""
+        self.remove(profile["id"])
+        self._add(profile)
+
+    def remove(self, vendor_id: str):
+        """Drop a vendor's vocabulary if present"""
+        for term in self._vendor_terms.pop(vendor_id, ()):
+            vendors = self._term_vendors.get(term)
+            if vendors is None:
+                continue
+            vendors.discard(vendor_id)
+            if not vendors:
+                del self._term_vendors[term]
+                if term not in self._static_terms:
+                    self._unindex_term(term)
+
+    def _known(self, word: str) -> bool:
+        return word in self._term_vendors or word in self._static_terms
+
+    def correct(self, word: str, limit: int = 3) -> List[Tuple[str, int]]:
+        """Vocabulary words within the edit budget of ``word``, closest first.
+
+        Ties prefer the most shared trigrams, then the word most vendors use.
+        """
+        word = normalize_text(word)
+        if self._known(word):
+            return [(word, 0)]
+        if len(word) < MIN_WORD_LENGTH:
+            return []
+
+        budget = max_edits(word)
+        grams = trigrams(word)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for term in self._gram_terms.get(gram, ()):
+                shared[term] += 1
+
+        minimum_shared = max(1, len(grams) - 3 * budget)
+        matches = []
+        for term, count in shared.items():
+            if count < minimum_shared:
+                continue
+            distance = bounded_levenshtein(word, term, budget)
+            if distance is not None:
+                matches.append((distance, -count, -len(self._term_vendors.get(term, ())), term))
+
+        matches.sort()
+        return [(term, distance) for distance, _, _, term in matches[:limit]]
+
+    def correct_text(self, text: Optional[str]) -> Optional[str]:
+        """Normalized text with each unknown word replaced by its best correction"""
+        words = normalize_text(text).split()
+        if not words:
+            return None
+
+        corrected = []
+        for word in words:
+            matches = self.correct(word, limit=1) if len(word) >= MIN_WORD_LENGTH else []
+            corrected.append(matches[0][0] if matches else word)
+        return " ".join(corrected)
+
+# Process-wide trigram index; place names are loaded immediately, vendor words with the search indexes
+fuzzy_index = TrigramIndex()
@@ -0,0 +1,261 @@
+import csv
+import logging
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import List, Dict, Any, NamedTuple, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_PATH = Path(__file__).parent / "data" / "au_gazetteer.csv"
+
+# Bump when the gazetteer data or tokenization rules change so stored
+# vendor location tokens are recomputed by the backfill job
+LOCATION_TOKENS_VERSION = 2
+
+# Longest phrase (in words) stored as a "term:" token
+MAX_TERM_WORDS = 4
+
+STATE_ALIASES = {
+    "nsw": "nsw", "new south wales": "nsw",
+    "vic": "vic", "victoria": "vic",
+    "qld": "qld", "queensland": "qld",
+    "wa": "wa", "western australia": "wa",
+    "sa": "sa", "south australia": "sa",
+    "tas": "tas", "tasmania": "tas",
+    "nt": "nt", "northern territory": "nt",
+    "act": "act", "australian capital territory": "act"
+}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_LAT_LNG = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+
+def normalize_text(text: Optional[str]) -> str:
+    """Lowercase and collapse everything except letters and digits to single spaces"""
+    if not text:
+        return ""
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+class Place(NamedTuple):
+    suburb: str
+    postcode: str
+    region: str
+    state: str
+    latitude: float
+    longitude: float
+
+class Gazetteer:
+    """Bundled Australian suburb/region/state lookup used to canonicalize locations.
+
+    Vendor locations and service areas are turned into exact-match tokens at
+    write time so searches can use an index instead of an unanchored regex:
+
+    - ``term:<phrase>`` for every 1-4 word phrase of the original text
+    - ``suburb:<state>:<suburb>``, ``region:<state>:<region>``, ``state:<state>``
+      and ``postcode:<postcode>`` for every place the text resolves to
+    """
+
+    def __init__(self, places: List[Place]):
+        self.places = places
+        self.suburbs: Dict[str, List[Place]] = defaultdict(list)
+        self.regions: Dict[str, Set[str]] = defaultdict(set)
+        self.postcodes: Dict[str, List[Place]] = defaultdict(list)
+
+        for place in places:
+            self.suburbs[normalize_text(place.suburb)].append(place)
+            self.regions[normalize_text(place.region)].add(place.state.lower())
+            self.postcodes[place.postcode].append(place)
+
+        self._max_phrase_words = max(
+            [len(name.split()) for name in list(self.suburbs) + list(self.regions) + list(STATE_ALIASES)] or [1]
+        )
+
+    @classmethod
+    def load(cls, path: Path = GAZETTEER_PATH) -> "Gazetteer":
+        places = []
+        try:
+            with open(path, newline="", encoding="utf-8") as handle:
+                for row in csv.DictReader(handle):
+                    places.append(Place(
+                        suburb=row["suburb"],
+                        postcode=row["postcode"],
+                        region=row["region"],
+                        state=row["state"],
+                        latitude=float(row["latitude"]),
+                        longitude=float(row["longitude"])
+                    ))
+        except Exception as e:
+            logger.error(f"Failed to load gazetteer from {path}: {str(e)}")
+        return cls(places)
+
+    def _scan(self, words: List[str]) -> Dict[str, Any]:
+        """Greedy longest-phrase scan for suburbs, regions, states and postcodes"""
+        found = {"suburbs": [], "regions": [], "states": set(), "postcodes": [], "unmatched": []}
+        i = 0
+        while i < len(words):
+            for size in range(min(self._max_phrase_words, len(words) - i), 0, -1):
+                phrase = " ".join(words[i:i + size])
+                if phrase in self.suburbs:
+                    found["suburbs"].append(phrase)
+                elif phrase in self.regions:
+                    found["regions"].append(phrase)
+                elif phrase in STATE_ALIASES:
+                    found["states"].add(STATE_ALIASES[phrase])
+                elif size == 1 and phrase in self.postcodes:
+                    found["postcodes"].append(phrase)
+                else:
+                    continue
+                i += size
+                break
+            else:
+                found["unmatched"].append(words[i])
+                i += 1
+        return found
+
+    def _resolve_places(self, found: Dict[str, Any]) -> List[Place]:
+        """Suburb and postcode matches, narrowed to any state named alongside them"""
+        places = []
+        for name in found["suburbs"]:
+            places.extend(self.suburbs[name])
+        for postcode in found["postcodes"]:
+            places.extend(self.postcodes[postcode])
+
+        states = found["states"]
+        if states:
+            places = [place for place in places if place.state.lower() in states]
+        return places
+
+    @staticmethod
+    def _place_tokens(place: Place) -> List[str]:
+        state = place.state.lower()
+        return [
+            f"suburb:{state}:{normalize_text(place.suburb)}",
+            f"region:{state}:{normalize_text(place.region)}",
+            f"state:{state}",
+            f"postcode:{place.postcode}"
+        ]
+
+    def _region_tokens(self, region: str, states: Set[str]) -> List[str]:
+        region_states = self.regions[region]
+        if states:
+            region_states = region_states & states
+        tokens = []
+        for state in region_states:
+            tokens.extend([f"region:{state}:{region}", f"state:{state}"])
+        return tokens
+
+    def location_tokens(self, location: Optional[str], service_areas: Optional[List[str]] = None) -> List[str]:
+        """Canonical tokens for a vendor's location and service areas"""
+        tokens = set()
+        for text in [location] + list(service_areas or []):
+            words = normalize_text(text).split()
+            if not words:
+                continue
+
+            for size in range(1, MAX_TERM_WORDS + 1):
+                for i in range(len(words) - size + 1):
+                    tokens.add("term:" + " ".join(words[i:i + size]))
+
+            found = self._scan(words)
+            for place in self._resolve_places(found):
+                tokens.update(self._place_tokens(place))
+            for region in found["regions"]:
+                tokens.update(self._region_tokens(region, found["states"]))
+            for state in found["states"]:
+                tokens.add(f"state:{state}")
+
+        return sorted(tokens)
+
+    def query_tokens(self, query: Optional[str]) -> List[str]:
+        """Tokens that match a location search, or [] if the query isn't a known place.
+
+        A known place matches vendors whose text contains the same phrase
+        (what the old regex matched) plus vendors the gazetteer places inside
+        it, e.g. "Sydney" also matches a vendor located in "Bondi".
+        """
+        words = normalize_text(query).split()
+        if not words:
+            return []
+
+        found = self._scan(words)
+        if found["unmatched"]:
+            return []
+
+        tokens = set()
+        if len(words) <= MAX_TERM_WORDS:
+            tokens.add("term:" + " ".join(words))
+
+        states = found["states"]
+        for name in found["suburbs"]:
+            if name in self.regions:
+                # City names double as their metro region; search the region
+                tokens.update(t for t in self._region_tokens(name, states) if t.startswith("region:"))
+                continue
+            for place in self.suburbs[name]:
+                if not states or place.state.lower() in states:
+                    tokens.add(f"suburb:{place.state.lower()}:{name}")
+        for region in found["regions"]:
+            tokens.update(t for t in self._region_tokens(region, states) if t.startswith("region:"))
+        for postcode in found["postcodes"]:
+            tokens.add(f"postcode:{postcode}")
+
+        if states and not (found["suburbs"] or found["regions"] or found["postcodes"]):
+            tokens.update(f"state:{state}" for state in states)
+
+        return sorted(tokens)
+
+    def geocode(self, text: Optional[str]) -> Optional[Tuple[float, float]]:
+        """Approximate (latitude, longitude) for a place name, postcode or "lat,lng" string.
+
+        Suburbs and postcodes resolve to their centroid, regions to the mean of
+        their suburbs. A bare state is too coarse to geocode and returns None.
+        """
+        if not text:
+            return None
+
+        coordinates = _LAT_LNG.match(text)
+        if coordinates:
+            latitude, longitude = float(coordinates.group(1)), float(coordinates.group(2))
+            if -90 <= latitude <= 90 and -180 <= longitude <= 180:
+                return latitude, longitude
+            return None
+
+        found = self._scan(normalize_text(text).split())
+        places = self._resolve_places(found)
+        if not places:
+            states = found["states"]
+            for region in found["regions"]:
+                places = [
+                    place for place in self.places
+                    if normalize_text(place.region) == region and (not states or place.state.lower() in states)
+                ]
+                if places:
+                    break
+            if not places:
+                return None
+            return (
+                sum(place.latitude for place in places) / len(places),
+                sum(place.longitude for place in places) / len(places)
+            )
+
+        # Ambiguous names (e.g. Paddington NSW/QLD) take the first listed place
+        return places[0].latitude, places[0].longitude
+
+    @staticmethod
+    def geo_point(coordinates: Optional[Tuple[float, float]]) -> Optional[Dict[str, Any]]:
+        """GeoJSON point for a (latitude, longitude) pair"""
+        if coordinates is None:
+            return None
+        latitude, longitude = coordinates
+        return {"type": "Point", "coordinates": [longitude, latitude]}
+
+    def location_fields(self, location: Optional[str], service_areas: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Denormalized location fields stored on a vendor profile document"""
+        return {
+            "location_tokens": self.location_tokens(location, service_areas),
+            "location_tokens_version": LOCATION_TOKENS_VERSION,
+            "geo": self.geo_point(self.geocode(location))
+        }
+
+# Process-wide gazetteer loaded from the bundled data file
+gazetteer = Gazetteer.load()
@@ -447,6 +447,17 @@ class VendorAvailability(BaseModel):
     pricing_tier: str = "standard"  # standard, peak, off_peak
     notes: Optional[str] = None
 
+# Stored form of availability: a run of consecutive days with the same settings
+class VendorAvailabilityInterval(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    vendor_id: str
+    start_date: datetime  # First day, at midnight
+    end_date: datetime  # Last day (inclusive), at midnight
+    is_available: bool = True
+    is_booked: bool = False
+    pricing_tier: str = "standard"
+    notes: Optional[str] = None
+
 class SeasonalPricing(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     vendor_id: str
@@ -503,15 +514,27 @@ class FileMetadata(BaseModel):
     upload_date: datetime = Field(default_factory=datetime.utcnow)
 
 # Phase 3: Search Enhancement Models
+class AvailabilityMatch(str, Enum):
+    ALL = "all"  # Free on every requested date
+    ANY = "any"  # Free on at least one of them
+
 class SearchFilter(BaseModel):
+    q: Optional[str] = None  # Keywords matched against names, descriptions and packages
     location: Optional[str] = None
     category: Optional[str] = None
     price_min: Optional[float] = None
     price_max: Optional[float] = None
     availability_date: Optional[datetime] = None
+    availability_dates: List[datetime] = []  # Combined with availability_date
+    availability_match: AvailabilityMatch = AvailabilityMatch.ALL
     rating_min: Optional[float] = None
     style_tags: List[str] = []
     verified_only: bool = False
+    near: Optional[str] = None  # Venue suburb, postcode or "lat,lng"
+    radius_km: Optional[float] = Field(default=None, gt=0, le=500)
+    quote_date: Optional[datetime] = None  # Price packages for this date; defaults to a single availability date
+    guest_count: Optional[int] = Field(default=None, gt=0)
+    sort_by_quote: bool = False  # Cheapest package price first
 
 class WishlistItem(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
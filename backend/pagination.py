@@ -0,0 +1,62 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+# A sort specification: Mongo-style (field, direction) pairs ending in a unique field
+SortSpec = List[Tuple[str, int]]
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    return value
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "$dt" in value:
+        return datetime.fromisoformat(value["$dt"])
+    return value
+
+def encode_cursor(sort: SortSpec, values: Sequence[Any]) -> str:
+    """Opaque token holding the sort key of the last item on a page"""
+    payload = {"s": [field for field, _ in sort], "v": [_encode_value(value) for value in values]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token: str, sort: SortSpec) -> List[Any]:
+    """Sort key values from a cursor token; raises ValueError if it is malformed or for another sort"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        fields, values = payload["s"], payload["v"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+
+    if fields != [field for field, _ in sort] or len(values) != len(sort):
+        raise ValueError("Cursor does not match this listing")
+    return [_decode_value(value) for value in values]
+
+def cursor_for(item: Dict[str, Any], sort: SortSpec) -> str:
+    """Cursor pointing just past ``item``"""
+    return encode_cursor(sort, [item.get(field) for field, _ in sort])
+
+def next_cursor(items: List[Dict[str, Any]], sort: SortSpec, limit: int) -> Optional[str]:
+    """Cursor for the following page, or None when this page wasn't full"""
+    if not items or len(items) < limit:
+        return None
+    return cursor_for(items[-1], sort)
+
+def keyset_query(query: Dict[str, Any], sort: SortSpec, values: Sequence[Any]) -> Dict[str, Any]:
+    """Restrict ``query`` to items strictly after ``values`` in ``sort`` order.
+
+    Expands to ``(a < x) or (a == x and b < y) or ...`` so the sort index
+    seeks straight to the page instead of skipping over earlier items.
+    """
+    clauses = []
+    for position, (field, direction) in enumerate(sort):
+        clause = {prefix_field: values[i] for i, (prefix_field, _) in enumerate(sort[:position])}
+        clause[field] = {"$lt" if direction < 0 else "$gt": values[position]}
+        clauses.append(clause)
+
+    after = {"$or": clauses}
+    return {"$and": [query, after]} if query else after
@@ -5,6 +5,12 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from .models import *
+from .search_service import TrendingService
+from .search_indexes import refresh_vendor, refresh_vendor_availability
+from .availability_store import day_start, day_state, expand_intervals, write_availability
+from .pricing_engine import price_engine_for
+from .recompute_queue import recompute_queue
+from .review_buckets import ReviewBucketService
 import logging
 import random
 
@@ -37,9 +43,16 @@ class ReviewService:
             )
             
             await db.vendor_reviews.insert_one(review.dict())
+            await ReviewBucketService.record_review(
+                db, "vendor_reviews", review.vendor_id, review.created_at, review.overall_rating
+            )
+            
+            # Rating and trust score are recomputed off the request path; the
+            # rating recompute queues the trust score once the new rating is written
+            recompute_queue.mark("vendor_rating", review_data.vendor_id)
             
-            # Update vendor's average rating
-            await ReviewService._update_vendor_rating(db, review_data.vendor_id)
+            # Feed the trending leaderboard
+            await TrendingService.record_review(db, review_data.vendor_id)
             
             return review
             
@@ -77,6 +90,10 @@ class ReviewService:
                         }
                     }
                 )
+                await refresh_vendor(db, vendor_id)
+            
+            # The trust score reads average_rating, so it runs after this write
+            recompute_queue.mark("trust_score", vendor_id)
                 
         except Exception as e:
             logger.error(f"Failed to update vendor rating: {str(e)}")
@@ -94,6 +111,31 @@ class ReviewService:
 class TrustScoreService:
     """Service for calculating and managing vendor trust scores"""
     
+    # Reviews newer than this count towards the recent reviews score
+    RECENT_REVIEW_DAYS = 180
+    # Stored scores older than this are queued for recalculation on read; analytics,
+    # profile completeness and the recent review window change without queueing one
+    STORED_SCORE_TTL = timedelta(hours=1)
+    
+    @staticmethod
+    async def get_stored_trust_score(db: AsyncIOMotorDatabase, vendor_id: str) -> Optional[VendorTrustScore]:
+        """Stored trust score, queueing a recalculation when it is stale"""
+        stored = await db.vendor_trust_scores.find_one({"vendor_id": vendor_id}, {"_id": 0})
+        if not stored:
+            return None
+        calculated_at = stored.get("last_calculated")
+        if not calculated_at or datetime.utcnow() - calculated_at >= TrustScoreService.STORED_SCORE_TTL:
+            recompute_queue.mark("trust_score", vendor_id)
+        return VendorTrustScore(**stored)
+    
+    @staticmethod
+    async def get_trust_score(db: AsyncIOMotorDatabase, vendor_id: str) -> VendorTrustScore:
+        """Stored trust score, stale or not; only a vendor never scored is calculated inline"""
+        stored = await TrustScoreService.get_stored_trust_score(db, vendor_id)
+        if stored is not None:
+            return stored
+        return await TrustScoreService.calculate_trust_score(db, vendor_id)
+    
     @staticmethod
     async def calculate_trust_score(db: AsyncIOMotorDatabase, vendor_id: str) -> VendorTrustScore:
         """Calculate comprehensive trust score for a vendor"""
@@ -105,13 +147,16 @@ class TrustScoreService:
             # Get vendor analytics
             analytics = await db.vendor_analytics.find_one({"vendor_id": vendor_id})
             
-            # Get reviews
-            reviews = await db.vendor_reviews.find({"vendor_id": vendor_id}).to_list(100)
+            # Review volume (thresholds top out at 100) and recent reviews from daily buckets
+            review_count = await db.vendor_reviews.count_documents({"vendor_id": vendor_id}, limit=100)
+            recent = await ReviewBucketService.window(
+                db, "vendor_reviews", vendor_id, TrustScoreService.RECENT_REVIEW_DAYS
+            )
             
             # Calculate component scores
             verification_score = TrustScoreService._calculate_verification_score(vendor)
             performance_score = TrustScoreService._calculate_performance_score(analytics, vendor)
-            satisfaction_score = TrustScoreService._calculate_satisfaction_score(reviews, vendor)
+            satisfaction_score = TrustScoreService._calculate_satisfaction_score(review_count, recent["count"], vendor)
             
             # Calculate overall score (weighted average)
             overall_score = (
@@ -121,7 +166,7 @@ class TrustScoreService:
             )
             
             # Determine badges
-            badges = TrustScoreService._determine_badges(vendor, analytics, reviews)
+            badges = TrustScoreService._determine_badges(vendor, analytics, review_count)
             
             trust_score = VendorTrustScore(
                 vendor_id=vendor_id,
@@ -208,9 +253,9 @@ class TrustScoreService:
         return min(score, 100)
     
     @staticmethod
-    def _calculate_satisfaction_score(reviews: List[dict], vendor: dict) -> float:
+    def _calculate_satisfaction_score(review_count: int, recent_review_count: int, vendor: dict) -> float:
         """Calculate customer satisfaction score"""
-        if not reviews:
+        if not review_count:
             return 70  # Default score for vendors without reviews
         
         # Average rating score (0-60 points)
@@ -218,7 +263,6 @@ class TrustScoreService:
         rating_score = (avg_rating / 5) * 60
         
         # Review count score (0-20 points)
-        review_count = len(reviews)
         if review_count >= 20:
             count_score = 20
         elif review_count >= 10:
@@ -229,13 +273,12 @@ class TrustScoreService:
             count_score = review_count * 2
         
         # Recent reviews score (0-20 points)
-        recent_reviews = [r for r in reviews if (datetime.utcnow() - r["created_at"]).days <= 180]
-        recent_score = min(len(recent_reviews) * 2, 20)
+        recent_score = min(recent_review_count * 2, 20)
         
         return min(rating_score + count_score + recent_score, 100)
     
     @staticmethod
-    def _determine_badges(vendor: dict, analytics: dict, reviews: List[dict]) -> List[TrustBadge]:
+    def _determine_badges(vendor: dict, analytics: dict, review_count: int) -> List[TrustBadge]:
         """Determine which badges a vendor should have"""
         badges = []
         
@@ -248,17 +291,20 @@ class TrustScoreService:
         if vendor.get("average_rating", 0) >= 4.8:
             badges.append(TrustBadge.HIGHLY_RATED)
         
-        if len(reviews) >= 50:
+        if review_count >= 50:
             badges.append(TrustBadge.WEDDING_SPECIALIST)
         
         # Platform recommended (top 10% performers)
         if (vendor.get("average_rating", 0) >= 4.5 and 
-            len(reviews) >= 10 and 
+            review_count >= 10 and 
             analytics and analytics.get("response_time_avg_hours", 24) <= 8):
             badges.append(TrustBadge.PLATFORM_RECOMMENDED)
         
         return badges
 
+recompute_queue.register("vendor_rating", ReviewService._update_vendor_rating)
+recompute_queue.register("trust_score", TrustScoreService.calculate_trust_score)
+
 class SeatingChartService:
     """Service for managing wedding seating charts"""
     
@@ -420,20 +466,12 @@ class VendorCalendarService:
     async def set_availability(db: AsyncIOMotorDatabase, vendor_id: str, availability_data: List[dict]) -> bool:
         """Set vendor availability for multiple dates"""
         try:
-            # Remove existing availability for the dates
-            dates = [item["date"] for item in availability_data]
-            await db.vendor_availability.delete_many({
-                "vendor_id": vendor_id,
-                "date": {"$in": dates}
-            })
+            records = [VendorAvailability(vendor_id=vendor_id, **data) for data in availability_data]
+            updates = {record.date.date(): day_state(record.dict()) for record in records}
             
-            # Insert new availability records
-            availability_records = [
-                VendorAvailability(vendor_id=vendor_id, **data).dict()
-                for data in availability_data
-            ]
-            
-            await db.vendor_availability.insert_many(availability_records)
+            # Merged into date intervals and written as a single bulk diff
+            await write_availability(db, vendor_id, updates)
+            await refresh_vendor_availability(db, vendor_id)
             return True
             
         except Exception as e:
@@ -444,12 +482,13 @@ class VendorCalendarService:
     async def get_availability(db: AsyncIOMotorDatabase, vendor_id: str, start_date: datetime, end_date: datetime) -> List[VendorAvailability]:
         """Get vendor availability for a date range"""
         try:
-            availability = await db.vendor_availability.find({
+            intervals = await db.vendor_availability_intervals.find({
                 "vendor_id": vendor_id,
-                "date": {"$gte": start_date, "$lte": end_date}
-            }).to_list(1000)
+                "start_date": {"$lte": end_date},
+                "end_date": {"$gte": day_start(start_date)}
+            }).to_list(length=None)
             
-            return [VendorAvailability(**record) for record in availability]
+            return list(expand_intervals(intervals, start_date, end_date))
             
         except Exception as e:
             logger.error(f"Failed to get vendor availability: {str(e)}")
@@ -458,6 +497,24 @@ class VendorCalendarService:
 class DecisionSupportService:
     """Service for vendor comparison and budget optimization"""
     
+    @staticmethod
+    async def quote_vendors(db: AsyncIOMotorDatabase, vendor_ids: List[str], event_date: datetime, guest_count: Optional[int] = None) -> Dict[str, Any]:
+        """Date-aware package prices for compared vendors, priced together rather than per vendor"""
+        try:
+            engine = await price_engine_for(db, vendor_ids)
+            quotes = engine.quotes(event_date, vendor_ids, guest_count)
+            return {
+                vendor_id: {
+                    "cheapest": quotes[vendor_id][0] if quotes.get(vendor_id) else None,
+                    "packages": quotes.get(vendor_id, [])
+                }
+                for vendor_id in vendor_ids
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to quote vendors: {str(e)}")
+            return {}
+    
     @staticmethod
     async def create_vendor_comparison(db: AsyncIOMotorDatabase, couple_id: str, vendor_ids: List[str]) -> VendorComparison:
         """Create a vendor comparison"""
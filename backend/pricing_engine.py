@@ -0,0 +1,311 @@
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def _ordinal(value: Any) -> int:
+    return (value.date() if isinstance(value, datetime) else value).toordinal()
+
+class IntervalTree:
+    """Static centered interval tree over inclusive integer ranges.
+
+    Each node keeps the intervals containing its center sorted by start and
+    by end, so a stabbing query walks one root-to-leaf path and only scans
+    intervals that actually contain the point (plus one per node).
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[int, int, Any]]):
+        self._root = self._build(list(intervals))
+
+    @classmethod
+    def _build(cls, intervals: List[Tuple[int, int, Any]]) -> Optional[tuple]:
+        if not intervals:
+            return None
+        points = sorted(point for start, end, _ in intervals for point in (start, end))
+        center = points[len(points) // 2]
+
+        left, right, overlapping = [], [], []
+        for interval in intervals:
+            if interval[1] < center:
+                left.append(interval)
+            elif interval[0] > center:
+                right.append(interval)
+            else:
+                overlapping.append(interval)
+
+        by_start = sorted(overlapping, key=lambda interval: interval[0])
+        by_end = sorted(overlapping, key=lambda interval: -interval[1])
+        return center, by_start, by_end, cls._build(left), cls._build(right)
+
+    def stab(self, point: int) -> List[Any]:
+        """Values of every interval containing ``point``"""
+        found = []
+        node = self._root
+        while node is not None:
+            center, by_start, by_end, left, right = node
+            if point < center:
+                for start, _, value in by_start:
+                    if start > point:
+                        break
+                    found.append(value)
+                node = left
+            elif point > center:
+                for _, end, value in by_end:
+                    if end < point:
+                        break
+                    found.append(value)
+                node = right
+            else:
+                found.extend(value for _, _, value in by_start)
+                break
+        return found
+
+class PriceEngine:
+    """Date-aware package prices across the catalog.
+
+    Seasonal pricing ranges live in an interval tree keyed by day, so the
+    seasons in effect on a date are found with one stabbing query for every
+    vendor at once. Packages are held as parallel numpy arrays (owning
+    vendor, base price, guest capacity); a quote multiplies base prices by
+    each vendor's multiplier for the day and reduces to the cheapest
+    eligible package per vendor without touching the database. When a
+    vendor has overlapping seasons, the narrowest one applies (so "Christmas
+    week" overrides "Summer").
+
+    A vendor edit rewrites that vendor's package rows in place (freed rows
+    are masked out) and moves its seasons to a small overlay scanned beside
+    the tree. The arrays are compacted and the tree rebuilt only once enough
+    edits have piled up.
+    """
+
+    # Rebuild the interval tree once this many vendors' seasons sit in the overlay
+    SEASON_OVERLAY_LIMIT = 64
+    # Compact the package arrays once this share of rows is freed
+    MAX_FREE_ROW_RATIO = 0.25
+
+    def __init__(self):
+        self.ready = False
+        self._packages: Dict[str, List[Dict[str, Any]]] = {}
+        self._seasons: Dict[str, List[Dict[str, Any]]] = {}
+        self._compiled = False
+
+    def __len__(self) -> int:
+        return sum(len(packages) for packages in self._packages.values())
+
+    def load(self, packages: Iterable[Dict[str, Any]], seasons: Iterable[Dict[str, Any]]):
+        """Replace the engine contents with every package and seasonal pricing range"""
+        self._packages = defaultdict(list)
+        self._seasons = defaultdict(list)
+        for package in packages:
+            self._packages[package["vendor_id"]].append(package)
+        for season in seasons:
+            self._seasons[season["vendor_id"]].append(season)
+        self._compiled = False
+        self.ready = True
+
+    def upsert_vendor(self, vendor_id: str, packages: List[Dict[str, Any]], seasons: List[Dict[str, Any]]):
+        """Replace one vendor's packages and seasons"""
+        self._packages[vendor_id] = list(packages)
+        self._seasons[vendor_id] = list(seasons)
+        self._update_vendor(vendor_id)
+
+    def remove_vendor(self, vendor_id: str):
+        self._packages.pop(vendor_id, None)
+        self._seasons.pop(vendor_id, None)
+        self._update_vendor(vendor_id)
+
+    def _compile(self):
+        """Rebuild the arrays and interval tree after a load; deferred to the next quote"""
+        if self._compiled:
+            return
+        self._vendor_ids = sorted(self._packages.keys() | self._seasons.keys())
+        self._vendor_rows = {vendor_id: row for row, vendor_id in enumerate(self._vendor_ids)}
+
+        packages = [package for vendor_id in self._vendor_ids for package in self._packages.get(vendor_id, [])]
+        self._package_list: List[Optional[Dict[str, Any]]] = packages
+        self._package_rows = {package["id"]: position for position, package in enumerate(packages)}
+        self._vendor_positions: Dict[str, List[int]] = defaultdict(list)
+        for position, package in enumerate(packages):
+            self._vendor_positions[package["vendor_id"]].append(position)
+        self._package_vendor = np.array([self._vendor_rows[p["vendor_id"]] for p in packages], dtype=np.int64)
+        self._base_prices = np.array([p.get("base_price") or 0.0 for p in packages], dtype=np.float64)
+        self._max_guests = np.array([self._capacity(p) for p in packages], dtype=np.float64)
+        self._live = np.ones(len(packages), dtype=bool)
+        self._free_rows: List[int] = []
+
+        self._build_tree()
+        self._compiled = True
+
+    def _build_tree(self):
+        self._tree = IntervalTree(
+            (_ordinal(season["start_date"]), _ordinal(season["end_date"]), season)
+            for seasons in self._seasons.values()
+            for season in seasons
+        )
+        # Vendors whose seasons changed since the tree was built
+        self._overlay_vendors: Set[str] = set()
+
+    @staticmethod
+    def _capacity(package: Dict[str, Any]) -> float:
+        return package["max_guests"] if package.get("max_guests") is not None else np.inf
+
+    def _update_vendor(self, vendor_id: str):
+        """Rewrite one vendor's package rows in place after an edit"""
+        if not self._compiled:
+            return
+
+        row = self._vendor_rows.get(vendor_id)
+        if row is None:
+            row = self._vendor_rows[vendor_id] = len(self._vendor_ids)
+            self._vendor_ids.append(vendor_id)
+
+        positions = self._vendor_positions.pop(vendor_id, [])
+        for position in positions:
+            self._package_rows.pop(self._package_list[position]["id"], None)
+            self._package_list[position] = None
+        self._live[positions] = False
+        self._free_rows.extend(positions)
+
+        packages = self._packages.get(vendor_id, [])
+        grow = len(packages) - len(self._free_rows)
+        if grow > 0:
+            start = len(self._package_list)
+            self._package_list.extend([None] * grow)
+            self._package_vendor = np.concatenate([self._package_vendor, np.zeros(grow, dtype=np.int64)])
+            self._base_prices = np.concatenate([self._base_prices, np.zeros(grow, dtype=np.float64)])
+            self._max_guests = np.concatenate([self._max_guests, np.zeros(grow, dtype=np.float64)])
+            self._live = np.concatenate([self._live, np.zeros(grow, dtype=bool)])
+            self._free_rows.extend(range(start, start + grow))
+
+        for package in packages:
+            position = self._free_rows.pop()
+            self._package_list[position] = package
+            self._package_rows[package["id"]] = position
+            self._package_vendor[position] = row
+            self._base_prices[position] = package.get("base_price") or 0.0
+            self._max_guests[position] = self._capacity(package)
+            self._live[position] = True
+            self._vendor_positions[vendor_id].append(position)
+
+        self._overlay_vendors.add(vendor_id)
+        if len(self._free_rows) > len(self._package_list) * self.MAX_FREE_ROW_RATIO:
+            self._compiled = False
+        elif len(self._overlay_vendors) > self.SEASON_OVERLAY_LIMIT:
+            self._build_tree()
+
+    def _day_seasons(self, day: Any) -> Dict[int, Dict[str, Any]]:
+        """Season in effect on ``day`` for each vendor row that has one"""
+        point = _ordinal(day)
+        in_effect = [season for season in self._tree.stab(point) if season["vendor_id"] not in self._overlay_vendors]
+        for vendor_id in self._overlay_vendors:
+            in_effect.extend(
+                season for season in self._seasons.get(vendor_id, ())
+                if _ordinal(season["start_date"]) <= point <= _ordinal(season["end_date"])
+            )
+
+        applied = {}
+        for season in in_effect:
+            row = self._vendor_rows[season["vendor_id"]]
+            span = _ordinal(season["end_date"]) - _ordinal(season["start_date"])
+            current = applied.get(row)
+            if current is None or span < _ordinal(current["end_date"]) - _ordinal(current["start_date"]):
+                applied[row] = season
+        return applied
+
+    def _day_prices(self, day: Any) -> Tuple[np.ndarray, np.ndarray, Dict[int, Dict[str, Any]]]:
+        """(price per package, multiplier per vendor row, applied seasons) on ``day``"""
+        self._compile()
+        seasons = self._day_seasons(day)
+        multipliers = np.ones(len(self._vendor_ids), dtype=np.float64)
+        for row, season in seasons.items():
+            multipliers[row] = season.get("price_multiplier", 1.0)
+        return self._base_prices * multipliers[self._package_vendor], multipliers, seasons
+
+    def _quote(self, position: int, prices: np.ndarray, multipliers: np.ndarray, seasons: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+        package = self._package_list[position]
+        row = self._package_vendor[position]
+        season = seasons.get(row)
+        return {
+            "vendor_id": package["vendor_id"],
+            "package_id": package["id"],
+            "package_name": package.get("name"),
+            "base_price": float(self._base_prices[position]),
+            "price_multiplier": float(multipliers[row]),
+            "season": season.get("season_name") if season else None,
+            "price": round(float(prices[position]), 2)
+        }
+
+    def quote_package(self, package_id: str, day: Any) -> Optional[Dict[str, Any]]:
+        """Price of one package on ``day``"""
+        self._compile()
+        position = self._package_rows.get(package_id)
+        if position is None:
+            return None
+        return self._quote(position, *self._day_prices(day))
+
+    def _eligible(self, vendor_ids: Optional[Iterable[str]], guests: Optional[int]) -> np.ndarray:
+        eligible = self._live.copy()
+        if vendor_ids is not None:
+            rows = [self._vendor_rows[v] for v in vendor_ids if v in self._vendor_rows]
+            wanted = np.zeros(len(self._vendor_ids), dtype=bool)
+            wanted[rows] = True
+            eligible &= wanted[self._package_vendor]
+        if guests:
+            eligible &= self._max_guests >= guests
+        return eligible
+
+    def cheapest(
+        self,
+        day: Any,
+        vendor_ids: Optional[Iterable[str]] = None,
+        guests: Optional[int] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Cheapest package per vendor on ``day`` that fits ``guests`` (all vendors when vendor_ids is None)"""
+        prices, multipliers, seasons = self._day_prices(day)
+        positions = np.flatnonzero(self._eligible(vendor_ids, guests))
+        if not len(positions):
+            return {}
+
+        # Sort by (vendor, price); the first package of each vendor run is its cheapest
+        order = positions[np.lexsort((prices[positions], self._package_vendor[positions]))]
+        _, firsts = np.unique(self._package_vendor[order], return_index=True)
+        return {
+            self._package_list[position]["vendor_id"]: self._quote(position, prices, multipliers, seasons)
+            for position in order[firsts].tolist()
+        }
+
+    def quotes(
+        self,
+        day: Any,
+        vendor_ids: Iterable[str],
+        guests: Optional[int] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Every eligible package per vendor on ``day``, cheapest first"""
+        prices, multipliers, seasons = self._day_prices(day)
+        positions = np.flatnonzero(self._eligible(vendor_ids, guests))
+        quotes = defaultdict(list)
+        for position in positions[np.argsort(prices[positions], kind="stable")].tolist():
+            quote = self._quote(position, prices, multipliers, seasons)
+            quotes[quote["vendor_id"]].append(quote)
+        return quotes
+
+async def price_engine_for(db: AsyncIOMotorDatabase, vendor_ids: Optional[List[str]]) -> PriceEngine:
+    """The process-wide engine when loaded, else one built for ``vendor_ids`` from two queries"""
+    if price_engine.ready:
+        return price_engine
+
+    query = {"vendor_id": {"$in": vendor_ids}} if vendor_ids is not None else {}
+    engine = PriceEngine()
+    engine.load(
+        await db.vendor_packages.find(query, {"_id": 0}).to_list(length=None),
+        await db.seasonal_pricing.find(query, {"_id": 0}).to_list(length=None)
+    )
+    return engine
+
+# Process-wide price engine, populated at startup alongside the search indexes
+price_engine = PriceEngine()
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Awaitable, Callable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+class RecommendationCache:
+    """Per-couple recommendations, computed off the request path.
+
+    Entries are kept in an LRU bounded by ``max_entries``. A couple's entry
+    goes stale when they view or wishlist a vendor or edit their preferences,
+    or once it is older than the TTL; stale entries are still served while a
+    background task recomputes them. A couple with no entry gets ``None``
+    until the first computation lands, so callers can serve a fallback. Invalidation is per
+    process, so the TTL bounds staleness from writes handled by other workers.
+    """
+
+    def __init__(self, max_entries: int = 5000, ttl_seconds: int = 900):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._stale: Set[str] = set()
+        self._pending: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Cached recommendations (possibly stale), or None"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        self._entries.move_to_end(user_id)
+        return entry[1]
+
+    def is_fresh(self, user_id: str) -> bool:
+        entry = self._entries.get(user_id)
+        return (
+            entry is not None
+            and user_id not in self._stale
+            and time.monotonic() - entry[0] <= self.ttl_seconds
+        )
+
+    def set(self, user_id: str, recommendations: List[Dict[str, Any]]):
+        self._entries[user_id] = (time.monotonic(), recommendations)
+        self._entries.move_to_end(user_id)
+        self._stale.discard(user_id)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._stale.discard(evicted)
+
+    def invalidate(self, user_id: str):
+        """Mark a couple's recommendations for recomputation"""
+        if user_id in self._entries or user_id in self._pending:
+            self._stale.add(user_id)
+
+    def refresh(self, user_id: str, compute: Callable[[], Awaitable[List[Dict[str, Any]]]]):
+        """Recompute a couple's recommendations in the background unless already underway"""
+        if user_id in self._pending:
+            return
+        self._stale.discard(user_id)
+        task = asyncio.create_task(self._run(user_id, compute))
+        self._pending[user_id] = task
+
+    async def _run(self, user_id: str, compute: Callable[[], Awaitable[List[Dict[str, Any]]]]):
+        try:
+            recommendations = await compute()
+            # A write during the computation leaves the result stale again
+            stale = user_id in self._stale
+            self.set(user_id, recommendations)
+            if stale:
+                self._stale.add(user_id)
+        except Exception as e:
+            logger.error(f"Recommendation refresh failed for user {user_id}: {str(e)}")
+        finally:
+            self._pending.pop(user_id, None)
+
+# Process-wide recommendation cache shared by all searches
+recommendation_cache = RecommendationCache()
@@ -0,0 +1,170 @@
+import logging
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Score weights, matching AISearchService._calculate_similarity_score
+CATEGORY_WEIGHT = 0.4
+STYLE_WEIGHT = 0.3
+RATING_WEIGHT = 0.2
+REVIEWS_WEIGHT = 0.1
+# Review count at which the review boost is saturated
+REVIEW_SATURATION = 20.0
+
+# Fixed feature columns; category and style tag columns follow
+_RATING = 0
+_REVIEWS = 1
+
+def _category_value(category: Any) -> Any:
+    return getattr(category, "value", category)
+
+class VendorFeatureMatrix:
+    """Dense feature matrix of approved vendors for recommendations.
+
+    Each row is a vendor: normalized rating and review count, a one-hot
+    category and multi-hot style tags. A user's interests become two query
+    columns (category/rating/review weights, and style tag membership), so
+    one matrix product scores the whole catalog and the style Jaccard
+    similarity falls out of the shared tag counts. Rows and columns are
+    allocated with spare capacity so single vendor writes patch the matrix
+    in place; freed rows are reused.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self._reset()
+
+    def _reset(self, rows: int = 0):
+        self._ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._free_rows: List[int] = []
+        self._columns: Dict[Tuple[str, str], int] = {}
+        self._column_count = 2
+        self._features = np.zeros((max(rows, 16), 16), dtype=np.float32)
+        self._style_counts = np.zeros(self._features.shape[0], dtype=np.float32)
+        self._active = np.zeros(self._features.shape[0], dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _column(self, kind: str, value: str) -> int:
+        column = self._columns.get((kind, value))
+        if column is None:
+            column = self._column_count
+            if column == self._features.shape[1]:
+                self._features = np.pad(self._features, ((0, 0), (0, column)))
+            self._columns[(kind, value)] = column
+            self._column_count += 1
+        return column
+
+    def _row(self, vendor_id: str) -> int:
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self._ids[row] = vendor_id
+            return row
+
+        row = len(self._ids)
+        if row == self._features.shape[0]:
+            self._features = np.pad(self._features, ((0, row), (0, 0)))
+            self._style_counts = np.pad(self._style_counts, (0, row))
+            self._active = np.pad(self._active, (0, row))
+        self._ids.append(vendor_id)
+        return row
+
+    def load(self, profiles: List[Dict[str, Any]]):
+        """Replace the matrix with a full snapshot of vendor profiles"""
+        self._reset(len(profiles))
+        for profile in profiles:
+            self._add(profile)
+        self.ready = True
+
+    def _add(self, profile: Dict[str, Any]):
+        if profile.get("status") != "approved":
+            return
+
+        # Allocate any new columns first; growing the matrix replaces the array
+        category = _category_value(profile.get("category"))
+        columns = [self._column("category", category)] if category is not None else []
+        tags = set(profile.get("style_tags", []))
+        columns += [self._column("style", tag) for tag in tags]
+
+        row = self._row(profile["id"])
+        self._rows[profile["id"]] = row
+        self._features[row, _RATING] = (profile.get("average_rating") or 0.0) / 5.0
+        self._features[row, _REVIEWS] = min(1.0, (profile.get("total_reviews") or 0) / REVIEW_SATURATION)
+        self._features[row, columns] = 1.0
+        self._style_counts[row] = len(tags)
+        self._active[row] = True
+
+    def upsert(self, profile: Dict[str, Any]):
+        """Add or replace a vendor's row"""
+        self.remove(profile["id"])
+        self._add(profile)
+
+    def remove(self, vendor_id: str):
+        """Drop a vendor's row if present"""
+        row = self._rows.pop(vendor_id, None)
+        if row is None:
+            return
+        self._features[row] = 0.0
+        self._style_counts[row] = 0.0
+        self._active[row] = False
+        self._ids[row] = None
+        self._free_rows.append(row)
+
+    def top_k(
+        self,
+        categories: Iterable[Any],
+        styles: Iterable[str],
+        exclude_ids: Iterable[str] = (),
+        limit: int = 10,
+        boosts: Optional[Dict[str, float]] = None
+    ) -> List[Tuple[str, float]]:
+        """Highest scoring (vendor id, score) pairs across the whole catalog.
+
+        ``boosts`` adds extra per-vendor score (e.g. co-engagement) before ranking.
+        """
+        row_count = len(self._ids)
+        if not self._rows or limit <= 0:
+            return []
+
+        styles = set(styles)
+        query = np.zeros((self._features.shape[1], 2), dtype=np.float32)
+        query[_RATING, 0] = RATING_WEIGHT
+        query[_REVIEWS, 0] = REVIEWS_WEIGHT
+        for category in categories:
+            column = self._columns.get(("category", _category_value(category)))
+            if column is not None:
+                query[column, 0] = CATEGORY_WEIGHT
+        for tag in styles:
+            column = self._columns.get(("style", tag))
+            if column is not None:
+                query[column, 1] = 1.0
+
+        product = self._features[:row_count] @ query
+        shared = product[:, 1]
+        union = self._style_counts[:row_count] + len(styles) - shared
+        jaccard = np.divide(shared, union, out=np.zeros_like(shared), where=shared > 0)
+        scores = product[:, 0] + STYLE_WEIGHT * jaccard
+        for vendor_id, boost in (boosts or {}).items():
+            row = self._rows.get(vendor_id)
+            if row is not None:
+                scores[row] += boost
+
+        scores[~self._active[:row_count]] = -np.inf
+        for vendor_id in exclude_ids:
+            row = self._rows.get(vendor_id)
+            if row is not None:
+                scores[row] = -np.inf
+
+        if limit < row_count:
+            top = np.argpartition(-scores, limit)[:limit]
+        else:
+            top = np.arange(row_count)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self._ids[row], float(scores[row])) for row in top.tolist() if np.isfinite(scores[row])]
+
+# Process-wide recommendation matrix, populated at startup alongside the search indexes
+recommendation_index = VendorFeatureMatrix()
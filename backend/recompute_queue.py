@@ -0,0 +1,161 @@
+import asyncio
+import heapq
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+logger = logging.getLogger(__name__)
+
+# Triggers for a vendor within this window collapse into one recompute
+RECOMPUTE_WINDOW_SECONDS = float(os.getenv("VENDOR_RECOMPUTE_WINDOW_SECONDS", "5"))
+RECOMPUTE_WORKERS = int(os.getenv("VENDOR_RECOMPUTE_WORKERS", "2"))
+# Upper bound on the recomputes run inline at shutdown
+SHUTDOWN_FLUSH_SECONDS = 10
+
+Handler = Callable[[AsyncIOMotorDatabase, str], Awaitable[Any]]
+Key = Tuple[str, str]
+
+class RecomputeQueue:
+    """Keyed, debounced queue of derived-score recomputes.
+
+    Writes call ``mark(kind, vendor_id)`` instead of recomputing inline. The
+    first mark for a key schedules it ``window`` seconds out; further marks
+    before then are coalesced into that one run. A dispatcher hands due keys
+    to a small worker pool, and a key that is marked again while its
+    recompute is running is simply scheduled for the next window, so one
+    vendor never has two recomputes of the same kind in flight.
+    """
+
+    def __init__(self, window: float = RECOMPUTE_WINDOW_SECONDS, workers: int = RECOMPUTE_WORKERS):
+        self.window = window
+        self.workers = workers
+        self._handlers: Dict[str, Handler] = {}
+        self._pending: Dict[Key, float] = {}
+        self._due: List[Tuple[float, Key]] = []
+        self._running: Set[Key] = set()
+        self._wakeup = asyncio.Event()
+        self._started = False
+        self._stats = {
+            "marked": 0,
+            "coalesced": 0,
+            "completed": 0,
+            "failed": 0,
+            "last_lag_seconds": 0.0,
+            "max_lag_seconds": 0.0
+        }
+
+    def register(self, kind: str, handler: Handler):
+        """Recompute function for one kind of derived data, called as ``handler(db, vendor_id)``"""
+        self._handlers[kind] = handler
+
+    def mark(self, kind: str, vendor_id: str):
+        """Flag a vendor's ``kind`` data as stale"""
+        if kind not in self._handlers:
+            logger.error(f"No recompute handler registered for {kind}")
+            return
+        self._stats["marked"] += 1
+        key = (kind, vendor_id)
+        if key in self._pending:
+            self._stats["coalesced"] += 1
+            return
+        now = time.monotonic()
+        self._pending[key] = now
+        heapq.heappush(self._due, (now + self.window, key))
+        self._wakeup.set()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth, lag and throughput counters"""
+        now = time.monotonic()
+        depth_by_kind: Dict[str, int] = {}
+        for kind, _ in self._pending:
+            depth_by_kind[kind] = depth_by_kind.get(kind, 0) + 1
+        return {
+            "running": self._started,
+            "window_seconds": self.window,
+            "workers": self.workers,
+            "depth": len(self._pending),
+            "depth_by_kind": depth_by_kind,
+            "in_flight": len(self._running),
+            "oldest_pending_seconds": round(now - min(self._pending.values()), 3) if self._pending else 0.0,
+            **{name: round(value, 3) if isinstance(value, float) else value for name, value in self._stats.items()}
+        }
+
+    async def _execute(self, db: AsyncIOMotorDatabase, key: Key, marked_at: float):
+        kind, vendor_id = key
+        self._running.add(key)
+        try:
+            await self._handlers[kind](db, vendor_id)
+            self._stats["completed"] += 1
+        except asyncio.CancelledError:
+            # Interrupted by shutdown; leave it for the final flush
+            self._pending.setdefault(key, marked_at)
+            raise
+        except Exception as e:
+            self._stats["failed"] += 1
+            logger.error(f"Recompute of {kind} for vendor {vendor_id} failed: {str(e)}")
+        finally:
+            self._running.discard(key)
+            lag = time.monotonic() - marked_at
+            self._stats["last_lag_seconds"] = lag
+            self._stats["max_lag_seconds"] = max(self._stats["max_lag_seconds"], lag)
+
+    async def _worker(self, db: AsyncIOMotorDatabase, ready: "asyncio.Queue[Tuple[Key, float]]"):
+        while True:
+            key, marked_at = await ready.get()
+            try:
+                await self._execute(db, key, marked_at)
+            finally:
+                ready.task_done()
+
+    async def _dispatch(self, ready: "asyncio.Queue[Tuple[Key, float]]"):
+        while True:
+            now = time.monotonic()
+            while self._due and self._due[0][0] <= now:
+                _, key = heapq.heappop(self._due)
+                if key in self._running:
+                    # Still recomputing from an earlier window; run again after this one
+                    heapq.heappush(self._due, (now + self.window, key))
+                    continue
+                marked_at = self._pending.pop(key)
+                ready.put_nowait((key, marked_at))
+
+            timeout = self._due[0][0] - now if self._due else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def flush(self, db: AsyncIOMotorDatabase):
+        """Run every pending recompute now, ignoring the window"""
+        pending, self._pending, self._due = self._pending, {}, []
+        for key, marked_at in pending.items():
+            await self._execute(db, key, marked_at)
+
+    async def run(self, db: AsyncIOMotorDatabase):
+        """Background job: dispatch due recomputes to the worker pool until cancelled"""
+        self._wakeup = asyncio.Event()
+        ready: "asyncio.Queue[Tuple[Key, float]]" = asyncio.Queue()
+        tasks = [asyncio.create_task(self._worker(db, ready)) for _ in range(self.workers)]
+        tasks.append(asyncio.create_task(self._dispatch(ready)))
+        self._started = True
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            self._started = False
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Don't drop stale scores on shutdown; anything handed to a worker is requeued
+            while not ready.empty():
+                key, marked_at = ready.get_nowait()
+                self._pending.setdefault(key, marked_at)
+            try:
+                await asyncio.wait_for(self.flush(db), SHUTDOWN_FLUSH_SECONDS)
+            except Exception as e:
+                logger.error(f"Recompute queue flush on shutdown failed: {str(e)}")
+
+# Process-wide recompute queue; workers are started with the app
+recompute_queue = RecomputeQueue()
@@ -0,0 +1,167 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Review collections bucketed, with the field holding each one's star rating
+REVIEW_SOURCES = {
+    "reviews": "rating",
+    "vendor_reviews": "overall_rating"
+}
+
+def bucket_day(at: datetime) -> datetime:
+    return datetime(at.year, at.month, at.day)
+
+class ReviewBucketService:
+    """Per-vendor daily review buckets.
+
+    One ``review_buckets`` document per (vendor, source collection, UTC day)
+    holds the review count, rating sum, sentiment counts and latest review
+    time for that day, maintained with upserted ``$inc`` writes. Windowed
+    metrics (30/60 day trends, recent review counts) read at most one
+    document per day in the window, however many reviews a vendor has.
+    This is the bucket pattern on a regular collection rather than a
+    MongoDB time-series collection, which can't take upserted ``$inc``.
+    """
+
+    @staticmethod
+    async def record_review(
+        db: AsyncIOMotorDatabase,
+        source: str,
+        vendor_id: str,
+        created_at: datetime,
+        rating: float,
+        sentiment: Optional[str] = None
+    ):
+        """Add one new review to its day's bucket"""
+        try:
+            increments = {"count": 1, "rating_sum": rating}
+            if sentiment:
+                increments[f"sentiment.{sentiment}"] = 1
+            await db.review_buckets.update_one(
+                {"vendor_id": vendor_id, "source": source, "day": bucket_day(created_at)},
+                {"$inc": increments, "$max": {"last_review_at": created_at}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.error(f"Failed to record review bucket: {str(e)}")
+
+    @staticmethod
+    async def shift_sentiment(db: AsyncIOMotorDatabase, source: str, shifts: List[Tuple[str, datetime, str, str]]):
+        """Move re-scored reviews, given as (vendor_id, created_at, previous, current), between sentiment counts"""
+        deltas: Dict[Tuple[str, datetime], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for vendor_id, created_at, previous, current in shifts:
+            if previous != current:
+                delta = deltas[(vendor_id, bucket_day(created_at))]
+                delta[f"sentiment.{previous}"] -= 1
+                delta[f"sentiment.{current}"] += 1
+        operations = [
+            UpdateOne({"vendor_id": vendor_id, "source": source, "day": day}, {"$inc": dict(delta)})
+            for (vendor_id, day), delta in deltas.items()
+        ]
+        if operations:
+            await db.review_buckets.bulk_write(operations, ordered=False)
+
+    @staticmethod
+    async def window(db: AsyncIOMotorDatabase, source: str, vendor_id: str, start_days_ago: int, end_days_ago: int = 0) -> Dict[str, Any]:
+        """Totals for days in (today - start_days_ago, today - end_days_ago]"""
+        today = bucket_day(datetime.utcnow())
+        totals: Dict[str, Any] = {"count": 0, "rating_sum": 0.0, "sentiment": {}, "last_review_at": None}
+        async for bucket in db.review_buckets.find(
+            {
+                "vendor_id": vendor_id,
+                "source": source,
+                "day": {"$gt": today - timedelta(days=start_days_ago), "$lte": today - timedelta(days=end_days_ago)}
+            },
+            {"_id": 0, "count": 1, "rating_sum": 1, "sentiment": 1, "last_review_at": 1}
+        ):
+            totals["count"] += bucket.get("count", 0)
+            totals["rating_sum"] += bucket.get("rating_sum", 0)
+            for label, count in bucket.get("sentiment", {}).items():
+                totals["sentiment"][label] = totals["sentiment"].get(label, 0) + count
+            if totals["last_review_at"] is None or bucket.get("last_review_at", datetime.min) > totals["last_review_at"]:
+                totals["last_review_at"] = bucket.get("last_review_at")
+        return totals
+
+    @staticmethod
+    async def recent_activity(
+        db: AsyncIOMotorDatabase,
+        source: str,
+        vendor_ids: List[str],
+        days: Optional[int] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Review count and latest review time over the last ``days`` days, or all time, for each vendor"""
+        match: Dict[str, Any] = {"vendor_id": {"$in": vendor_ids}, "source": source}
+        if days is not None:
+            match["day"] = {"$gte": bucket_day(datetime.utcnow()) - timedelta(days=days - 1)}
+        activity = {}
+        async for row in db.review_buckets.aggregate([
+            {"$match": match},
+            {"$group": {
+                "_id": "$vendor_id",
+                "count": {"$sum": "$count"},
+                "last_review_at": {"$max": "$last_review_at"}
+            }}
+        ]):
+            activity[row["_id"]] = {"count": row["count"], "last_review_at": row["last_review_at"]}
+        return activity
+
+    @staticmethod
+    async def backfill(db: AsyncIOMotorDatabase):
+        """Build buckets from every existing review of each source not yet backfilled (first run after upgrade)"""
+        for source, rating_field in REVIEW_SOURCES.items():
+            # Keyed on a completion marker, not on buckets existing: reviews written
+            # live before the backfill ran already have buckets of their own
+            marker = f"review_buckets:{source}"
+            try:
+                if await db.migrations.find_one({"_id": marker}, {"_id": 1}):
+                    continue
+                await db[source].aggregate([
+                    {"$group": {
+                        "_id": {
+                            "vendor_id": "$vendor_id",
+                            "day": {"$dateFromString": {
+                                "dateString": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}
+                            }},
+                            "sentiment": {"$ifNull": ["$sentiment", None]}
+                        },
+                        "count": {"$sum": 1},
+                        "rating_sum": {"$sum": f"${rating_field}"},
+                        "last_review_at": {"$max": "$created_at"}
+                    }},
+                    {"$group": {
+                        "_id": {"vendor_id": "$_id.vendor_id", "day": "$_id.day"},
+                        "count": {"$sum": "$count"},
+                        "rating_sum": {"$sum": "$rating_sum"},
+                        "last_review_at": {"$max": "$last_review_at"},
+                        "sentiment": {"$push": {"k": "$_id.sentiment", "v": "$count"}}
+                    }},
+                    {"$project": {
+                        "_id": 0,
+                        "vendor_id": "$_id.vendor_id",
+                        "source": {"$literal": source},
+                        "day": "$_id.day",
+                        "count": 1,
+                        "rating_sum": 1,
+                        "last_review_at": 1,
+                        "sentiment": {"$arrayToObject": {
+                            "$filter": {"input": "$sentiment", "cond": {"$ne": ["$$this.k", None]}}
+                        }}
+                    }},
+                    {"$merge": {
+                        "into": "review_buckets",
+                        "on": ["vendor_id", "source", "day"],
+                        "whenMatched": "replace",
+                        "whenNotMatched": "insert"
+                    }}
+                ]).to_list(length=None)
+                await db.migrations.update_one(
+                    {"_id": marker}, {"$set": {"completed_at": datetime.utcnow()}}, upsert=True
+                )
+                logger.info(f"Backfilled review buckets from {source}")
+            except Exception as e:
+                logger.error(f"Review bucket backfill from {source} failed: {str(e)}")
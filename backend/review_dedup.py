@@ -0,0 +1,86 @@
+import hashlib
+import re
+import zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# 128 hash functions split into 16 bands of 8 rows: reviews sharing any band
+# become candidates, which catches ~95% of pairs at 0.8 Jaccard similarity
+# and ~6% of pairs at 0.5
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+# Estimated Jaccard similarity at which two reviews count as near-duplicates
+DUPLICATE_THRESHOLD = 0.8
+# Texts shorter than this (after normalisation) are too generic to compare
+MIN_TEXT_LENGTH = 40
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(20240601)
+# Fixed seed: stored signatures must stay comparable across processes and deploys
+_A = _rng.randint(1, _PRIME, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, size=NUM_PERM).astype(np.uint64)
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+def _normalize(text: str) -> str:
+    return _NON_WORD.sub(" ", (text or "").lower()).strip()
+
+def shingles(text: str) -> np.ndarray:
+    """Hashes of the character shingles of normalised text"""
+    normalized = _normalize(text)
+    if len(normalized) < MIN_TEXT_LENGTH:
+        return np.zeros(0, dtype=np.uint64)
+    encoded = normalized.encode()
+    hashes = {zlib.crc32(encoded[i:i + SHINGLE_SIZE]) for i in range(len(encoded) - SHINGLE_SIZE + 1)}
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+def minhash(text: str) -> Optional[List[int]]:
+    """MinHash signature of a review text, or None if it is too short to compare"""
+    hashes = shingles(text)
+    if not len(hashes):
+        return None
+    hashes %= np.uint64(_PRIME)
+    permuted = (_A[:, None] * hashes[None, :] + _B[:, None]) % np.uint64(_PRIME)
+    return permuted.min(axis=1).tolist()
+
+def lsh_bands(signature: List[int]) -> List[str]:
+    """One bucket key per band; reviews sharing a key are duplicate candidates"""
+    keys = []
+    for band in range(BANDS):
+        rows = np.asarray(signature[band * ROWS:(band + 1) * ROWS], dtype=np.uint32).tobytes()
+        keys.append(f"{band}:{hashlib.blake2b(rows, digest_size=8).hexdigest()}")
+    return keys
+
+def similarity(first: List[int], second: List[int]) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.mean(np.asarray(first) == np.asarray(second)))
+
+def review_text(review: Dict) -> str:
+    return f"{review.get('title', '')} {review.get('content', '')}"
+
+class DuplicateClusters:
+    """Union-find over review ids for grouping near-duplicate pairs"""
+
+    def __init__(self):
+        self._parent: Dict[str, str] = {}
+
+    def find(self, review_id: str) -> str:
+        root = self._parent.setdefault(review_id, review_id)
+        while self._parent[root] != root:
+            root = self._parent[root]
+        # Path compression
+        while review_id != root:
+            self._parent[review_id], review_id = root, self._parent[review_id]
+        return root
+
+    def union(self, first: str, second: str):
+        self._parent[self.find(first)] = self.find(second)
+
+    def clusters(self) -> List[List[str]]:
+        groups: Dict[str, List[str]] = {}
+        for review_id in self._parent:
+            groups.setdefault(self.find(review_id), []).append(review_id)
+        return [members for members in groups.values() if len(members) > 1]
@@ -0,0 +1,180 @@
+import asyncio
+import base64
+import binascii
+import io
+import logging
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from PIL import Image, ImageOps
+
+from .file_service import FileUploadService
+
+logger = logging.getLogger(__name__)
+
+MAX_PHOTOS_PER_REVIEW = 10
+MAX_PHOTO_BYTES = 15 * 1024 * 1024
+# Reject decompression bombs before decoding pixels
+MAX_PHOTO_PIXELS = 40_000_000
+ALLOWED_FORMATS = {"JPEG", "PNG", "WEBP", "GIF"}
+
+PHOTO_MAX_SIZE = (1920, 1080)
+THUMBNAIL_SIZE = (300, 300)
+
+PHOTO_WORKERS = int(os.getenv("REVIEW_PHOTO_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Photos decoding or waiting in the pool at once, across all requests
+PHOTO_CONCURRENCY = PHOTO_WORKERS * 2
+
+# Base64 is decoded in slices of this many characters (a multiple of 4)
+_DECODE_CHUNK = 64 * 1024
+
+class PhotoRejected(ValueError):
+    """A review photo that isn't a supported image within the limits"""
+
+def _decode(encoded: str) -> bytes:
+    """Decode base64 (optionally a data: URL) slice by slice, stopping once it's over the size limit"""
+    if encoded.startswith("data:"):
+        encoded = encoded.partition(",")[2]
+    encoded = "".join(encoded.split())
+    if len(encoded) // 4 * 3 > MAX_PHOTO_BYTES + 2:
+        raise PhotoRejected("Photo is too large")
+
+    decoded = io.BytesIO()
+    try:
+        for start in range(0, len(encoded), _DECODE_CHUNK):
+            decoded.write(base64.b64decode(encoded[start:start + _DECODE_CHUNK], validate=True))
+            if decoded.tell() > MAX_PHOTO_BYTES:
+                raise PhotoRejected("Photo is too large")
+    except binascii.Error:
+        raise PhotoRejected("Photo is not valid base64")
+    return decoded.getvalue()
+
+def _encode_webp(img: Image.Image, quality: int) -> bytes:
+    output = io.BytesIO()
+    # No exif or icc_profile passed, so no camera metadata or location is written
+    img.save(output, format="WEBP", quality=quality, method=4)
+    return output.getvalue()
+
+def process_photo(encoded: str) -> Tuple[bytes, bytes, Dict[str, Any]]:
+    """Decode, validate, strip metadata from, resize and WebP-encode one photo.
+
+    Runs in a worker process. Returns (photo, thumbnail, metadata).
+    """
+    data = _decode(encoded)
+    try:
+        with Image.open(io.BytesIO(data)) as probe:
+            if probe.format not in ALLOWED_FORMATS:
+                raise PhotoRejected(f"Unsupported image format {probe.format}")
+            if probe.width * probe.height > MAX_PHOTO_PIXELS:
+                raise PhotoRejected("Photo dimensions are too large")
+            probe.verify()
+
+        # verify() leaves the image unusable, so decode again
+        img = Image.open(io.BytesIO(data))
+        img.load()
+    except PhotoRejected:
+        raise
+    except Exception:
+        raise PhotoRejected("Photo is not a readable image")
+
+    original_format = img.format
+    original_width, original_height = img.size
+
+    # Apply the camera orientation, then drop the EXIF block and other metadata
+    img = ImageOps.exif_transpose(img)
+    has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+    img = img.convert("RGBA" if has_alpha else "RGB")
+    img.info = {}
+
+    img.thumbnail(PHOTO_MAX_SIZE, Image.Resampling.LANCZOS)
+    photo = _encode_webp(img, 85)
+
+    thumbnail_img = img.copy()
+    thumbnail_img.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+    thumbnail = _encode_webp(thumbnail_img, 80)
+
+    metadata = {
+        "original_format": original_format,
+        "original_size": len(data),
+        "optimized_size": len(photo),
+        "original_dimensions": {"width": original_width, "height": original_height},
+        "optimized_dimensions": {"width": img.width, "height": img.height},
+        "compression_ratio": len(photo) / len(data)
+    }
+    return photo, thumbnail, metadata
+
+_pool: Optional[ProcessPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+
+def _executor() -> Tuple[ProcessPoolExecutor, asyncio.Semaphore]:
+    global _pool, _slots
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PHOTO_WORKERS)
+        _slots = asyncio.Semaphore(PHOTO_CONCURRENCY)
+    return _pool, _slots
+
+def shutdown_photo_pool():
+    """Stop the worker processes; called when the app shuts down"""
+    global _pool, _slots
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool, _slots = None, None
+
+async def _store_photo(
+    db: AsyncIOMotorDatabase, encoded: str, customer_id: str, vendor_id: str, review_id: str
+) -> Dict[str, Any]:
+    # Don't ship an obviously oversized payload to a worker
+    if len(encoded) > MAX_PHOTO_BYTES // 3 * 4 + 4096:
+        raise PhotoRejected("Photo is too large")
+
+    pool, slots = _executor()
+    async with slots:
+        photo, thumbnail, metadata = await asyncio.get_running_loop().run_in_executor(pool, process_photo, encoded)
+
+    photo_id = f"photo_{uuid.uuid4().hex[:12]}"
+    stored = await FileUploadService.store_file(
+        db,
+        file_path=FileUploadService.generate_file_path(f"{photo_id}.webp", "image", customer_id),
+        original_name=f"{photo_id}.{metadata['original_format'].lower()}",
+        file_category="image",
+        mime_type="image/webp",
+        content=photo,
+        original_size=metadata["original_size"],
+        user_id=customer_id,
+        tags=["review", review_id],
+        optimization_metadata=metadata,
+        thumbnail_content=thumbnail,
+        metadata_extra={"vendor_id": vendor_id, "category": "review_photo"}
+    )
+    return {
+        'photo_id': photo_id,
+        'file_id': stored["file_id"],
+        'photo_url': stored["public_url"],
+        'thumbnail_url': stored["thumbnail_url"],
+        'width': metadata["optimized_dimensions"]["width"],
+        'height': metadata["optimized_dimensions"]["height"],
+        'caption': None,
+        'verified': False
+    }
+
+async def process_review_photos(
+    db: AsyncIOMotorDatabase, photos: List[str], customer_id: str, vendor_id: str, review_id: str
+) -> List[Dict[str, Any]]:
+    """Process a review's photos concurrently in the worker pool; rejected photos are skipped"""
+    if len(photos) > MAX_PHOTOS_PER_REVIEW:
+        logger.warning(f"Review {review_id} sent {len(photos)} photos; keeping the first {MAX_PHOTOS_PER_REVIEW}")
+        photos = photos[:MAX_PHOTOS_PER_REVIEW]
+
+    results = await asyncio.gather(
+        *(_store_photo(db, encoded, customer_id, vendor_id, review_id) for encoded in photos),
+        return_exceptions=True
+    )
+    processed_photos = []
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"Error processing photo: {result}")
+        else:
+            processed_photos.append(result)
+    return processed_photos
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from .batch_loader import load_by_ids
+
+logger = logging.getLogger(__name__)
+
+class ReviewStatsService:
+    """Materialized platform review statistics for the public landing pages.
+
+    A single ``platform_review_stats`` document holds the verified review
+    count, rating sum and sentiment counts, kept current by ``$inc`` deltas
+    from review writes, plus the top rated vendors and a pool of trending
+    reviews, which are rebuilt by maintenance on an interval. Readers get
+    the snapshot from a short-lived in-process copy, so serving the
+    statistics never touches the reviews collection.
+    """
+
+    SNAPSHOT_ID = "platform"
+    REFRESH_INTERVAL_SECONDS = 300
+    # How long a process serves its copy of the snapshot before re-reading it
+    CACHE_SECONDS = 15
+
+    TRENDING_WINDOW_DAYS = 30
+    TRENDING_POOL_SIZE = 50
+    TOP_VENDORS = 5
+
+    _cached: Optional[Tuple[float, Dict[str, Any]]] = None
+
+    @staticmethod
+    def _is_trending(review: Optional[dict]) -> bool:
+        return bool(review) and review.get('status') == 'verified' and review.get('rating', 0) >= 4.0 and bool(review.get('photos'))
+
+    @staticmethod
+    async def record_review_change(db: AsyncIOMotorDatabase, before: Optional[dict], after: Optional[dict]):
+        """Apply one review write to the snapshot counts"""
+        try:
+            delta: Dict[str, float] = {}
+            for review, sign in ((before, -1), (after, 1)):
+                if review and review.get('status') == 'verified':
+                    delta['verified_count'] = delta.get('verified_count', 0) + sign
+                    delta['rating_sum'] = delta.get('rating_sum', 0) + sign * review['rating']
+                    sentiment = f"sentiment.{review.get('sentiment', 'neutral')}"
+                    delta[sentiment] = delta.get(sentiment, 0) + sign
+            delta = {field: value for field, value in delta.items() if value}
+
+            update: Dict[str, Any] = {}
+            if delta:
+                update['$inc'] = delta
+            # A review that stops qualifying (flagged, unverified) leaves the landing page now;
+            # new qualifiers join at the next refresh
+            if ReviewStatsService._is_trending(before) and not ReviewStatsService._is_trending(after):
+                update['$pull'] = {'trending_reviews': {'id': before['id']}}
+            if not update:
+                return
+
+            update['$set'] = {'updated_at': datetime.utcnow()}
+            await db.platform_review_stats.update_one({'_id': ReviewStatsService.SNAPSHOT_ID}, update)
+
+        except Exception as e:
+            logger.error(f"Failed to update review statistics snapshot: {str(e)}")
+
+    @staticmethod
+    async def refresh(db: AsyncIOMotorDatabase) -> Dict[str, Any]:
+        """Rebuild the whole snapshot from the reviews and vendors collections"""
+        verified_count = 0
+        rating_sum = 0.0
+        sentiment = {'positive': 0, 'neutral': 0, 'negative': 0}
+        async for group in db.reviews.aggregate([
+            {'$match': {'status': 'verified'}},
+            {'$group': {'_id': '$sentiment', 'count': {'$sum': 1}, 'rating_sum': {'$sum': '$rating'}}}
+        ]):
+            verified_count += group['count']
+            rating_sum += group['rating_sum']
+            sentiment[group['_id'] or 'neutral'] = sentiment.get(group['_id'] or 'neutral', 0) + group['count']
+
+        top_vendors = await db.vendors.find(
+            {'average_rating': {'$gte': 4.5}, 'review_count': {'$gte': 5}},
+            {'_id': 0, 'id': 1, 'business_name': 1, 'category': 1, 'average_rating': 1, 'review_count': 1}
+        ).sort('average_rating', -1).limit(ReviewStatsService.TOP_VENDORS).to_list(ReviewStatsService.TOP_VENDORS)
+
+        # Recent high-rated reviews with photos
+        trending_reviews = await db.reviews.find({
+            'status': 'verified',
+            'rating': {'$gte': 4.0},
+            'photos': {'$ne': []},
+            'created_at': {'$gte': datetime.utcnow() - timedelta(days=ReviewStatsService.TRENDING_WINDOW_DAYS)}
+        }, {'_id': 0}).sort([
+            ('helpful_votes', -1),
+            ('rating', -1),
+            ('created_at', -1)
+        ]).limit(ReviewStatsService.TRENDING_POOL_SIZE).to_list(ReviewStatsService.TRENDING_POOL_SIZE)
+
+        vendors = await load_by_ids(
+            db.vendors,
+            (review['vendor_id'] for review in trending_reviews),
+            {'_id': 0, 'business_name': 1, 'category': 1}
+        )
+        for review in trending_reviews:
+            vendor = vendors.get(review['vendor_id'])
+            if vendor:
+                review['vendor_name'] = vendor.get('business_name', 'Unknown')
+                review['vendor_category'] = vendor.get('category', 'Unknown')
+
+        now = datetime.utcnow()
+        snapshot = {
+            'verified_count': verified_count,
+            'rating_sum': rating_sum,
+            'sentiment': sentiment,
+            'top_rated_vendors': top_vendors,
+            'trending_reviews': trending_reviews,
+            'refreshed_at': now,
+            'updated_at': now
+        }
+        await db.platform_review_stats.replace_one({'_id': ReviewStatsService.SNAPSHOT_ID}, snapshot, upsert=True)
+        ReviewStatsService._cached = None
+        return snapshot
+
+    @staticmethod
+    async def get_snapshot(db: AsyncIOMotorDatabase) -> Dict[str, Any]:
+        """Current snapshot, built on first use"""
+        cached = ReviewStatsService._cached
+        if cached and time.monotonic() - cached[0] < ReviewStatsService.CACHE_SECONDS:
+            return cached[1]
+
+        snapshot = await db.platform_review_stats.find_one({'_id': ReviewStatsService.SNAPSHOT_ID})
+        if snapshot is None:
+            snapshot = await ReviewStatsService.refresh(db)
+        ReviewStatsService._cached = (time.monotonic(), snapshot)
+        return snapshot
+
+    @staticmethod
+    async def get_statistics(db: AsyncIOMotorDatabase) -> Dict[str, Any]:
+        """Platform-wide review statistics in the public response shape"""
+        snapshot = await ReviewStatsService.get_snapshot(db)
+        verified_count = snapshot.get('verified_count', 0)
+        return {
+            "total_reviews": verified_count,
+            "platform_average_rating": round(snapshot.get('rating_sum', 0) / verified_count, 2) if verified_count else 0,
+            "sentiment_distribution": {label: count for label, count in snapshot.get('sentiment', {}).items() if count},
+            "top_rated_vendors": [
+                {
+                    "id": v["id"],
+                    "name": v.get("business_name", "Unknown"),
+                    "category": v.get("category", "Unknown"),
+                    "rating": v.get("average_rating", 0),
+                    "review_count": v.get("review_count", 0)
+                }
+                for v in snapshot.get('top_rated_vendors', [])
+            ]
+        }
+
+    @staticmethod
+    async def get_trending_reviews(db: AsyncIOMotorDatabase, limit: int = 10) -> list:
+        """Top of the trending review pool"""
+        snapshot = await ReviewStatsService.get_snapshot(db)
+        return snapshot.get('trending_reviews', [])[:limit]
+
+    @staticmethod
+    async def run_maintenance(db: AsyncIOMotorDatabase):
+        """Periodic job: rebuild the snapshot so rankings and trending reviews stay current"""
+        while True:
+            try:
+                await ReviewStatsService.refresh(db)
+            except Exception as e:
+                logger.error(f"Review statistics refresh failed: {str(e)}")
+            await asyncio.sleep(ReviewStatsService.REFRESH_INTERVAL_SECONDS)
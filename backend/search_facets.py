@@ -0,0 +1,114 @@
+import json
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterable, Optional
+
+# Histogram boundaries; each band runs from its boundary up to the next one
+PRICE_BANDS = [0, 1000, 2500, 5000, 10000]
+RATING_BANDS = [0, 3, 4, 4.5]
+
+def _band_label(bands: List[float], value: Optional[float]) -> Optional[str]:
+    if value is None or value < bands[0]:
+        return None
+    position = bisect_right(bands, value) - 1
+    if position == len(bands) - 1:
+        return f"{bands[position]:g}+"
+    return f"{bands[position]:g}-{bands[position + 1]:g}"
+
+def price_band(price: Optional[float]) -> Optional[str]:
+    return _band_label(PRICE_BANDS, price)
+
+def rating_band(rating: Optional[float]) -> Optional[str]:
+    return _band_label(RATING_BANDS, rating)
+
+def mongo_facet_stages() -> Dict[str, List[Dict[str, Any]]]:
+    """$facet sub-pipelines producing the raw histograms"""
+    return {
+        "category": [{"$group": {"_id": "$category", "count": {"$sum": 1}}}],
+        "style_tags": [
+            {"$unwind": "$style_tags"},
+            {"$group": {"_id": "$style_tags", "count": {"$sum": 1}}}
+        ],
+        "price_band": [
+            {"$match": {"pricing_from": {"$ne": None}}},
+            {"$bucket": {"groupBy": "$pricing_from", "boundaries": PRICE_BANDS + [float("inf")], "default": "other"}}
+        ],
+        "rating": [
+            {"$bucket": {"groupBy": {"$ifNull": ["$average_rating", 0]}, "boundaries": RATING_BANDS + [float("inf")], "default": "other"}}
+        ]
+    }
+
+def format_mongo_facets(raw: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Dict[str, int]]:
+    """Turn $facet output into {facet: {label: count}}"""
+    facets = {"category": {}, "style_tags": {}, "price_band": {}, "rating": {}}
+    for row in raw.get("category", []):
+        if row["_id"] is not None:
+            facets["category"][str(row["_id"])] = row["count"]
+    for row in raw.get("style_tags", []):
+        facets["style_tags"][str(row["_id"])] = row["count"]
+    # Values outside the boundaries land in the "other" bucket and are dropped
+    for row in raw.get("price_band", []):
+        if isinstance(row["_id"], (int, float)):
+            facets["price_band"][price_band(row["_id"])] = row["count"]
+    for row in raw.get("rating", []):
+        if isinstance(row["_id"], (int, float)):
+            facets["rating"][rating_band(row["_id"])] = row["count"]
+    return facets
+
+def count_facets(docs: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+    """Same histograms as the $facet stages, computed over in-memory profiles"""
+    facets = {"category": {}, "style_tags": {}, "price_band": {}, "rating": {}}
+    for doc in docs:
+        category = doc.get("category")
+        if category is not None:
+            category = getattr(category, "value", category)
+            facets["category"][category] = facets["category"].get(category, 0) + 1
+        for tag in doc.get("style_tags", []):
+            facets["style_tags"][tag] = facets["style_tags"].get(tag, 0) + 1
+        band = price_band(doc.get("pricing_from"))
+        if band:
+            facets["price_band"][band] = facets["price_band"].get(band, 0) + 1
+        band = rating_band(doc.get("average_rating") or 0)
+        if band:
+            facets["rating"][band] = facets["rating"].get(band, 0) + 1
+    return facets
+
+def facet_cache_key(filters: Dict[str, Any]) -> str:
+    """Stable key for a set of search filters (e.g. ``SearchFilter.dict(exclude_none=True)``)"""
+    return json.dumps(filters, sort_keys=True, default=str)
+
+class FacetCache:
+    """Small LRU of facet histograms keyed by the search filters.
+
+    Vendor writes clear it (see ``search_indexes.refresh_vendor``); the TTL
+    bounds staleness from writes handled by other workers.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: int = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Dict[str, int]]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, facets = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return facets
+
+    def set(self, key: str, facets: Dict[str, Dict[str, int]]):
+        self._entries[key] = (time.monotonic(), facets)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self):
+        self._entries.clear()
+
+# Process-wide facet cache shared by all searches
+facet_cache = FacetCache()
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import date, timedelta
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from .autocomplete_index import autocomplete_index
+from .availability_index import availability_index, HORIZON_DAYS
+from .availability_store import bookable_days, migrate_daily_records
+from .catalog_index import catalog_index
+from .fuzzy_index import fuzzy_index
+from .pricing_engine import price_engine
+from .recommendation_index import recommendation_index
+from .search_facets import facet_cache
+from .text_index import text_index
+from .gazetteer import gazetteer, LOCATION_TOKENS_VERSION
+
+logger = logging.getLogger(__name__)
+
+# The in-memory search indexes load at startup; set VENDOR_CATALOG_INDEX=false
+# to skip them and serve every search from Mongo directly
+CATALOG_INDEX_ENABLED = os.getenv("VENDOR_CATALOG_INDEX", "true").lower() in ("1", "true", "yes")
+CATALOG_RELOAD_INTERVAL_SECONDS = int(os.getenv("VENDOR_CATALOG_RELOAD_SECONDS", "900"))
+
+async def backfill_location_tokens(db: AsyncIOMotorDatabase, batch_size: int = 500) -> int:
+    """Compute location tokens for profiles written before (or with an older) gazetteer"""
+    updated = 0
+    try:
+        cursor = db.vendor_profiles.find(
+            {"location_tokens_version": {"$ne": LOCATION_TOKENS_VERSION}},
+            {"id": 1, "location": 1, "service_areas": 1}
+        )
+        operations = []
+        async for profile in cursor:
+            operations.append(UpdateOne(
+                {"_id": profile["_id"]},
+                {"$set": gazetteer.location_fields(profile.get("location"), profile.get("service_areas", []))}
+            ))
+            if len(operations) >= batch_size:
+                await db.vendor_profiles.bulk_write(operations, ordered=False)
+                updated += len(operations)
+                operations = []
+        if operations:
+            await db.vendor_profiles.bulk_write(operations, ordered=False)
+            updated += len(operations)
+    except Exception as e:
+        logger.error(f"Location token backfill failed: {str(e)}")
+    return updated
+
+async def build_search_indexes(db: AsyncIOMotorDatabase):
+    """Load the in-process vendor search indexes from a full profile scan"""
+    if not CATALOG_INDEX_ENABLED:
+        return
+
+    try:
+        profiles = await db.vendor_profiles.find({}).to_list(length=None)
+        catalog_index.load(profiles)
+        logger.info(f"Vendor catalog index loaded with {len(profiles)} profiles")
+        
+        packages_by_vendor = defaultdict(list)
+        async for package in db.vendor_packages.find({}):
+            packages_by_vendor[package["vendor_id"]].append(package)
+        text_index.load(profiles, packages_by_vendor)
+        logger.info(f"Vendor text index loaded with {len(text_index)} documents")
+        
+        seasons = await db.seasonal_pricing.find({}, {"_id": 0}).to_list(length=None)
+        price_engine.load([package for packages in packages_by_vendor.values() for package in packages], seasons)
+        logger.info(f"Price engine loaded with {len(price_engine)} packages")
+        
+        autocomplete_index.load(profiles)
+        logger.info(f"Autocomplete index loaded with {len(autocomplete_index)} suggestions")
+        
+        fuzzy_index.load(profiles)
+        
+        recommendation_index.load(profiles)
+        logger.info(f"Recommendation matrix loaded with {len(recommendation_index)} vendors")
+        
+        start = date.today()
+        vendor_days = await bookable_days(db, start, start + timedelta(days=HORIZON_DAYS - 1))
+        availability_index.load(vendor_days, start)
+        logger.info(f"Availability index loaded with {len(availability_index)} vendors")
+    except Exception as e:
+        logger.error(f"Failed to build vendor search indexes: {str(e)}")
+
+async def refresh_vendor(db: AsyncIOMotorDatabase, vendor_id: str):
+    """Re-read one vendor profile after a write and update the search indexes"""
+    # Cached facet counts may include this vendor under its old values
+    facet_cache.invalidate()
+    
+    if not CATALOG_INDEX_ENABLED:
+        return
+
+    try:
+        profile = await db.vendor_profiles.find_one({"id": vendor_id})
+        if profile:
+            catalog_index.upsert(profile)
+            packages = await db.vendor_packages.find({"vendor_id": vendor_id}).to_list(length=None)
+            text_index.upsert(profile, packages)
+            seasons = await db.seasonal_pricing.find({"vendor_id": vendor_id}, {"_id": 0}).to_list(length=None)
+            price_engine.upsert_vendor(vendor_id, packages, seasons)
+            autocomplete_index.upsert(profile)
+            fuzzy_index.upsert(profile)
+            recommendation_index.upsert(profile)
+        else:
+            catalog_index.remove(vendor_id)
+            text_index.remove(vendor_id)
+            autocomplete_index.remove(vendor_id)
+            fuzzy_index.remove(vendor_id)
+            recommendation_index.remove(vendor_id)
+            price_engine.remove_vendor(vendor_id)
+    except Exception as e:
+        logger.error(f"Failed to refresh search indexes for vendor {vendor_id}: {str(e)}")
+
+async def refresh_vendor_availability(db: AsyncIOMotorDatabase, vendor_id: str):
+    """Re-read one vendor's bookable days after a calendar write"""
+    # Cached facet counts may have been filtered on this vendor's old availability
+    facet_cache.invalidate()
+    
+    if not availability_index.ready:
+        return
+
+    try:
+        start = availability_index.start
+        vendor_days = await bookable_days(db, start, start + timedelta(days=HORIZON_DAYS - 1), vendor_id)
+        availability_index.set_days(vendor_id, vendor_days.get(vendor_id, []))
+    except Exception as e:
+        logger.error(f"Failed to refresh availability index for vendor {vendor_id}: {str(e)}")
+
+async def run_index_maintenance(db: AsyncIOMotorDatabase):
+    """Periodic job: backfill location tokens and availability intervals, build the indexes, then reload them on an interval.
+
+    Incremental refreshes cover writes made through the API; the reload picks
+    up anything written out of band (admin scripts, data fixes).
+    """
+    backfilled = await backfill_location_tokens(db)
+    if backfilled:
+        logger.info(f"Backfilled location tokens for {backfilled} vendor profiles")
+    
+    migrated = await migrate_daily_records(db)
+    if migrated:
+        logger.info(f"Folded {migrated} daily availability records into intervals")
+    
+    await build_search_indexes(db)
+    if not CATALOG_INDEX_ENABLED:
+        return
+
+    while True:
+        await asyncio.sleep(CATALOG_RELOAD_INTERVAL_SECONDS)
+        await build_search_indexes(db)
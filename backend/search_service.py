@@ -1,33 +1,95 @@
+import asyncio
+import heapq
 import logging
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+import math
+import re
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import date, datetime, timedelta
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import numpy as np
 from collections import defaultdict
 
-from .models import SearchFilter, WishlistItem, RecentlyViewed, VendorProfile
+from .models import SearchFilter, AvailabilityMatch, WishlistItem, RecentlyViewed, VendorProfile, VendorCategory
+from .availability_index import availability_index, as_day
+from .availability_store import available_vendors
+from .pricing_engine import price_engine, price_engine_for
+from .autocomplete_index import autocomplete_index
+from .catalog_index import EARTH_RADIUS_KM, catalog_index
+from .text_index import text_index
+from .fuzzy_index import fuzzy_index
+from .recommendation_index import recommendation_index
+from .co_engagement import CoEngagementService
+from .review_buckets import ReviewBucketService
+from .recommendation_cache import recommendation_cache
+from .gazetteer import gazetteer, normalize_text
+from .batch_loader import load_by_ids
+from .pagination import decode_cursor, keyset_query, next_cursor
+from .search_facets import facet_cache, facet_cache_key, format_mongo_facets, mongo_facet_stages
 
 logger = logging.getLogger(__name__)
 
 class AISearchService:
     """Enhanced search service with AI-powered recommendations and filtering"""
     
+    # Radius used when a venue is given without radius_km
+    DEFAULT_RADIUS_KM = 50
+    
+    # Keyword searches with fewer hits than this are retried with typo corrections
+    FUZZY_MIN_RESULTS = 3
+    
+    # Default result order; cursors encode these fields of the last vendor on a page
+    RATING_SORT = [("average_rating", -1), ("total_reviews", -1), ("created_at", -1), ("id", 1)]
+    
+    # Weight of "couples who liked your vendors also liked" on top of attribute similarity
+    CO_ENGAGEMENT_WEIGHT = 0.5
+    
+    # Recommendations cached per user; enough to still fill a list after excluding a page of results
+    RECOMMENDATION_POOL_SIZE = 30
+    
     @staticmethod
     async def enhanced_vendor_search(
         db: AsyncIOMotorDatabase,
         search_filter: SearchFilter,
         user_id: Optional[str] = None,
         limit: int = 20,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        include_facets: bool = False
     ) -> Dict[str, Any]:
-        """Enhanced vendor search with dynamic filtering and AI recommendations"""
+        """Enhanced vendor search with dynamic filtering and AI recommendations.
+        
+        ``cursor`` continues the default rating order from a previous page's
+        ``next_cursor``; keyword and radius searches page by ``offset`` only.
+        ``include_facets`` adds category, style, price band and rating
+        histograms for the whole result set. Raises ValueError for a
+        malformed cursor.
+        """
+        after = decode_cursor(cursor, AISearchService.RATING_SORT) if cursor else None
+        
+        quote_day = AISearchService.quote_day(search_filter)
+        if search_filter.sort_by_quote and quote_day is None:
+            raise ValueError("Sorting by quote needs a quote_date or a single availability date")
         
         try:
             # Build base query
             query = {"status": "approved"}
             
-            # Location filtering
-            if search_filter.location:
+            # Misspelled places ("Paramatta") are corrected against the gazetteer vocabulary
+            corrections = {}
+            if search_filter.location and not gazetteer.query_tokens(search_filter.location):
+                corrected_location = fuzzy_index.correct_text(search_filter.location)
+                if corrected_location and gazetteer.query_tokens(corrected_location):
+                    corrections["location"] = corrected_location
+                    search_filter = search_filter.copy(update={"location": corrected_location})
+            
+            # Location filtering: exact indexed tokens for known places, regex otherwise
+            location_tokens = gazetteer.query_tokens(search_filter.location)
+            if location_tokens:
+                query["location_tokens"] = {"$in": location_tokens}
+            elif search_filter.location:
                 query["$or"] = [
                     {"location": {"$regex": search_filter.location, "$options": "i"}},
                     {"service_areas": {"$in": [search_filter.location]}}
@@ -58,51 +120,95 @@ class AISearchService:
             if search_filter.style_tags:
                 query["style_tags"] = {"$in": search_filter.style_tags}
             
-            # Availability filtering (if date provided)
+            # Availability filtering (if dates provided)
             availability_vendors = None
-            if search_filter.availability_date:
+            availability_days = sorted({
+                as_day(day) for day in search_filter.availability_dates + [search_filter.availability_date] if day
+            })
+            if availability_days:
                 availability_vendors = await AISearchService._filter_by_availability(
-                    db, search_filter.availability_date
+                    db, availability_days, search_filter.availability_match == AvailabilityMatch.ALL
                 )
                 if availability_vendors is not None:
                     query["id"] = {"$in": availability_vendors}
             
-            # Execute search with pagination
-            cursor = db.vendor_profiles.find(query).sort([
-                ("average_rating", -1),
-                ("total_reviews", -1),
-                ("created_at", -1)
-            ]).skip(offset).limit(limit)
+            # Cheapest package per vendor on the date; only vendors with one can be sorted by it
+            quotes = None
+            candidate_vendors = availability_vendors
+            if search_filter.sort_by_quote:
+                engine = await price_engine_for(
+                    db, None if price_engine.ready else await db.vendor_profiles.distinct("id", query)
+                )
+                quotes = engine.cheapest(quote_day, availability_vendors, search_filter.guest_count)
+                candidate_vendors = list(quotes)
+                query["id"] = {"$in": candidate_vendors}
+            prices = {vendor_id: quote["price"] for vendor_id, quote in quotes.items()} if quotes is not None else None
+            
+            # Radius search around the venue, distance-sorted
+            near = AISearchService.resolve_near(search_filter)
             
-            vendors = await cursor.to_list(length=limit)
-            total_count = await db.vendor_profiles.count_documents(query)
+            # Keyset paging applies to the default rating order only
+            rating_order = not (search_filter.q or near or search_filter.sort_by_quote)
+            if not rating_order:
+                after = None
             
-            # Get enhanced data for each vendor
-            enhanced_vendors = []
-            for vendor in vendors:
-                enhanced_vendor = await AISearchService._enhance_vendor_data(db, vendor, user_id)
-                enhanced_vendors.append(enhanced_vendor)
+            vendors, total_count, text_truncated, facets = await AISearchService._execute_search(
+                db, query, search_filter, candidate_vendors, near, after, limit, offset, include_facets, prices
+            )
+            
+            # Too few keyword hits: retry once with typo-corrected keywords
+            if search_filter.q and total_count < AISearchService.FUZZY_MIN_RESULTS:
+                corrected_q = fuzzy_index.correct_text(search_filter.q)
+                if corrected_q and corrected_q != normalize_text(search_filter.q):
+                    fuzzy_results = await AISearchService._execute_search(
+                        db, query, search_filter.copy(update={"q": corrected_q}),
+                        candidate_vendors, near, None, limit, offset, include_facets, prices
+                    )
+                    if fuzzy_results[1] > total_count:
+                        vendors, total_count, text_truncated, facets = fuzzy_results
+                        corrections["q"] = corrected_q
+            
+            # Get enhanced data for the whole page in a fixed number of queries
+            enhanced_vendors = await AISearchService._enhance_vendor_batch(db, vendors, user_id)
+            
+            # Date-aware price of each vendor's cheapest fitting package
+            if quote_day:
+                if quotes is None:
+                    page_ids = [vendor["id"] for vendor in enhanced_vendors]
+                    engine = await price_engine_for(db, page_ids)
+                    quotes = engine.cheapest(quote_day, page_ids, search_filter.guest_count)
+                for vendor in enhanced_vendors:
+                    vendor["quote"] = quotes.get(vendor["id"])
             
-            # Get AI recommendations if user is logged in
+            # Get AI recommendations if user is logged in; they're served from
+            # the cache and recomputed in the background, never inline
             recommendations = []
             if user_id:
-                recommendations = await AISearchService.get_ai_recommendations(
+                recommendations = await AISearchService.cached_recommendations(
                     db, user_id, exclude_vendor_ids=[v["id"] for v in enhanced_vendors]
                 )
             
             # Get trending vendors
             trending_vendors = await AISearchService.get_trending_vendors(db, limit=5)
             
+            following_cursor = next_cursor(vendors, AISearchService.RATING_SORT, limit) if rating_order else None
+            
             return {
                 "vendors": enhanced_vendors,
                 "total_count": total_count,
-                "has_more": offset + len(enhanced_vendors) < total_count,
+                "has_more": following_cursor is not None if after else offset + len(enhanced_vendors) < total_count,
+                "next_cursor": following_cursor,
+                "facets": facets,
                 "recommendations": recommendations,
                 "trending": trending_vendors,
                 "search_metadata": {
                     "filters_applied": search_filter.dict(exclude_none=True),
                     "availability_filtered": availability_vendors is not None,
-                    "total_available": len(availability_vendors) if availability_vendors else None
+                    "total_available": len(availability_vendors) if availability_vendors else None,
+                    "radius_km": near[2] if near else None,
+                    "quote_date": quote_day.isoformat() if quote_day else None,
+                    "text_search_truncated": text_truncated,
+                    "corrections": corrections
                 }
             }
             
@@ -118,27 +224,233 @@ class AISearchService:
             }
     
     @staticmethod
-    async def _filter_by_availability(db: AsyncIOMotorDatabase, date: datetime) -> List[str]:
-        """Filter vendors by availability on a specific date"""
-        try:
-            # Check vendor availability for the given date
-            date_str = date.date()
-            available_vendors = []
+    async def _execute_search(
+        db: AsyncIOMotorDatabase,
+        query: Dict[str, Any],
+        search_filter: SearchFilter,
+        availability_vendors: Optional[List[str]],
+        near: Optional[Tuple[float, float, float]],
+        after: Optional[List[Any]],
+        limit: int,
+        offset: int,
+        include_facets: bool = False,
+        prices: Optional[Dict[str, float]] = None
+    ) -> Tuple[List[Dict[str, Any]], int, bool, Optional[Dict[str, Dict[str, int]]]]:
+        """Run a built search query.
+        
+        ``prices`` (quoted price per vendor) orders the results cheapest-first.
+        Returns the page, total count, whether text scoring was truncated and
+        the facet histograms (None unless requested).
+        """
+        query = dict(query)
+        
+        # Keyword search, ranked by BM25 relevance
+        text_scores = None
+        text_truncated = False
+        if search_filter.q and text_index.ready:
+            text_scores, text_truncated = text_index.search(search_filter.q)
+        
+        facets = None
+        facet_key = facet_cache_key(search_filter.dict(exclude_none=True)) if include_facets else None
+        if include_facets:
+            facets = facet_cache.get(facet_key)
+        need_facets = include_facets and facets is None
+        
+        # Execute search with pagination, from the in-memory catalog when it can serve the filters
+        catalog_filters = AISearchService._catalog_filters(search_filter, availability_vendors, near, text_scores)
+        if catalog_filters is not None:
+            after_key = None
+            if after:
+                fields = [field for field, _ in AISearchService.RATING_SORT]
+                after_key = catalog_index.sort_key(dict(zip(fields, after)), "rating")
             
-            # Get all vendor availability records for the date
-            availability_records = await db.vendor_availability.find({
-                "date": {
-                    "$gte": datetime.combine(date_str, datetime.min.time()),
-                    "$lt": datetime.combine(date_str, datetime.max.time())
-                },
-                "is_available": True,
-                "is_booked": False
-            }).to_list(1000)
+            if prices is not None:
+                sort = "quote"
+            else:
+                sort = "relevance" if text_scores is not None else "distance" if near else "rating"
+            vendors, total_count = catalog_index.search(
+                **catalog_filters,
+                after=after_key,
+                sort=sort,
+                offset=offset,
+                limit=limit,
+                prices=prices
+            )
+            if need_facets:
+                facets = catalog_index.facet_counts(**catalog_filters)
+        elif prices is not None:
+            if near:
+                query["geo"] = AISearchService._geo_within(near)
+            if search_filter.q:
+                query["$text"] = {"$search": search_filter.q}
+            
+            # Order the matching ids by quoted price, then fetch just the page
+            matching = await db.vendor_profiles.distinct("id", query)
+            total_count = len(matching)
+            page_ids = heapq.nsmallest(
+                offset + limit, matching,
+                key=lambda vendor_id: (vendor_id not in prices, prices.get(vendor_id, 0.0), vendor_id)
+            )[offset:]
+            page = await db.vendor_profiles.find({"id": {"$in": page_ids}}).to_list(length=len(page_ids))
+            by_id = {vendor["id"]: vendor for vendor in page}
+            vendors = [by_id[vendor_id] for vendor_id in page_ids if vendor_id in by_id]
+            if need_facets:
+                facets = await AISearchService._mongo_facets(db, query)
+        elif near and not search_filter.q:
+            latitude, longitude, radius_km = near
+            vendors = await db.vendor_profiles.aggregate([
+                {"$geoNear": {
+                    "near": {"type": "Point", "coordinates": [longitude, latitude]},
+                    "distanceField": "distance_km",
+                    "distanceMultiplier": 0.001,
+                    "maxDistance": radius_km * 1000,
+                    "query": query,
+                    "spherical": True
+                }},
+                {"$skip": offset},
+                {"$limit": limit}
+            ]).to_list(length=limit)
+            for vendor in vendors:
+                vendor["distance_km"] = round(vendor["distance_km"], 2)
             
-            for record in availability_records:
-                available_vendors.append(record["vendor_id"])
+            query["geo"] = AISearchService._geo_within(near)
+            total_count = await db.vendor_profiles.count_documents(query)
+            if need_facets:
+                facets = await AISearchService._mongo_facets(db, query)
+        elif search_filter.q:
+            if near:
+                query["geo"] = AISearchService._geo_within(near)
             
-            return available_vendors
+            # Mongo text index fallback when the in-process text index isn't loaded
+            query["$text"] = {"$search": search_filter.q}
+            cursor = db.vendor_profiles.find(
+                query, {"relevance_score": {"$meta": "textScore"}}
+            ).sort([("relevance_score", {"$meta": "textScore"})])
+            
+            vendors = await cursor.skip(offset).limit(limit).to_list(length=limit)
+            total_count = await db.vendor_profiles.count_documents(query)
+            if need_facets:
+                facets = await AISearchService._mongo_facets(db, query)
+        else:
+            # One round trip for the page, the total and any uncached facet histograms.
+            # The $match and $sort run ahead of $facet so the rating index backs both;
+            # the results branch then reads the already-sorted stream
+            results_stages = []
+            if after:
+                results_stages.append({"$match": keyset_query({}, AISearchService.RATING_SORT, after)})
+            results_stages += [{"$skip": offset}, {"$limit": max(limit, 1)}]
+            facet_stages = {"results": results_stages, "total": [{"$count": "count"}]}
+            if need_facets:
+                facet_stages.update(mongo_facet_stages())
+            
+            rows = await db.vendor_profiles.aggregate([
+                {"$match": query},
+                {"$sort": dict(AISearchService.RATING_SORT)},
+                {"$facet": facet_stages}
+            ], allowDiskUse=True).to_list(length=1)
+            row = rows[0] if rows else {}
+            vendors = row.get("results", [])[:limit]
+            total_count = row["total"][0]["count"] if row.get("total") else 0
+            if need_facets:
+                facets = format_mongo_facets(row)
+        
+        if need_facets and facets is not None:
+            facet_cache.set(facet_key, facets)
+        
+        return vendors, total_count, text_truncated, facets
+    
+    @staticmethod
+    async def _mongo_facets(db: AsyncIOMotorDatabase, query: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+        """Facet histograms for a query when the page itself came from elsewhere"""
+        rows = await db.vendor_profiles.aggregate(
+            [{"$match": query}, {"$facet": mongo_facet_stages()}], allowDiskUse=True
+        ).to_list(length=1)
+        return format_mongo_facets(rows[0] if rows else {})
+    
+    @staticmethod
+    def _geo_within(near: Tuple[float, float, float]) -> Dict[str, Any]:
+        latitude, longitude, radius_km = near
+        return {"$geoWithin": {
+            "$centerSphere": [[longitude, latitude], radius_km / EARTH_RADIUS_KM]
+        }}
+    
+    @staticmethod
+    def quote_day(search_filter: SearchFilter) -> Optional[date]:
+        """Date packages are priced for: quote_date, else a single requested availability date"""
+        if search_filter.quote_date:
+            return search_filter.quote_date.date()
+        days = {as_day(day) for day in search_filter.availability_dates + [search_filter.availability_date] if day}
+        return days.pop() if len(days) == 1 else None
+    
+    @staticmethod
+    def resolve_near(search_filter: SearchFilter) -> Optional[Tuple[float, float, float]]:
+        """(latitude, longitude, radius_km) for a radius search, or None if the venue is unknown"""
+        if not search_filter.near:
+            return None
+        coordinates = gazetteer.geocode(search_filter.near) or gazetteer.geocode(
+            fuzzy_index.correct_text(search_filter.near)
+        )
+        if coordinates is None:
+            return None
+        return coordinates[0], coordinates[1], search_filter.radius_km or AISearchService.DEFAULT_RADIUS_KM
+    
+    @staticmethod
+    def _catalog_filters(
+        search_filter: SearchFilter,
+        availability_vendors: Optional[List[str]],
+        near: Optional[Tuple[float, float, float]],
+        text_scores: Optional[Dict[str, float]]
+    ) -> Optional[Dict[str, Any]]:
+        """Search filters as catalog index arguments, or None if the catalog can't serve them"""
+        if not catalog_index.ready:
+            return None
+        
+        if search_filter.q and text_scores is None:
+            return None
+        
+        any_of = {}
+        
+        # Locations the gazetteer can't resolve still need a Mongo regex
+        if search_filter.location:
+            location_tokens = gazetteer.query_tokens(search_filter.location)
+            if not location_tokens:
+                return None
+            any_of["location_tokens"] = location_tokens
+        
+        equals = {"status": "approved"}
+        if search_filter.category:
+            equals["category"] = search_filter.category
+        if search_filter.verified_only:
+            equals["verified"] = True
+        
+        if search_filter.style_tags:
+            any_of["style_tags"] = search_filter.style_tags
+        
+        ranges = {}
+        if search_filter.price_min is not None or search_filter.price_max is not None:
+            ranges["pricing_from"] = (search_filter.price_min, search_filter.price_max)
+        if search_filter.rating_min:
+            ranges["average_rating"] = (search_filter.rating_min, None)
+        
+        ids = set(availability_vendors) if availability_vendors is not None else None
+        
+        return {
+            "equals": equals,
+            "any_of": any_of,
+            "ranges": ranges,
+            "ids": ids,
+            "near": near,
+            "scores": text_scores
+        }
+    
+    @staticmethod
+    async def _filter_by_availability(db: AsyncIOMotorDatabase, days: List[date], match_all: bool = True) -> List[str]:
+        """Vendors free on all (or any) of the given days"""
+        try:
+            if availability_index.ready and availability_index.covers(days):
+                return list(availability_index.match(days, match_all))
+            
+            return await available_vendors(db, days, match_all)
             
         except Exception as e:
             logger.error(f"Availability filtering failed: {str(e)}")
@@ -147,68 +459,148 @@ class AISearchService:
     @staticmethod
     async def _enhance_vendor_data(db: AsyncIOMotorDatabase, vendor: Dict[str, Any], user_id: str = None) -> Dict[str, Any]:
         """Enhance vendor data with additional information"""
+        enhanced = await AISearchService._enhance_vendor_batch(db, [vendor], user_id)
+        return enhanced[0]
+    
+    @staticmethod
+    async def _enhance_vendor_batch(db: AsyncIOMotorDatabase, vendors: List[Dict[str, Any]], user_id: str = None) -> List[Dict[str, Any]]:
+        """Enhance a page of vendors with social proof, trust score, wishlist and activity data.
+        
+        Every lookup is keyed on the full list of vendor ids, so the number of
+        round trips stays constant regardless of page size.
+        """
+        if not vendors:
+            return vendors
+        
         try:
-            # Add social proof indicators
-            vendor["social_proof"] = await AISearchService._get_social_proof(db, vendor["id"])
+            vendor_ids = [vendor["id"] for vendor in vendors]
+            
+            social_proof = await AISearchService._get_social_proof_batch(db, vendor_ids)
             
-            # Add trust score
-            trust_score = await db.vendor_trust_scores.find_one({"vendor_id": vendor["id"]})
-            vendor["trust_score"] = trust_score.get("overall_score", 0) if trust_score else 0
+            # Trust scores
+            trust_scores = {}
+            async for score in db.vendor_trust_scores.find(
+                {"vendor_id": {"$in": vendor_ids}},
+                {"_id": 0, "vendor_id": 1, "overall_score": 1}
+            ):
+                trust_scores[score["vendor_id"]] = score.get("overall_score", 0)
             
-            # Add wishlist status for logged-in users
+            # Wishlist status for logged-in users
+            wishlisted = set()
             if user_id:
-                wishlist_item = await db.wishlist_items.find_one({
-                    "user_id": user_id,
-                    "vendor_id": vendor["id"]
-                })
-                vendor["in_wishlist"] = wishlist_item is not None
-            else:
-                vendor["in_wishlist"] = False
+                async for item in db.wishlist_items.find(
+                    {"user_id": user_id, "vendor_id": {"$in": vendor_ids}},
+                    {"_id": 0, "vendor_id": 1}
+                ):
+                    wishlisted.add(item["vendor_id"])
             
-            # Add recent activity indicators
-            recent_reviews = await db.vendor_reviews.find({
-                "vendor_id": vendor["id"]
-            }).sort("created_at", -1).limit(3).to_list(3)
+            # Recent activity indicators (up to 3 reviews per vendor), summed over all daily review buckets
+            activity = {}
+            recent = await ReviewBucketService.recent_activity(db, "vendor_reviews", vendor_ids)
+            for vendor_id, row in recent.items():
+                activity[vendor_id] = {
+                    "recent_reviews_count": min(row["count"], 3),
+                    "last_review_date": row["last_review_at"]
+                }
             
-            vendor["recent_activity"] = {
-                "recent_reviews_count": len(recent_reviews),
-                "last_review_date": recent_reviews[0]["created_at"] if recent_reviews else None
-            }
+            for vendor in vendors:
+                vendor_id = vendor["id"]
+                vendor["social_proof"] = social_proof[vendor_id]
+                vendor["trust_score"] = trust_scores.get(vendor_id, 0)
+                vendor["in_wishlist"] = vendor_id in wishlisted
+                vendor["recent_activity"] = activity.get(
+                    vendor_id, AISearchService._default_enrichment()["recent_activity"]
+                )
             
-            return vendor
+            return vendors
             
         except Exception as e:
             logger.error(f"Vendor data enhancement failed: {str(e)}")
-            return vendor
+            # Keep the response shape: every vendor still carries the enrichment keys
+            for vendor in vendors:
+                for key, value in AISearchService._default_enrichment().items():
+                    vendor.setdefault(key, value)
+            return vendors
+    
+    @staticmethod
+    def _default_enrichment() -> Dict[str, Any]:
+        """Enrichment values for a vendor with no activity"""
+        return {
+            "social_proof": {"recent_bookings": 0, "recent_views": 0, "popularity_score": 0},
+            "trust_score": 0,
+            "in_wishlist": False,
+            "recent_activity": {"recent_reviews_count": 0, "last_review_date": None}
+        }
     
     @staticmethod
     async def _get_social_proof(db: AsyncIOMotorDatabase, vendor_id: str) -> Dict[str, Any]:
         """Get social proof indicators for a vendor"""
+        social_proof = await AISearchService._get_social_proof_batch(db, [vendor_id])
+        return social_proof[vendor_id]
+    
+    @staticmethod
+    async def _get_social_proof_batch(db: AsyncIOMotorDatabase, vendor_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get social proof indicators for several vendors with one grouped query per source"""
+        recent_bookings = defaultdict(int)
+        recent_views = defaultdict(int)
+        
         try:
             # Recent bookings count (last 30 days)
             thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-            recent_bookings = await db.quote_requests.count_documents({
-                "vendor_id": vendor_id,
-                "status": "accepted",
-                "created_at": {"$gte": thirty_days_ago}
-            })
+            async for row in db.quote_requests.aggregate([
+                {"$match": {
+                    "vendor_id": {"$in": vendor_ids},
+                    "status": "accepted",
+                    "created_at": {"$gte": thirty_days_ago}
+                }},
+                {"$group": {"_id": "$vendor_id", "count": {"$sum": 1}}}
+            ]):
+                recent_bookings[row["_id"]] = row["count"]
             
             # Profile views (last 7 days)
             seven_days_ago = datetime.utcnow() - timedelta(days=7)
-            recent_views = await db.recently_viewed.count_documents({
-                "vendor_id": vendor_id,
-                "viewed_at": {"$gte": seven_days_ago}
-            })
-            
-            return {
-                "recent_bookings": recent_bookings,
-                "recent_views": recent_views,
-                "popularity_score": min(100, (recent_bookings * 10) + (recent_views * 2))
-            }
-            
+            async for row in db.recently_viewed.aggregate([
+                {"$match": {
+                    "vendor_id": {"$in": vendor_ids},
+                    "viewed_at": {"$gte": seven_days_ago}
+                }},
+                {"$group": {"_id": "$vendor_id", "count": {"$sum": 1}}}
+            ]):
+                recent_views[row["_id"]] = row["count"]
+                
         except Exception as e:
             logger.error(f"Social proof calculation failed: {str(e)}")
-            return {"recent_bookings": 0, "recent_views": 0, "popularity_score": 0}
+        
+        return {
+            vendor_id: {
+                "recent_bookings": recent_bookings[vendor_id],
+                "recent_views": recent_views[vendor_id],
+                "popularity_score": min(100, (recent_bookings[vendor_id] * 10) + (recent_views[vendor_id] * 2))
+            }
+            for vendor_id in vendor_ids
+        }
+    
+    @staticmethod
+    async def cached_recommendations(
+        db: AsyncIOMotorDatabase,
+        user_id: str,
+        exclude_vendor_ids: List[str] = None,
+        limit: int = 5
+    ) -> List[Dict[str, Any]]:
+        """Cached recommendations for a user, scheduling a background refresh when missing or stale.
+        
+        Until the first computation lands, trending vendors stand in.
+        """
+        if not recommendation_cache.is_fresh(user_id):
+            recommendation_cache.refresh(user_id, lambda: AISearchService.get_ai_recommendations(
+                db, user_id, limit=AISearchService.RECOMMENDATION_POOL_SIZE
+            ))
+        
+        exclude = set(exclude_vendor_ids or [])
+        cached = recommendation_cache.get(user_id)
+        if cached is None:
+            cached = await AISearchService.get_trending_vendors(db, limit=limit + len(exclude))
+        return [vendor for vendor in cached if vendor["id"] not in exclude][:limit]
     
     @staticmethod
     async def get_ai_recommendations(
@@ -233,19 +625,11 @@ class AISearchService:
             couple_profile = await db.couple_profiles.find_one({"user_id": user_id})
             
             # Build recommendation based on collaborative filtering
-            recommended_vendors = await AISearchService._collaborative_filtering(
-                db, user_id, recently_viewed, wishlist, couple_profile
+            return await AISearchService._collaborative_filtering(
+                db, user_id, recently_viewed, wishlist, couple_profile,
+                exclude_vendor_ids=exclude_vendor_ids or [], limit=limit
             )
             
-            # Exclude already shown vendors
-            if exclude_vendor_ids:
-                recommended_vendors = [
-                    v for v in recommended_vendors 
-                    if v["id"] not in exclude_vendor_ids
-                ]
-            
-            return recommended_vendors[:limit]
-            
         except Exception as e:
             logger.error(f"AI recommendations failed: {str(e)}")
             return []
@@ -256,25 +640,24 @@ class AISearchService:
         user_id: str,
         recently_viewed: List[Dict],
         wishlist: List[Dict],
-        couple_profile: Dict
+        couple_profile: Dict,
+        exclude_vendor_ids: List[str] = None,
+        limit: int = 5
     ) -> List[Dict[str, Any]]:
-        """Simple collaborative filtering algorithm"""
+        """Rank vendors by attribute similarity to a user's history plus co-engagement with it"""
         try:
-            # Get categories and styles user has shown interest in
+            exclude_vendor_ids = exclude_vendor_ids or []
+            
+            # Get categories and styles user has shown interest in, from
+            # recently viewed and wishlisted vendors in one query
             interested_categories = set()
             interested_styles = set()
-            
-            # From recently viewed
-            for view in recently_viewed:
-                vendor = await db.vendor_profiles.find_one({"id": view["vendor_id"]})
-                if vendor:
-                    interested_categories.add(vendor.get("category"))
-                    interested_styles.update(vendor.get("style_tags", []))
-            
-            # From wishlist
-            for wish in wishlist:
-                vendor = await db.vendor_profiles.find_one({"id": wish["vendor_id"]})
-                if vendor:
+            history_ids = list({item["vendor_id"] for item in recently_viewed + wishlist})
+            if history_ids:
+                async for vendor in db.vendor_profiles.find(
+                    {"id": {"$in": history_ids}},
+                    {"_id": 0, "category": 1, "style_tags": 1}
+                ):
                     interested_categories.add(vendor.get("category"))
                     interested_styles.update(vendor.get("style_tags", []))
             
@@ -282,7 +665,32 @@ class AISearchService:
             if couple_profile:
                 interested_styles.update(couple_profile.get("style_preferences", []))
             
-            # Find similar vendors
+            # Vendors that couples with the same history engaged with
+            co_engagement = await CoEngagementService.neighbor_scores(db, history_ids)
+            boosts = {
+                vendor_id: AISearchService.CO_ENGAGEMENT_WEIGHT * min(1.0, score)
+                for vendor_id, score in co_engagement.items()
+            }
+            
+            if recommendation_index.ready:
+                # Score the whole catalog at once and fetch just the winners
+                top = recommendation_index.top_k(
+                    interested_categories, interested_styles, exclude_vendor_ids, limit, boosts
+                )
+                vendors = await db.vendor_profiles.find(
+                    {"id": {"$in": [vendor_id for vendor_id, _ in top]}}, {"_id": 0}
+                ).to_list(len(top))
+                by_id = {vendor["id"]: vendor for vendor in vendors}
+                
+                recommended = []
+                for vendor_id, score in top:
+                    vendor = by_id.get(vendor_id)
+                    if vendor:
+                        vendor["recommendation_score"] = score
+                        recommended.append(vendor)
+                return recommended
+            
+            # Without the in-process matrix, score a bounded candidate set from Mongo
             query = {"status": "approved"}
             if interested_categories:
                 query["category"] = {"$in": list(interested_categories)}
@@ -290,8 +698,14 @@ class AISearchService:
             if interested_styles:
                 query["style_tags"] = {"$in": list(interested_styles)}
             
-            # Get vendors and score them
-            similar_vendors = await db.vendor_profiles.find(query).limit(50).to_list(50)
+            if boosts:
+                query = {"status": "approved", "$or": [query, {"id": {"$in": list(boosts)}}]}
+            
+            if exclude_vendor_ids:
+                query["id"] = {"$nin": exclude_vendor_ids}
+            
+            candidate_limit = 50 + len(boosts)
+            similar_vendors = await db.vendor_profiles.find(query, {"_id": 0}).limit(candidate_limit).to_list(candidate_limit)
             
             # Score vendors based on similarity
             scored_vendors = []
@@ -299,12 +713,12 @@ class AISearchService:
                 score = AISearchService._calculate_similarity_score(
                     vendor, interested_categories, interested_styles
                 )
-                vendor["recommendation_score"] = score
+                vendor["recommendation_score"] = score + boosts.get(vendor["id"], 0.0)
                 scored_vendors.append(vendor)
             
             # Sort by score and return top vendors
             scored_vendors.sort(key=lambda x: x["recommendation_score"], reverse=True)
-            return scored_vendors
+            return scored_vendors[:limit]
             
         except Exception as e:
             logger.error(f"Collaborative filtering failed: {str(e)}")
@@ -336,61 +750,36 @@ class AISearchService:
         return score
     
     @staticmethod
-    async def get_trending_vendors(db: AsyncIOMotorDatabase, limit: int = 5) -> List[Dict[str, Any]]:
-        """Get trending vendors based on recent activity"""
+    async def autocomplete(db: AsyncIOMotorDatabase, prefix: str, limit: int = 8) -> List[Dict[str, Any]]:
+        """Typeahead suggestions for the search box"""
+        if autocomplete_index.ready:
+            return autocomplete_index.suggest(prefix, limit)
+        
+        # Without the in-process index only categories and business name prefixes are suggested
+        text = prefix.strip()
+        if not text:
+            return []
+        
+        suggestions = [
+            {"type": "category", "label": category.value, "value": category.value, "count": None}
+            for category in VendorCategory if category.value.startswith(text.lower())
+        ]
         try:
-            # Calculate trending score based on recent views, reviews, and bookings
-            seven_days_ago = datetime.utcnow() - timedelta(days=7)
-            
-            # Aggregate recent activity
-            pipeline = [
-                {
-                    "$lookup": {
-                        "from": "recently_viewed",
-                        "localField": "id",
-                        "foreignField": "vendor_id",
-                        "as": "recent_views"
-                    }
-                },
-                {
-                    "$lookup": {
-                        "from": "vendor_reviews",
-                        "localField": "id",
-                        "foreignField": "vendor_id",
-                        "as": "recent_reviews"
-                    }
-                },
-                {
-                    "$addFields": {
-                        "trending_score": {
-                            "$add": [
-                                {"$size": "$recent_views"},
-                                {"$multiply": [{"$size": "$recent_reviews"}, 5]},
-                                {"$multiply": ["$average_rating", 2]}
-                            ]
-                        }
-                    }
-                },
-                {
-                    "$match": {
-                        "status": "approved",
-                        "trending_score": {"$gt": 0}
-                    }
-                },
-                {
-                    "$sort": {"trending_score": -1}
-                },
-                {
-                    "$limit": limit
-                }
-            ]
-            
-            trending = await db.vendor_profiles.aggregate(pipeline).to_list(limit)
-            return trending
-            
+            cursor = db.vendor_profiles.find(
+                {"status": "approved", "business_name": {"$regex": f"^{re.escape(text)}", "$options": "i"}},
+                {"id": 1, "business_name": 1}
+            ).sort("average_rating", -1).limit(limit)
+            async for vendor in cursor:
+                suggestions.append({"type": "vendor", "label": vendor["business_name"], "vendor_id": vendor["id"], "count": 1})
         except Exception as e:
-            logger.error(f"Trending vendors calculation failed: {str(e)}")
-            return []
+            logger.error(f"Autocomplete lookup failed: {str(e)}")
+        
+        return suggestions[:limit]
+    
+    @staticmethod
+    async def get_trending_vendors(db: AsyncIOMotorDatabase, limit: int = 5) -> List[Dict[str, Any]]:
+        """Get trending vendors based on recent activity"""
+        return await TrendingService.get_trending_vendors(db, limit=limit)
 
 class WishlistService:
     """Service for managing user wishlists"""
@@ -416,6 +805,7 @@ class WishlistService:
             )
             
             await db.wishlist_items.insert_one(wishlist_item.dict())
+            recommendation_cache.invalidate(user_id)
             return wishlist_item
             
         except Exception as e:
@@ -430,6 +820,8 @@ class WishlistService:
                 "user_id": user_id,
                 "vendor_id": vendor_id
             })
+            if result.deleted_count:
+                recommendation_cache.invalidate(user_id)
             return result.deleted_count > 0
             
         except Exception as e:
@@ -445,10 +837,11 @@ class WishlistService:
                 "user_id": user_id
             }).sort("added_at", -1).to_list(100)
             
-            # Get vendor details for each item
+            # Get vendor details for every item in one query
+            vendors = await load_by_ids(db.vendor_profiles, (item["vendor_id"] for item in wishlist_items))
             enriched_wishlist = []
             for item in wishlist_items:
-                vendor = await db.vendor_profiles.find_one({"id": item["vendor_id"]})
+                vendor = vendors.get(item["vendor_id"])
                 if vendor:
                     item["vendor"] = vendor
                     enriched_wishlist.append(item)
@@ -480,6 +873,10 @@ class ViewTrackingService:
             )
             
             await db.recently_viewed.insert_one(view_record.dict())
+            recommendation_cache.invalidate(user_id)
+            
+            # Feed the trending leaderboard
+            await TrendingService.record_view(db, vendor_id)
             
             # Clean up old records (keep only last 50 views per user)
             user_views = await db.recently_viewed.find({
@@ -504,9 +901,10 @@ class ViewTrackingService:
             }).sort("viewed_at", -1).limit(limit).to_list(limit)
             
             # Get vendor details
+            vendors = await load_by_ids(db.vendor_profiles, (view["vendor_id"] for view in recent_views))
             enriched_views = []
             for view in recent_views:
-                vendor = await db.vendor_profiles.find_one({"id": view["vendor_id"]})
+                vendor = vendors.get(view["vendor_id"])
                 if vendor:
                     view["vendor"] = vendor
                     enriched_views.append(view)
@@ -515,4 +913,263 @@ class ViewTrackingService:
             
         except Exception as e:
             logger.error(f"Get recently viewed failed: {str(e)}")
-            return []
\ No newline at end of file
+            return []
+
+class TrendingService:
+    """Materialized, time-decayed trending vendor leaderboard.
+    
+    Each entry in ``trending_vendors`` stores the sum of activity weights scaled
+    by ``exp(DECAY_RATE * (t - epoch))``. Scaling by a growing factor
+    instead of shrinking old scores means new events are a single ``$inc`` and
+    the stored order always equals the decayed order, so reads are a sorted
+    index scan of the top entries. Maintenance moves the shared epoch forward
+    every few weeks and divides stored scores by the same factor, so they
+    stay bounded.
+    """
+    
+    HALF_LIFE_DAYS = 7
+    DECAY_RATE = math.log(2) / (HALF_LIFE_DAYS * 86400)
+    # Epoch of entries written before the epoch was stored
+    TRENDING_EPOCH = datetime(2024, 1, 1)
+    # Move the epoch forward once it is this old (stored scores grow 16x in 28 days)
+    REBASE_AFTER_DAYS = 28
+    
+    VIEW_WEIGHT = 1.0
+    REVIEW_WEIGHT = 5.0
+    RATING_WEIGHT = 2.0
+    
+    # Entries whose decayed score falls below this are pruned by maintenance
+    PRUNE_THRESHOLD = 0.05
+    REFRESH_INTERVAL_SECONDS = 3600
+    
+    # How long a process uses its copy of the epoch before re-reading it
+    EPOCH_RELOAD_SECONDS = 60
+    
+    _epoch: Optional[datetime] = None
+    _epoch_loaded_at = 0.0
+    
+    @staticmethod
+    def _growth_factor(at: datetime, epoch: datetime) -> float:
+        """Scale factor applied to an event that happened at ``at``"""
+        elapsed = (at - epoch).total_seconds()
+        return math.exp(TrendingService.DECAY_RATE * elapsed)
+    
+    @staticmethod
+    def _decayed_score(entry: Dict[str, Any], now: datetime) -> float:
+        """Convert a stored leaderboard entry to its decayed score at ``now``"""
+        epoch = entry.get("epoch") or TrendingService.TRENDING_EPOCH
+        return entry["score"] / TrendingService._growth_factor(now, epoch)
+    
+    @staticmethod
+    async def _current_epoch(db: AsyncIOMotorDatabase, reload: bool = False) -> datetime:
+        """The shared leaderboard epoch, cached in-process for a short while"""
+        expired = time.monotonic() - TrendingService._epoch_loaded_at > TrendingService.EPOCH_RELOAD_SECONDS
+        if TrendingService._epoch is None or reload or expired:
+            state = await db.trending_state.find_one_and_update(
+                {"_id": "epoch"},
+                {"$setOnInsert": {"epoch": TrendingService.TRENDING_EPOCH}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            TrendingService._epoch = state["epoch"]
+            TrendingService._epoch_loaded_at = time.monotonic()
+        return TrendingService._epoch
+    
+    @staticmethod
+    async def _record_event(db: AsyncIOMotorDatabase, vendor_id: str, weight: float, counter: str, at: datetime = None):
+        """Add a weighted activity event to a vendor's leaderboard entry"""
+        try:
+            at = at or datetime.utcnow()
+            epoch = await TrendingService._current_epoch(db)
+            for attempt in range(2):
+                try:
+                    # Matching on the epoch keeps an event scaled for one epoch out of an
+                    # entry already rebased to the next; the upsert then hits the unique
+                    # vendor_id index and the event is retried with the reloaded epoch
+                    await db.trending_vendors.update_one(
+                        {"vendor_id": vendor_id, "epoch": epoch},
+                        {
+                            "$inc": {
+                                "score": weight * TrendingService._growth_factor(at, epoch),
+                                counter: 1
+                            },
+                            "$set": {"updated_at": datetime.utcnow()}
+                        },
+                        upsert=True
+                    )
+                    return
+                except DuplicateKeyError:
+                    if attempt:
+                        raise
+                    epoch = await TrendingService._current_epoch(db, reload=True)
+        except Exception as e:
+            logger.error(f"Trending update failed: {str(e)}")
+    
+    @staticmethod
+    async def record_view(db: AsyncIOMotorDatabase, vendor_id: str, at: datetime = None):
+        """Record a profile view on the trending leaderboard"""
+        await TrendingService._record_event(db, vendor_id, TrendingService.VIEW_WEIGHT, "views", at)
+    
+    @staticmethod
+    async def record_review(db: AsyncIOMotorDatabase, vendor_id: str, at: datetime = None):
+        """Record a new review on the trending leaderboard"""
+        await TrendingService._record_event(db, vendor_id, TrendingService.REVIEW_WEIGHT, "reviews", at)
+    
+    @staticmethod
+    async def get_trending_vendors(db: AsyncIOMotorDatabase, limit: int = 5) -> List[Dict[str, Any]]:
+        """Read the top trending approved vendors from the leaderboard"""
+        try:
+            # Over-fetch a little so unapproved vendors and the rating
+            # re-rank don't leave the page short
+            candidate_limit = limit * 3
+            # Stored scores are only comparable within one epoch; while a rebase is
+            # in flight, take the top of each epoch and rank on decayed scores
+            entries = []
+            for epoch in await db.trending_vendors.distinct("epoch"):
+                entries += await db.trending_vendors.find(
+                    {"epoch": epoch}, {"_id": 0, "vendor_id": 1, "score": 1, "epoch": 1}
+                ).sort("score", -1).limit(candidate_limit).to_list(candidate_limit)
+            
+            if not entries:
+                return []
+            
+            now = datetime.utcnow()
+            entries = heapq.nlargest(
+                candidate_limit, entries, key=lambda entry: TrendingService._decayed_score(entry, now)
+            )
+            activity_scores = {
+                entry["vendor_id"]: TrendingService._decayed_score(entry, now)
+                for entry in entries
+            }
+            
+            vendors = await db.vendor_profiles.find({
+                "id": {"$in": list(activity_scores)},
+                "status": "approved"
+            }).to_list(candidate_limit)
+            
+            for vendor in vendors:
+                vendor["trending_score"] = round(
+                    activity_scores[vendor["id"]] +
+                    vendor.get("average_rating", 0) * TrendingService.RATING_WEIGHT,
+                    2
+                )
+            
+            vendors.sort(key=lambda v: v["trending_score"], reverse=True)
+            return vendors[:limit]
+            
+        except Exception as e:
+            logger.error(f"Trending vendors calculation failed: {str(e)}")
+            return []
+    
+    @staticmethod
+    async def rebuild_leaderboard(db: AsyncIOMotorDatabase, window_days: int = 28) -> int:
+        """Rebuild the leaderboard from stored views and reviews in the window"""
+        try:
+            cutoff = datetime.utcnow() - timedelta(days=window_days)
+            epoch = await TrendingService._current_epoch(db, reload=True)
+            scores = defaultdict(lambda: {"score": 0.0, "views": 0, "reviews": 0})
+            
+            sources = [
+                (db.recently_viewed, "viewed_at", TrendingService.VIEW_WEIGHT, "views"),
+                (db.vendor_reviews, "created_at", TrendingService.REVIEW_WEIGHT, "reviews"),
+                (db.reviews, "created_at", TrendingService.REVIEW_WEIGHT, "reviews")
+            ]
+            
+            for collection, time_field, weight, counter in sources:
+                pipeline = [
+                    {"$match": {time_field: {"$gte": cutoff}}},
+                    {"$group": {
+                        "_id": "$vendor_id",
+                        "count": {"$sum": 1},
+                        "growth": {"$sum": {"$exp": {"$multiply": [
+                            TrendingService.DECAY_RATE,
+                            {"$divide": [{"$subtract": [f"${time_field}", epoch]}, 1000]}
+                        ]}}}
+                    }}
+                ]
+                async for row in collection.aggregate(pipeline):
+                    entry = scores[row["_id"]]
+                    entry["score"] += weight * row["growth"]
+                    entry[counter] += row["count"]
+            
+            now = datetime.utcnow()
+            await db.trending_vendors.delete_many({})
+            if scores:
+                await db.trending_vendors.insert_many([
+                    {"vendor_id": vendor_id, **entry, "epoch": epoch, "updated_at": now}
+                    for vendor_id, entry in scores.items()
+                ])
+            
+            return len(scores)
+            
+        except Exception as e:
+            logger.error(f"Trending leaderboard rebuild failed: {str(e)}")
+            return 0
+    
+    @staticmethod
+    async def rebase_leaderboard(db: AsyncIOMotorDatabase) -> int:
+        """Move an old epoch forward, and rescale entries still scaled to an earlier epoch"""
+        try:
+            epoch = await TrendingService._current_epoch(db, reload=True)
+            now = datetime.utcnow()
+            if now - epoch >= timedelta(days=TrendingService.REBASE_AFTER_DAYS):
+                new_epoch = datetime(now.year, now.month, now.day)
+                # Only one worker moves the epoch; the others pick it up here
+                claimed = await db.trending_state.find_one_and_update(
+                    {"_id": "epoch", "epoch": epoch},
+                    {"$set": {"epoch": new_epoch}},
+                    return_document=ReturnDocument.AFTER
+                )
+                if claimed is None:
+                    epoch = await TrendingService._current_epoch(db, reload=True)
+                else:
+                    epoch = TrendingService._epoch = new_epoch
+                    TrendingService._epoch_loaded_at = time.monotonic()
+            
+            # Dividing by exp(DECAY_RATE * (epoch - entry epoch)) per entry also catches
+            # entries upserted by a worker that hadn't seen the new epoch yet
+            result = await db.trending_vendors.update_many(
+                {"epoch": {"$ne": epoch}},
+                [{"$set": {
+                    "score": {"$multiply": ["$score", {"$exp": {"$multiply": [
+                        TrendingService.DECAY_RATE,
+                        {"$divide": [
+                            {"$subtract": [{"$ifNull": ["$epoch", TrendingService.TRENDING_EPOCH]}, epoch]},
+                            1000
+                        ]}
+                    ]}}]},
+                    "epoch": epoch
+                }}]
+            )
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Trending leaderboard rebase failed: {str(e)}")
+            return 0
+    
+    @staticmethod
+    async def prune_leaderboard(db: AsyncIOMotorDatabase) -> int:
+        """Drop entries whose decayed score has become negligible"""
+        try:
+            epoch = await TrendingService._current_epoch(db)
+            stored_threshold = TrendingService.PRUNE_THRESHOLD * TrendingService._growth_factor(datetime.utcnow(), epoch)
+            result = await db.trending_vendors.delete_many({"epoch": epoch, "score": {"$lt": stored_threshold}})
+            return result.deleted_count
+        except Exception as e:
+            logger.error(f"Trending leaderboard prune failed: {str(e)}")
+            return 0
+    
+    @staticmethod
+    async def run_maintenance(db: AsyncIOMotorDatabase):
+        """Periodic job: backfill an empty leaderboard, then rebase and prune it on an interval"""
+        if await db.trending_vendors.estimated_document_count() == 0:
+            rebuilt = await TrendingService.rebuild_leaderboard(db)
+            logger.info(f"Trending leaderboard rebuilt with {rebuilt} vendors")
+        
+        while True:
+            rebased = await TrendingService.rebase_leaderboard(db)
+            if rebased:
+                logger.info(f"Rescaled {rebased} trending entries to the current epoch")
+            pruned = await TrendingService.prune_leaderboard(db)
+            if pruned:
+                logger.info(f"Pruned {pruned} stale trending entries")
+            await asyncio.sleep(TrendingService.REFRESH_INTERVAL_SECONDS)
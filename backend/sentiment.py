@@ -0,0 +1,127 @@
+import re
+from typing import Dict, FrozenSet, List, Tuple
+
+# Bump whenever the lexicon or scoring rules change; stored reviews scored
+# with an older version are re-scored by EnhancedReviewService.rescore_sentiment
+LEXICON_VERSION = 2
+
+POSITIVE_WORDS: FrozenSet[str] = frozenset([
+    'excellent', 'amazing', 'fantastic', 'wonderful', 'perfect', 'outstanding',
+    'incredible', 'awesome', 'brilliant', 'exceptional', 'superb', 'magnificent',
+    'beautiful', 'stunning', 'gorgeous', 'lovely', 'delightful', 'charming',
+    'professional', 'responsive', 'helpful', 'friendly', 'accommodating',
+    'creative', 'talented', 'skilled', 'experienced', 'knowledgeable',
+    'punctual', 'reliable', 'organized', 'efficient', 'thorough',
+    'recommend', 'loved', 'satisfied', 'pleased', 'impressed', 'exceeded'
+])
+
+NEGATIVE_WORDS: FrozenSet[str] = frozenset([
+    'terrible', 'awful', 'horrible', 'worst', 'disappointing', 'unprofessional',
+    'rude', 'late', 'delayed', 'cancelled', 'expensive', 'overpriced',
+    'poor', 'bad', 'unsatisfied', 'unhappy', 'frustrated', 'angry',
+    'disorganized', 'unreliable', 'unresponsive', 'difficult', 'stressful',
+    'mistake', 'error', 'problem', 'issue', 'complaint', 'regret',
+    'avoid', 'waste'
+])
+
+# Multi-word expressions, matched before single words (longest first)
+POSITIVE_PHRASES = [
+    'above and beyond', 'highly recommend', 'on time', 'worth every penny',
+    'value for money', 'made our day', 'went the extra mile'
+]
+NEGATIVE_PHRASES = [
+    'waste of money', 'waste of time', 'no show', 'never showed up',
+    'let us down', 'last minute', 'not worth'
+]
+
+# Flip the polarity of the next sentiment term in the same clause
+NEGATORS: FrozenSet[str] = frozenset([
+    'not', 'no', 'never', 'nothing', 'hardly', 'barely', 'without',
+    'dont', 'didnt', 'doesnt', 'wasnt', 'werent', 'isnt', 'arent',
+    'cant', 'couldnt', 'wouldnt', 'wont', 'shouldnt'
+])
+# A negator only reaches this many tokens ahead ("not very professional")
+NEGATION_SCOPE = 3
+
+_CLAUSE_SPLIT = re.compile(r"[.!?;,:\n]+|\bbut\b")
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+def _tokens(text: str) -> List[str]:
+    # Apostrophes are dropped so "didn't" matches the "didnt" negator
+    return _TOKEN.findall(text.replace("'", "").replace("’", ""))
+
+def _compile_phrases() -> Dict[str, List[Tuple[Tuple[str, ...], int]]]:
+    """First token -> [(phrase tokens, polarity)], longest phrases first"""
+    phrases: Dict[str, List[Tuple[Tuple[str, ...], int]]] = {}
+    for polarity, entries in ((1, POSITIVE_PHRASES), (-1, NEGATIVE_PHRASES)):
+        for phrase in entries:
+            tokens = tuple(_tokens(phrase))
+            phrases.setdefault(tokens[0], []).append((tokens, polarity))
+    for candidates in phrases.values():
+        candidates.sort(key=lambda candidate: -len(candidate[0]))
+    return phrases
+
+_PHRASES = _compile_phrases()
+
+def _clause_counts(tokens: List[str]) -> Tuple[int, int]:
+    positive = negative = 0
+    negated_until = -1
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        polarity, length = 0, 1
+        for phrase, phrase_polarity in _PHRASES.get(token, ()):
+            if tuple(tokens[i:i + len(phrase)]) == phrase:
+                polarity, length = phrase_polarity, len(phrase)
+                break
+        if not polarity:
+            if token in POSITIVE_WORDS:
+                polarity = 1
+            elif token in NEGATIVE_WORDS:
+                polarity = -1
+            elif token in NEGATORS:
+                negated_until = i + NEGATION_SCOPE
+        if polarity:
+            if i <= negated_until:
+                polarity = -polarity
+                negated_until = -1
+            if polarity > 0:
+                positive += 1
+            else:
+                negative += 1
+        i += length
+    return positive, negative
+
+def score_text(text: str) -> dict:
+    """Sentiment of review text: label, score in [-1, 1] and matched term counts"""
+    positive_count = negative_count = 0
+    for clause in _CLAUSE_SPLIT.split((text or '').lower()):
+        positive, negative = _clause_counts(_tokens(clause))
+        positive_count += positive
+        negative_count += negative
+
+    # Calculate sentiment score (-1 to 1)
+    total_sentiment_words = positive_count + negative_count
+    if total_sentiment_words == 0:
+        sentiment_score = 0
+        sentiment = 'neutral'
+    else:
+        sentiment_score = (positive_count - negative_count) / total_sentiment_words
+
+        if sentiment_score > 0.2:
+            sentiment = 'positive'
+        elif sentiment_score < -0.2:
+            sentiment = 'negative'
+        else:
+            sentiment = 'neutral'
+
+    return {
+        'sentiment': sentiment,
+        'score': sentiment_score,
+        'positive_words': positive_count,
+        'negative_words': negative_count
+    }
+
+def score_texts(texts: List[str]) -> List[dict]:
+    """Score a chunk of texts; the unit of work handed to re-scoring worker processes"""
+    return [score_text(text) for text in texts]
@@ -1,11 +1,15 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, Request, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, Request, Response, UploadFile, File, WebSocket, WebSocketDisconnect
 from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorDatabase
 import os
+import asyncio
 import logging
 import json
+import hashlib
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 from datetime import timedelta, datetime
@@ -26,12 +30,24 @@ from .auth import (
 from .services import AdminService, NotificationService, VendorAnalyticsService, PaymentService
 from .phase2_services import ReviewService, TrustScoreService, SeatingChartService, RSVPService, VendorCalendarService, DecisionSupportService
 from .file_service import FileUploadService
-from .search_service import AISearchService, WishlistService, ViewTrackingService
+from .search_service import AISearchService, WishlistService, ViewTrackingService, TrendingService
+from .co_engagement import CoEngagementService
+from .recommendation_cache import recommendation_cache
+from .recompute_queue import recompute_queue
 from .communication_service import ChatService, connection_manager, NotificationService as RealTimeNotificationService
 from . import chat as stream_chat
 from .supabase_client import create_bucket_if_not_exists
 from .stripe_payment_service import StripePaymentService
 from .enhanced_review_service import EnhancedReviewService
+from .review_stats import ReviewStatsService
+from .review_buckets import ReviewBucketService
+from .vote_buffer import helpful_vote_buffer
+from .review_photos import shutdown_photo_pool
+from .catalog_index import catalog_index
+from .search_indexes import refresh_vendor, run_index_maintenance
+from .gazetteer import gazetteer
+from .pricing_engine import price_engine_for
+from .pagination import decode_cursor, keyset_query, next_cursor
 
 # Import Stripe integration
 from emergentintegrations.payments.stripe.checkout import StripeCheckout, CheckoutSessionResponse, CheckoutStatusResponse, CheckoutSessionRequest
@@ -57,6 +73,7 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Database dependency
@@ -76,6 +93,37 @@ async def get_admin_user(
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
 
+# Keyset pagination for list endpoints; the next page's cursor goes in the X-Next-Cursor header
+VENDOR_LISTING_SORT = [("created_at", 1), ("id", 1)]
+ADMIN_LISTING_SORT = [("created_at", -1), ("id", -1)]
+
+async def fetch_page(collection, query: dict, sort: list, limit: int, cursor: Optional[str]) -> list:
+    try:
+        after = decode_cursor(cursor, sort) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if after:
+        query = keyset_query(query, sort, after)
+    return await collection.find(query).sort(sort).limit(limit).to_list(limit)
+
+def set_next_cursor(response: Response, items: list, sort: list, limit: int):
+    following = next_cursor(items, sort, limit)
+    if following:
+        response.headers["X-Next-Cursor"] = following
+
+def conditional_json(request: Request, payload: Any, max_age: int = 60) -> Response:
+    """JSON response with an ETag; 304 without a body when the client's copy is current"""
+    content = jsonable_encoder(payload)
+    body = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    etag = f'"{hashlib.sha1(body.encode()).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in candidates or "*" in candidates:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content, headers=headers)
+
 # Authentication routes
 @api_router.post("/auth/register", response_model=UserResponse)
 async def register_user(user_data: UserCreate, db: AsyncIOMotorDatabase = Depends(get_db)):
@@ -147,7 +195,10 @@ async def create_vendor_profile(
         raise HTTPException(status_code=400, detail="Vendor profile already exists")
     
     vendor_profile = VendorProfile(**profile_data.dict(), user_id=current_user.id)
-    await db.vendor_profiles.insert_one(vendor_profile.dict())
+    profile_doc = vendor_profile.dict()
+    profile_doc.update(gazetteer.location_fields(vendor_profile.location, vendor_profile.service_areas))
+    await db.vendor_profiles.insert_one(profile_doc)
+    await refresh_vendor(db, vendor_profile.id)
     return vendor_profile
 
 @api_router.get("/vendors/profile", response_model=VendorProfile)
@@ -173,6 +224,16 @@ async def update_vendor_profile(
     update_data = {k: v for k, v in profile_update.dict().items() if v is not None}
     update_data["updated_at"] = datetime.utcnow()
     
+    # Keep the normalized location tokens in step with location/service areas
+    if "location" in update_data or "service_areas" in update_data:
+        existing = await db.vendor_profiles.find_one(
+            {"user_id": current_user.id}, {"location": 1, "service_areas": 1}
+        ) or {}
+        update_data.update(gazetteer.location_fields(
+            update_data.get("location", existing.get("location")),
+            update_data.get("service_areas", existing.get("service_areas", []))
+        ))
+    
     result = await db.vendor_profiles.update_one(
         {"user_id": current_user.id},
         {"$set": update_data}
@@ -182,23 +243,57 @@ async def update_vendor_profile(
         raise HTTPException(status_code=404, detail="Vendor profile not found")
     
     updated_profile = await db.vendor_profiles.find_one({"user_id": current_user.id})
+    await refresh_vendor(db, updated_profile["id"])
     return VendorProfile(**updated_profile)
 
 @api_router.get("/vendors", response_model=List[VendorProfile])
 async def search_vendors(
+    response: Response,
     category: Optional[VendorCategory] = None,
     location: Optional[str] = None,
     min_rating: Optional[float] = None,
     featured_only: Optional[bool] = False,
     limit: int = 20,
     skip: int = 0,
+    cursor: Optional[str] = None,
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
+    # Keyset cursor from a previous page's X-Next-Cursor header
+    try:
+        after = decode_cursor(cursor, VENDOR_LISTING_SORT) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Known places match exact indexed tokens; anything else falls back to regex
+    location_tokens = gazetteer.query_tokens(location)
+    
+    # Serve from the in-memory catalog when it can answer the filters
+    if catalog_index.ready and (location_tokens or not location):
+        equals = {}
+        if category:
+            equals["category"] = category
+        if featured_only:
+            equals["featured"] = True
+        any_of = {"location_tokens": location_tokens} if location_tokens else {}
+        ranges = {"average_rating": (min_rating, None)} if min_rating else {}
+        
+        after_key = None
+        if after:
+            after_key = catalog_index.sort_key(dict(zip(("created_at", "id"), after)), "created")
+        
+        vendors, _ = catalog_index.search(
+            equals=equals, any_of=any_of, ranges=ranges, after=after_key, sort="created", offset=skip, limit=limit
+        )
+        set_next_cursor(response, vendors, VENDOR_LISTING_SORT, limit)
+        return [VendorProfile(**vendor) for vendor in vendors]
+    
     # Build query
     query = {}
     if category:
         query["category"] = category
-    if location:
+    if location_tokens:
+        query["location_tokens"] = {"$in": location_tokens}
+    elif location:
         query["$or"] = [
             {"location": {"$regex": location, "$options": "i"}},
             {"service_areas": {"$regex": location, "$options": "i"}}
@@ -209,7 +304,10 @@ async def search_vendors(
         query["featured"] = True
     
     # Execute query
-    vendors = await db.vendor_profiles.find(query).skip(skip).limit(limit).to_list(limit)
+    if after:
+        query = keyset_query(query, VENDOR_LISTING_SORT, after)
+    vendors = await db.vendor_profiles.find(query).sort(VENDOR_LISTING_SORT).skip(skip).limit(limit).to_list(limit)
+    set_next_cursor(response, vendors, VENDOR_LISTING_SORT, limit)
     return [VendorProfile(**vendor) for vendor in vendors]
 
 @api_router.get("/vendors/{vendor_id}", response_model=VendorProfile)
@@ -254,6 +352,9 @@ async def update_couple_profile(
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Couple profile not found")
     
+    # Style preferences feed recommendations
+    recommendation_cache.invalidate(current_user.id)
+    
     updated_profile = await db.couple_profiles.find_one({"user_id": current_user.id})
     return CoupleProfile(**updated_profile)
 
@@ -508,16 +609,23 @@ async def get_platform_metrics(
 
 @api_router.get("/admin/vendors/pending", response_model=List[VendorProfile])
 async def get_pending_vendors(
+    response: Response,
+    limit: int = 100,
+    cursor: Optional[str] = None,
     admin_user: UserResponse = Depends(get_admin_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Get all vendors awaiting approval"""
-    vendors = await db.vendor_profiles.find({"status": VendorStatus.PENDING}).to_list(100)
+    vendors = await fetch_page(db.vendor_profiles, {"status": VendorStatus.PENDING}, ADMIN_LISTING_SORT, limit, cursor)
+    set_next_cursor(response, vendors, ADMIN_LISTING_SORT, limit)
     return [VendorProfile(**vendor) for vendor in vendors]
 
 @api_router.get("/admin/vendors", response_model=List[VendorProfile])
 async def get_all_vendors_admin(
+    response: Response,
     status: Optional[VendorStatus] = None,
+    limit: int = 1000,
+    cursor: Optional[str] = None,
     admin_user: UserResponse = Depends(get_admin_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
@@ -526,7 +634,8 @@ async def get_all_vendors_admin(
     if status:
         query["status"] = status
     
-    vendors = await db.vendor_profiles.find(query).to_list(1000)
+    vendors = await fetch_page(db.vendor_profiles, query, ADMIN_LISTING_SORT, limit, cursor)
+    set_next_cursor(response, vendors, ADMIN_LISTING_SORT, limit)
     return [VendorProfile(**vendor) for vendor in vendors]
 
 @api_router.post("/admin/vendors/{vendor_id}/approve")
@@ -539,6 +648,9 @@ async def approve_vendor(
     success = await AdminService.approve_vendor(db, vendor_id, admin_user.id)
     if not success:
         raise HTTPException(status_code=404, detail="Vendor not found")
+    await refresh_vendor(db, vendor_id)
+    # Verification status feeds the trust score
+    recompute_queue.mark("trust_score", vendor_id)
     
     # Send approval email
     vendor = await db.vendor_profiles.find_one({"id": vendor_id})
@@ -562,6 +674,9 @@ async def reject_vendor(
     success = await AdminService.reject_vendor(db, vendor_id, admin_user.id, reason)
     if not success:
         raise HTTPException(status_code=404, detail="Vendor not found")
+    await refresh_vendor(db, vendor_id)
+    # Verification status feeds the trust score
+    recompute_queue.mark("trust_score", vendor_id)
     
     # Send rejection email
     vendor = await db.vendor_profiles.find_one({"id": vendor_id})
@@ -576,7 +691,10 @@ async def reject_vendor(
 
 @api_router.get("/admin/users", response_model=List[UserResponse])
 async def get_all_users(
+    response: Response,
     user_type: Optional[UserType] = None,
+    limit: int = 1000,
+    cursor: Optional[str] = None,
     admin_user: UserResponse = Depends(get_admin_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
@@ -585,7 +703,8 @@ async def get_all_users(
     if user_type:
         query["user_type"] = user_type
     
-    users = await db.users.find(query).to_list(1000)
+    users = await fetch_page(db.users, query, ADMIN_LISTING_SORT, limit, cursor)
+    set_next_cursor(response, users, ADMIN_LISTING_SORT, limit)
     return [UserResponse(**user) for user in users]
 
 # Payment routes
@@ -678,6 +797,7 @@ async def get_checkout_status(
                         }
                     }
                 )
+                await refresh_vendor(db, vendor_profile["id"])
         
         await db.payment_transactions.update_one(
             {"session_id": session_id},
@@ -844,7 +964,7 @@ async def get_vendor_trust_score(
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Get vendor trust score"""
-    trust_score = await TrustScoreService.calculate_trust_score(db, vendor_id)
+    trust_score = await TrustScoreService.get_trust_score(db, vendor_id)
     return trust_score
 
 @api_router.post("/vendors/{vendor_id}/calculate-trust-score")
@@ -853,9 +973,21 @@ async def recalculate_trust_score(
     admin_user: UserResponse = Depends(get_admin_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    """Recalculate vendor trust score (admin only)"""
-    trust_score = await TrustScoreService.calculate_trust_score(db, vendor_id)
-    return {"message": "Trust score recalculated", "score": trust_score.overall_score}
+    """Queue a vendor trust score recalculation (admin only); returns the score stored until it lands"""
+    trust_score = await TrustScoreService.get_stored_trust_score(db, vendor_id)
+    recompute_queue.mark("trust_score", vendor_id)
+    return {
+        "message": "Trust score recalculation queued",
+        "queued": True,
+        "trust_score": trust_score
+    }
+
+@api_router.get("/admin/metrics/recompute-queue")
+async def get_recompute_queue_metrics(
+    admin_user: UserResponse = Depends(get_admin_user)
+):
+    """Depth, lag and throughput of the background score recompute queue"""
+    return recompute_queue.metrics()
 
 # Enhanced Planning Tools: Seating Charts
 @api_router.post("/planning/seating-charts", response_model=SeatingChart)
@@ -1004,6 +1136,7 @@ async def create_vendor_package(
     
     package = VendorPackage(**package_data, vendor_id=vendor_profile["id"])
     await db.vendor_packages.insert_one(package.dict())
+    await refresh_vendor(db, vendor_profile["id"])
     return package
 
 @api_router.get("/vendors/{vendor_id}/packages", response_model=List[VendorPackage])
@@ -1015,6 +1148,20 @@ async def get_vendor_packages(
     packages = await db.vendor_packages.find({"vendor_id": vendor_id}).to_list(100)
     return [VendorPackage(**package) for package in packages]
 
+@api_router.get("/vendors/{vendor_id}/packages/{package_id}/quote")
+async def quote_vendor_package(
+    vendor_id: str,
+    package_id: str,
+    event_date: datetime,
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """Price of a package on a given date, with seasonal pricing applied"""
+    engine = await price_engine_for(db, [vendor_id])
+    quote = engine.quote_package(package_id, event_date)
+    if not quote or quote["vendor_id"] != vendor_id:
+        raise HTTPException(status_code=404, detail="Package not found")
+    return quote
+
 # Decision Support Tools
 @api_router.post("/planning/vendor-comparison", response_model=VendorComparison)
 async def create_vendor_comparison(
@@ -1047,6 +1194,27 @@ async def get_vendor_comparisons(
     comparisons = await db.vendor_comparisons.find({"couple_id": couple_profile["id"]}).to_list(100)
     return [VendorComparison(**comp) for comp in comparisons]
 
+@api_router.get("/planning/vendor-comparisons/{comparison_id}/quotes")
+async def get_vendor_comparison_quotes(
+    comparison_id: str,
+    event_date: datetime,
+    guest_count: Optional[int] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """Package prices on the event date for every vendor in a comparison"""
+    current_user = await get_current_user(credentials, db)
+    couple_profile = await db.couple_profiles.find_one({"user_id": current_user.id})
+    if not couple_profile:
+        raise HTTPException(status_code=404, detail="Couple profile not found")
+    
+    comparison = await db.vendor_comparisons.find_one({"id": comparison_id, "couple_id": couple_profile["id"]})
+    if not comparison:
+        raise HTTPException(status_code=404, detail="Comparison not found")
+    
+    quotes = await DecisionSupportService.quote_vendors(db, comparison["vendors"], event_date, guest_count)
+    return {"comparison_id": comparison_id, "event_date": event_date, "quotes": quotes}
+
 @api_router.post("/planning/budget-optimization", response_model=BudgetOptimization)
 async def optimize_budget(
     total_budget: float,
@@ -1150,21 +1318,30 @@ async def get_user_files(
     file_category: str,
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = None,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Get user's uploaded files"""
     current_user = await get_current_user(credentials, db)
     
-    files = await FileUploadService.get_user_files(
-        user_id=current_user.id,
-        file_category=file_category,
-        db=db,
-        limit=limit,
-        offset=offset
-    )
+    try:
+        files = await FileUploadService.get_user_files(
+            user_id=current_user.id,
+            file_category=file_category,
+            db=db,
+            limit=limit,
+            offset=offset,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return {"files": files, "total": len(files)}
+    return {
+        "files": files,
+        "total": len(files),
+        "next_cursor": next_cursor(files, FileUploadService.LISTING_SORT, limit)
+    }
 
 @api_router.delete("/files/{file_id}")
 async def delete_file(
@@ -1192,22 +1369,70 @@ async def enhanced_vendor_search(
     search_filter: SearchFilter,
     limit: int = 20,
     offset: int = 0,
+    cursor: Optional[str] = None,
+    include_facets: bool = False,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Enhanced vendor search with AI recommendations"""
     current_user = await get_current_user(credentials, db)
     
-    results = await AISearchService.enhanced_vendor_search(
-        db=db,
-        search_filter=search_filter,
-        user_id=current_user.id,
-        limit=limit,
-        offset=offset
-    )
+    if search_filter.near and AISearchService.resolve_near(search_filter) is None:
+        raise HTTPException(status_code=400, detail="Unknown venue location")
+    
+    try:
+        results = await AISearchService.enhanced_vendor_search(
+            db=db,
+            search_filter=search_filter,
+            user_id=current_user.id,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            include_facets=include_facets
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return results
 
+@api_router.get("/search/trending")
+async def get_trending_vendors(
+    limit: int = 5,
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """Get trending vendors from the materialized leaderboard (public endpoint)"""
+    trending = await TrendingService.get_trending_vendors(db, limit=min(limit, 50))
+    return {"trending": trending}
+
+@api_router.get("/vendors/{vendor_id}/also-liked")
+async def get_also_liked_vendors(
+    vendor_id: str,
+    limit: int = 6,
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """Vendors that couples who engaged with this vendor also engaged with (public endpoint)"""
+    neighbors = await CoEngagementService.get_neighbors(db, vendor_id)
+    scores = {neighbor["vendor_id"]: neighbor["score"] for neighbor in neighbors}
+    
+    vendors = await db.vendor_profiles.find(
+        {"id": {"$in": list(scores)}, "status": "approved"}, {"_id": 0}
+    ).to_list(len(scores))
+    for vendor in vendors:
+        vendor["similarity_score"] = scores[vendor["id"]]
+    vendors.sort(key=lambda v: v["similarity_score"], reverse=True)
+    
+    return {"vendor_id": vendor_id, "also_liked": vendors[:max(1, min(limit, 20))]}
+
+@api_router.get("/search/autocomplete")
+async def autocomplete_search(
+    q: str,
+    limit: int = 8,
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """Typeahead suggestions: vendor names, categories, style tags and locations (public endpoint)"""
+    suggestions = await AISearchService.autocomplete(db, q, limit=max(1, min(limit, 20)))
+    return {"query": q, "suggestions": suggestions}
+
 @api_router.post("/wishlist/add/{vendor_id}")
 async def add_to_wishlist(
     vendor_id: str,
@@ -1506,20 +1731,24 @@ async def get_vendor_reviews(
     vendor_id: str,
     limit: int = 20,
     offset: int = 0,
+    cursor: Optional[str] = None,
     db = Depends(get_database)
 ):
     """Get reviews for a specific vendor"""
     try:
         review_service = EnhancedReviewService(db)
-        reviews = await review_service.get_vendor_reviews(vendor_id, limit, offset)
+        reviews = await review_service.get_vendor_reviews(vendor_id, limit, offset, cursor)
         
         return {
             "reviews": reviews,
             "total": len(reviews),
             "limit": limit,
-            "offset": offset
+            "offset": offset,
+            "next_cursor": next_cursor(reviews, EnhancedReviewService.LISTING_SORT, limit)
         }
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get reviews: {str(e)}")
 
@@ -1663,7 +1892,7 @@ async def vote_review_helpful(
     """Vote on review helpfulness"""
     try:
         review_service = EnhancedReviewService(db)
-        success = await review_service.vote_helpful(review_id, helpful)
+        success = await review_service.vote_helpful(review_id, helpful, current_user.id)
         
         if success:
             return {"status": "success", "message": "Vote recorded successfully"}
@@ -1678,35 +1907,17 @@ async def vote_review_helpful(
 # Get trending reviews (public)
 @api_router.get("/reviews/trending")
 async def get_trending_reviews(
+    request: Request,
     limit: int = 10,
     db = Depends(get_database)
 ):
-    """Get trending reviews across the platform"""
+    """Get trending reviews across the platform (public endpoint)"""
     try:
-        review_service = EnhancedReviewService(db)
-        
-        # Get recent high-rated reviews with photos
-        cursor = review_service.reviews_collection.find({
-            'status': 'verified',
-            'rating': {'$gte': 4.0},
-            'photos': {'$ne': []},
-            'created_at': {'$gte': datetime.utcnow() - timedelta(days=30)}
-        }).sort([
-            ('helpful_votes', -1),
-            ('rating', -1),
-            ('created_at', -1)
-        ]).limit(limit)
-        
-        trending_reviews = await cursor.to_list(length=limit)
-        
-        # Add vendor info
-        for review in trending_reviews:
-            vendor = await review_service.vendors_collection.find_one({'id': review['vendor_id']})
-            if vendor:
-                review['vendor_name'] = vendor.get('business_name', 'Unknown')
-                review['vendor_category'] = vendor.get('category', 'Unknown')
-        
-        return {"trending_reviews": trending_reviews}
+        # The snapshot only keeps the top of the trending pool
+        trending_reviews = await ReviewStatsService.get_trending_reviews(
+            db, min(limit, ReviewStatsService.TRENDING_POOL_SIZE)
+        )
+        return conditional_json(request, {"trending_reviews": trending_reviews})
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get trending reviews: {str(e)}")
@@ -1714,58 +1925,13 @@ async def get_trending_reviews(
 # Get review statistics (public)
 @api_router.get("/reviews/statistics")
 async def get_review_statistics(
+    request: Request,
     db = Depends(get_database)
 ):
     """Get platform-wide review statistics"""
     try:
-        review_service = EnhancedReviewService(db)
-        
-        # Get overall stats
-        total_reviews = await review_service.reviews_collection.count_documents({'status': 'verified'})
-        
-        # Average rating across platform
-        pipeline = [
-            {'$match': {'status': 'verified'}},
-            {'$group': {'_id': None, 'avg_rating': {'$avg': '$rating'}}}
-        ]
-        
-        avg_result = await review_service.reviews_collection.aggregate(pipeline).to_list(1)
-        platform_avg = avg_result[0]['avg_rating'] if avg_result else 0
-        
-        # Sentiment distribution
-        sentiment_pipeline = [
-            {'$match': {'status': 'verified'}},
-            {'$group': {'_id': '$sentiment', 'count': {'$sum': 1}}}
-        ]
-        
-        sentiment_results = await review_service.reviews_collection.aggregate(sentiment_pipeline).to_list(10)
-        sentiment_distribution = {result['_id']: result['count'] for result in sentiment_results}
-        
-        # Top rated categories
-        vendor_cursor = review_service.vendors_collection.find({
-            'average_rating': {'$gte': 4.5},
-            'review_count': {'$gte': 5}
-        }).sort('average_rating', -1).limit(5)
-        
-        top_vendors = await vendor_cursor.to_list(5)
-        
-        return {
-            "statistics": {
-                "total_reviews": total_reviews,
-                "platform_average_rating": round(platform_avg, 2),
-                "sentiment_distribution": sentiment_distribution,
-                "top_rated_vendors": [
-                    {
-                        "id": v["id"],
-                        "name": v.get("business_name", "Unknown"),
-                        "category": v.get("category", "Unknown"),
-                        "rating": v.get("average_rating", 0),
-                        "review_count": v.get("review_count", 0)
-                    }
-                    for v in top_vendors
-                ]
-            }
-        }
+        statistics = await ReviewStatsService.get_statistics(db)
+        return conditional_json(request, {"statistics": statistics})
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get statistics: {str(e)}")
@@ -1863,15 +2029,44 @@ app.include_router(api_router)
 # Include Stream Chat router
 app.include_router(stream_chat.router)
 
+# Long-running maintenance jobs started with the app
+background_tasks: List[asyncio.Task] = []
+
+async def prepare_review_history(db: AsyncIOMotorDatabase):
+    """Bucket existing reviews, then re-score their sentiment.
+
+    The re-score shifts bucket sentiment counts from each review's old label
+    to its new one, so the buckets have to exist (built from the old labels)
+    before it starts.
+    """
+    await ReviewBucketService.backfill(db)
+    # No-op unless the sentiment lexicon changed since reviews were scored
+    await EnhancedReviewService(db).rescore_sentiment()
+
 # Event handlers
 @app.on_event("startup")
 async def startup_event():
     await connect_to_mongo()
     await create_bucket_if_not_exists()
+    
+    db = await get_database()
+    background_tasks.append(asyncio.create_task(TrendingService.run_maintenance(db)))
+    background_tasks.append(asyncio.create_task(run_index_maintenance(db)))
+    background_tasks.append(asyncio.create_task(CoEngagementService.run_maintenance(db)))
+    background_tasks.append(asyncio.create_task(recompute_queue.run(db)))
+    background_tasks.append(asyncio.create_task(ReviewStatsService.run_maintenance(db)))
+    background_tasks.append(asyncio.create_task(helpful_vote_buffer.run(db)))
+    background_tasks.append(asyncio.create_task(prepare_review_history(db)))
+    # Fingerprints reviews written before duplicate detection and flags existing copies
+    background_tasks.append(asyncio.create_task(EnhancedReviewService(db).detect_duplicate_reviews()))
     logger.info("Application startup complete")
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    shutdown_photo_pool()
     await close_mongo_connection()
     logger.info("Application shutdown complete")
 
@@ -0,0 +1,200 @@
+import logging
+import math
+import re
+import time
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "our", "the", "to", "we", "with", "you", "your"
+})
+
+def _stem(word: str) -> str:
+    """Light plural stemming so 'photographers' matches 'photographer'"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercased, stemmed word tokens with stopwords removed"""
+    if not text:
+        return []
+    return [_stem(word) for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+
+class VendorTextIndex:
+    """In-process BM25 full-text index over vendor profiles and their packages.
+
+    Each vendor is one document made of boosted fields (BM25F): a term's
+    frequency is the boost-weighted sum of its occurrences across fields, and
+    document length is normalized the same way. Vendors are assigned integer
+    slots; postings map a term to ``{slot: weighted_tf}`` for cheap
+    incremental ``upsert``/``remove``, and are compiled lazily into numpy
+    arrays so a query scores each term's whole posting list in one vectorized
+    step.
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    FIELD_BOOSTS = {
+        "business_name": 3.0,
+        "category": 2.0,
+        "style_tags": 2.0,
+        "location": 1.0,
+        "description": 1.0,
+        "packages": 1.0
+    }
+
+    # Wall-clock budget for scoring one query; rarest terms are scored first
+    SEARCH_BUDGET_MS = 50
+
+    def __init__(self):
+        self.ready = False
+        self._reset()
+
+    def _reset(self):
+        self._slots: Dict[str, int] = {}
+        self._slot_ids: List[Optional[str]] = []
+        self._free_slots: List[int] = []
+        self._lengths = np.zeros(0, dtype=np.float64)
+        self._total_length = 0.0
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._doc_terms: Dict[str, List[str]] = {}
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    @staticmethod
+    def _field_text(profile: Dict[str, Any], packages: List[Dict[str, Any]]) -> Dict[str, str]:
+        category = profile.get("category")
+        package_text = " ".join(
+            " ".join([package.get("name", ""), package.get("description", "")] + list(package.get("inclusions", [])))
+            for package in packages
+        )
+        return {
+            "business_name": profile.get("business_name", ""),
+            "category": getattr(category, "value", category) or "",
+            "style_tags": " ".join(profile.get("style_tags", [])),
+            "location": profile.get("location", ""),
+            "description": profile.get("description", ""),
+            "packages": package_text
+        }
+
+    def _term_weights(self, profile: Dict[str, Any], packages: List[Dict[str, Any]]) -> Tuple[Dict[str, float], float]:
+        weights: Dict[str, float] = defaultdict(float)
+        length = 0.0
+        for field, text in self._field_text(profile, packages).items():
+            boost = self.FIELD_BOOSTS[field]
+            for term in tokenize(text):
+                weights[term] += boost
+                length += boost
+        return weights, length
+
+    def _allocate_slot(self, vendor_id: str) -> int:
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._slot_ids[slot] = vendor_id
+        else:
+            slot = len(self._slot_ids)
+            self._slot_ids.append(vendor_id)
+            if slot >= len(self._lengths):
+                self._lengths = np.concatenate([self._lengths, np.zeros(max(slot, 1024), dtype=np.float64)])
+        self._slots[vendor_id] = slot
+        return slot
+
+    def load(self, profiles: List[Dict[str, Any]], packages_by_vendor: Dict[str, List[Dict[str, Any]]]):
+        """Replace the index contents with a full snapshot"""
+        self._reset()
+        for profile in profiles:
+            self._add(profile, packages_by_vendor.get(profile["id"], []))
+        self.ready = True
+
+    def _add(self, profile: Dict[str, Any], packages: List[Dict[str, Any]]):
+        vendor_id = profile["id"]
+        weights, length = self._term_weights(profile, packages)
+        slot = self._allocate_slot(vendor_id)
+        for term, weight in weights.items():
+            self._postings[term][slot] = weight
+            self._arrays.pop(term, None)
+        self._doc_terms[vendor_id] = list(weights)
+        self._lengths[slot] = length
+        self._total_length += length
+
+    def upsert(self, profile: Dict[str, Any], packages: List[Dict[str, Any]]):
+        """Add or replace a vendor's document"""
+        self.remove(profile["id"])
+        self._add(profile, packages)
+
+    def remove(self, vendor_id: str):
+        """Drop a vendor's document if present"""
+        slot = self._slots.pop(vendor_id, None)
+        if slot is None:
+            return
+        for term in self._doc_terms.pop(vendor_id):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(slot, None)
+                if not postings:
+                    del self._postings[term]
+            self._arrays.pop(term, None)
+        self._total_length -= self._lengths[slot]
+        self._lengths[slot] = 0.0
+        self._slot_ids[slot] = None
+        self._free_slots.append(slot)
+
+    def _term_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Posting list of a term as (slots, weighted tfs) arrays, compiled on first use"""
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings[term]
+            arrays = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float64, count=len(postings))
+            )
+            self._arrays[term] = arrays
+        return arrays
+
+    def search(self, query: str) -> Tuple[Dict[str, float], bool]:
+        """Score every vendor matching any query term.
+
+        Returns ``{vendor_id: bm25_score}`` and whether the latency budget cut
+        scoring short. Terms are scored rarest first, so when the budget runs
+        out only the most common (lowest IDF) terms are skipped.
+        """
+        terms = [term for term in dict.fromkeys(tokenize(query)) if term in self._postings]
+        doc_count = len(self._slots)
+        if not terms or not doc_count:
+            return {}, False
+
+        average_length = self._total_length / doc_count or 1.0
+        deadline = time.perf_counter() + self.SEARCH_BUDGET_MS / 1000
+        scores = np.zeros(len(self._slot_ids), dtype=np.float64)
+        truncated = False
+
+        for position, term in enumerate(sorted(terms, key=lambda t: len(self._postings[t]))):
+            if position and time.perf_counter() > deadline:
+                truncated = True
+                logger.warning(f"Text search budget exceeded for query {query!r}; scored {position} of {len(terms)} terms")
+                break
+            slots, tfs = self._term_arrays(term)
+            df = len(slots)
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            norms = self.K1 * (1 - self.B + self.B * self._lengths[slots] / average_length)
+            scores[slots] += idf * tfs * (self.K1 + 1) / (tfs + norms)
+
+        matched = np.flatnonzero(scores)
+        slot_ids = self._slot_ids
+        return {slot_ids[slot]: score for slot, score in zip(matched.tolist(), scores[matched].tolist())}, truncated
+
+# Process-wide full-text index, populated at startup alongside the catalog index
+text_index = VendorTextIndex()
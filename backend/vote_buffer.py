@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+class HelpfulVoteBuffer:
+    """Write-behind accumulator for review helpfulness votes.
+
+    Votes are merged into per-review ``[helpful, total]`` increments in
+    memory and written as one unordered ``bulk_write`` every
+    ``flush_interval`` seconds, or sooner once ``flush_threshold`` votes are
+    waiting. A repeat vote by the same user on the same review within
+    ``dedupe_window`` seconds is dropped. Increments that fail to write are
+    merged back and retried on the next flush, and the buffer is flushed
+    when the app shuts down.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = 0.25,
+        flush_threshold: int = 500,
+        dedupe_window: float = 600,
+        known_reviews: int = 10000
+    ):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.dedupe_window = dedupe_window
+        self.running = False
+        self._pending: Dict[str, List[int]] = {}
+        self._votes = 0
+        self._recent_voters: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        # Reviews seen to exist, so votes on popular reviews skip the lookup
+        self._known: "OrderedDict[str, None]" = OrderedDict()
+        self._known_limit = known_reviews
+        self._full = asyncio.Event()
+
+    async def _exists(self, db: AsyncIOMotorDatabase, review_id: str) -> bool:
+        if review_id in self._known:
+            self._known.move_to_end(review_id)
+            return True
+        if not await db.reviews.find_one({'id': review_id}, {'_id': 1}):
+            return False
+        self._known[review_id] = None
+        if len(self._known) > self._known_limit:
+            self._known.popitem(last=False)
+        return True
+
+    def _is_repeat(self, user_id: str, review_id: str) -> bool:
+        now = time.monotonic()
+        # Entries are in vote order, so expired ones are at the front
+        while self._recent_voters:
+            key, voted_at = next(iter(self._recent_voters.items()))
+            if now - voted_at < self.dedupe_window:
+                break
+            self._recent_voters.popitem(last=False)
+
+        key = (user_id, review_id)
+        if key in self._recent_voters:
+            return True
+        self._recent_voters[key] = now
+        return False
+
+    async def add(self, db: AsyncIOMotorDatabase, review_id: str, helpful: bool, user_id: str = None) -> bool:
+        """Buffer one vote; False if the review doesn't exist"""
+        if not await self._exists(db, review_id):
+            return False
+        if user_id and self._is_repeat(user_id, review_id):
+            return True
+
+        counts = self._pending.setdefault(review_id, [0, 0])
+        counts[0] += 1 if helpful else 0
+        counts[1] += 1
+        self._votes += 1
+
+        if not self.running:
+            # No background flusher (scripts, tests): write through
+            await self.flush(db)
+        elif self._votes >= self.flush_threshold:
+            self._full.set()
+        return True
+
+    async def flush(self, db: AsyncIOMotorDatabase) -> int:
+        """Write all buffered increments; returns the number of reviews updated"""
+        if not self._pending:
+            return 0
+        pending, self._pending, self._votes = self._pending, {}, 0
+
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {'id': review_id},
+                {'$inc': {'helpful_votes': helpful, 'total_votes': total}, '$set': {'updated_at': now}}
+            )
+            for review_id, (helpful, total) in pending.items()
+        ]
+        failed = list(pending)
+        try:
+            await db.reviews.bulk_write(operations, ordered=False)
+            return len(operations)
+        except BulkWriteError as e:
+            # Unordered: everything but the reported errors was applied
+            failed = [failed[error['index']] for error in e.details.get('writeErrors', [])]
+            logger.error(f"Helpful vote flush failed for {len(failed)} reviews, retrying next interval")
+        except asyncio.CancelledError:
+            # Shutdown interrupted the write; keep the votes for the final flush
+            self._requeue(pending, failed)
+            raise
+        except Exception as e:
+            logger.error(f"Helpful vote flush failed, retrying next interval: {str(e)}")
+
+        self._requeue(pending, failed)
+        return len(operations) - len(failed)
+
+    def _requeue(self, pending: Dict[str, List[int]], review_ids: List[str]):
+        for review_id in review_ids:
+            helpful, total = pending[review_id]
+            counts = self._pending.setdefault(review_id, [0, 0])
+            counts[0] += helpful
+            counts[1] += total
+            self._votes += total
+
+    async def run(self, db: AsyncIOMotorDatabase):
+        """Background job: flush on an interval or when the threshold is reached, and once more on shutdown"""
+        self._full = asyncio.Event()
+        self.running = True
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._full.clear()
+                await self.flush(db)
+        finally:
+            self.running = False
+            await self.flush(db)
+
+# Process-wide vote buffer; flushed by a background task started with the app
+helpful_vote_buffer = HelpfulVoteBuffer()
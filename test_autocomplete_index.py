@@ -0,0 +1,82 @@
+import unittest
+import random
+import sys
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend.autocomplete_index import AutocompleteIndex
+from backend.gazetteer import normalize_text
+
+PROFILES = [
+    {"id": "v1", "status": "approved", "business_name": "Rustic Barn Photography", "category": "photographer",
+     "style_tags": ["Rustic"], "location": "Byron Bay", "average_rating": 4.9, "total_reviews": 40},
+    {"id": "v2", "status": "approved", "business_name": "Barnyard Blooms", "category": "florist",
+     "style_tags": ["Boho"], "location": "Byron Bay", "average_rating": 4.0, "total_reviews": 2},
+    {"id": "v3", "status": "pending", "business_name": "Barnacle Cakes", "category": "caterer",
+     "style_tags": [], "location": "Sydney"},
+    {"id": "v4", "status": "approved", "business_name": "Harbour Hall", "category": "venue",
+     "style_tags": ["Modern"], "location": "Sydney", "service_areas": ["Sydney", "Blue Mountains"]}
+]
+
+def labels(suggestions):
+    return [suggestion["label"] for suggestion in suggestions]
+
+class TestAutocompleteIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = AutocompleteIndex()
+        self.index.load(PROFILES)
+
+    def test_prefix_matches_any_word(self):
+        """A prefix completes inside multi-word names, best-rated vendors first"""
+        self.assertEqual(labels(self.index.suggest("barn")), ["Rustic Barn Photography", "Barnyard Blooms"])
+        self.assertEqual(labels(self.index.suggest("blue m")), ["Blue Mountains"])
+
+    def test_shared_suggestions_count_vendors(self):
+        byron = self.index.suggest("byron")
+        self.assertEqual(byron, [{"type": "location", "label": "Byron Bay", "count": 2, "value": "byron bay"}])
+        vendor = self.index.suggest("harbour")[0]
+        self.assertEqual((vendor["type"], vendor["vendor_id"]), ("vendor", "v4"))
+
+    def test_unapproved_vendors_and_empty_prefixes(self):
+        self.assertNotIn("Barnacle Cakes", labels(self.index.suggest("barnacle")))
+        self.assertEqual(self.index.suggest("  "), [])
+        self.assertEqual(self.index.suggest("barn", limit=0), [])
+        self.assertEqual(len(self.index.suggest("b", limit=2)), 2)
+
+    def test_upsert_and_remove_match_a_fresh_load(self):
+        approved = dict(PROFILES[2], status="approved")
+        renamed = dict(PROFILES[0], business_name="Golden Barn Studio", style_tags=["Boho"])
+        self.index.upsert(approved)
+        self.index.upsert(renamed)
+        self.index.remove("v2")
+
+        fresh = AutocompleteIndex()
+        fresh.load([renamed, approved, PROFILES[3]])
+        for prefix in ("barn", "b", "rustic", "boho", "byron", "s", "golden", "h"):
+            self.assertEqual(self.index.suggest(prefix, limit=20), fresh.suggest(prefix, limit=20))
+
+    def test_top_k_matches_full_sort(self):
+        """The argpartition shortcut returns the same suggestions as sorting every match"""
+        rng = random.Random(7)
+        words = ["bay", "barn", "bloom", "bell", "beach", "bright", "blue"]
+        profiles = [
+            {"id": f"v{i}", "status": "approved", "business_name": " ".join(rng.sample(words, 2)) + f" {i}",
+             "average_rating": rng.choice([3.0, 4.0, 4.5, 5.0]), "total_reviews": rng.randint(0, 300)}
+            for i in range(400)
+        ]
+        index = AutocompleteIndex()
+        index.load(profiles)
+
+        expected = sorted(
+            (profile for profile in profiles if any(word.startswith("b") for word in normalize_text(profile["business_name"]).split())),
+            key=lambda profile: -AutocompleteIndex._vendor_weight(profile)
+        )
+        suggested = index.suggest("b", limit=10)
+        self.assertEqual(
+            [round(AutocompleteIndex._vendor_weight(profiles[int(s["vendor_id"][1:])]), 9) for s in suggested],
+            [round(AutocompleteIndex._vendor_weight(profile), 9) for profile in expected[:10]]
+        )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import random
+from datetime import date, datetime, timedelta
+import sys
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend.availability_index import AvailabilityIndex, HORIZON_DAYS
+
+START = date(2025, 1, 1)
+
+class TestAvailabilityIndex(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(14)
+        self.vendor_days = {
+            f"v{i}": {START + timedelta(days=rng.randrange(HORIZON_DAYS)) for _ in range(rng.randint(0, 300))}
+            for i in range(120)
+        }
+        self.index = AvailabilityIndex()
+        self.index.load(self.vendor_days, START)
+
+    def brute_force(self, vendor_days, days, match_all):
+        check = all if match_all else any
+        return {vendor_id for vendor_id, free in vendor_days.items() if free and check(day in free for day in days)}
+
+    def test_match_all_and_any_agree_with_sets(self):
+        rng = random.Random(3)
+        for _ in range(50):
+            days = [START + timedelta(days=rng.randrange(HORIZON_DAYS)) for _ in range(rng.randint(1, 4))]
+            for match_all in (True, False):
+                self.assertEqual(self.index.match(days, match_all), self.brute_force(self.vendor_days, days, match_all))
+
+    def test_word_boundaries_and_datetimes(self):
+        """Days on either side of a 64-bit word boundary and the last day of the horizon"""
+        index = AvailabilityIndex()
+        last = START + timedelta(days=HORIZON_DAYS - 1)
+        index.load({"a": [START + timedelta(days=63)], "b": [START + timedelta(days=64)], "c": [last]}, START)
+        self.assertEqual(index.match([datetime(2025, 3, 5, 15, 0)]), {"a"})
+        self.assertEqual(index.match([START + timedelta(days=64)]), {"b"})
+        self.assertEqual(index.match([last]), {"c"})
+
+    def test_horizon(self):
+        self.assertTrue(self.index.covers([START, START + timedelta(days=HORIZON_DAYS - 1)]))
+        self.assertFalse(self.index.covers([START - timedelta(days=1)]))
+        self.assertFalse(self.index.covers([START + timedelta(days=HORIZON_DAYS)]))
+        self.assertIsNone(self.index.day_offset(START + timedelta(days=HORIZON_DAYS)))
+
+    def test_set_days_and_remove_reuse_rows(self):
+        day = START + timedelta(days=200)
+        self.index.set_days("v0", [day])
+        self.index.set_days("v1", [])
+        self.index.remove("v2")
+        self.index.set_days("new", [day])
+
+        expected = dict(self.vendor_days, v0={day}, new={day})
+        del expected["v1"], expected["v2"]
+        self.assertEqual(len(self.index), sum(1 for days in expected.values() if days))
+        self.assertEqual(self.index.match([day]), self.brute_force(expected, [day], True))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+import unittest
+from unittest.mock import MagicMock
+import asyncio
+from datetime import date, datetime, timedelta
+import sys
+
+from pymongo.errors import DuplicateKeyError
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend.availability_store import (
+    expand_intervals, merge_days, migrate_daily_records, write_availability
+)
+
+START = date(2025, 6, 1)
+FREE = (True, False, "standard", None)
+BOOKED = (True, True, "standard", None)
+PEAK = (True, False, "peak", None)
+
+def day(offset):
+    return START + timedelta(days=offset)
+
+def matches(document, query):
+    """The subset of Mongo query operators the availability store uses"""
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(document, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = document.get(field)
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$lte" in condition and not value <= condition["$lte"]:
+                return False
+            if "$gte" in condition and not value >= condition["$gte"]:
+                return False
+            if "$lt" in condition and not (value is not None and value < condition["$lt"]):
+                return False
+        elif document.get(field) != condition:
+            return False
+    return True
+
+class FakeCursor:
+    def __init__(self, documents):
+        self._documents = documents
+
+    async def to_list(self, length=None):
+        # Yield so concurrent writers interleave between their read and write
+        await asyncio.sleep(0)
+        return [dict(document) for document in self._documents]
+
+class FakeCollection:
+    """In-memory collection with an optional unique key"""
+
+    def __init__(self, unique=None):
+        self.documents = []
+        self.unique = unique
+        self._next_id = 0
+
+    def _insert(self, document):
+        if self.unique and any(
+            all(existing.get(field) == document.get(field) for field in self.unique) for existing in self.documents
+        ):
+            raise DuplicateKeyError("duplicate key")
+        self._next_id += 1
+        self.documents.append(dict(document, _id=self._next_id))
+
+    def find(self, query=None, projection=None):
+        return FakeCursor([document for document in self.documents if matches(document, query or {})])
+
+    async def distinct(self, field, query=None):
+        return sorted({document[field] for document in self.documents if matches(document, query or {})})
+
+    async def bulk_write(self, operations, ordered=True):
+        await asyncio.sleep(0)
+        for operation in operations:
+            if hasattr(operation, "_doc"):
+                self._insert(operation._doc)
+            else:
+                self.documents = [document for document in self.documents if not matches(document, operation._filter)]
+
+    async def update_one(self, query, update, upsert=False):
+        await asyncio.sleep(0)
+        result = MagicMock(modified_count=0)
+        for document in self.documents:
+            if matches(document, query):
+                document.update(update["$set"])
+                result.modified_count = 1
+                return result
+        if upsert:
+            self._insert(dict({field: value for field, value in query.items() if not field.startswith("$")}, **update["$set"]))
+        return result
+
+    async def delete_many(self, query):
+        self.documents = [document for document in self.documents if not matches(document, query)]
+
+def fake_db():
+    db = MagicMock()
+    db.vendor_availability_intervals = FakeCollection(unique=("vendor_id", "start_date"))
+    db.vendor_availability_leases = FakeCollection(unique=("vendor_id",))
+    db.vendor_availability = FakeCollection()
+    return db
+
+def calendar(db, vendor_id, first, last):
+    """Per-day states of a vendor's stored intervals"""
+    intervals = [interval for interval in db.vendor_availability_intervals.documents if interval["vendor_id"] == vendor_id]
+    return {
+        entry.date.date(): (entry.is_available, entry.is_booked, entry.pricing_tier, entry.notes)
+        for entry in expand_intervals(intervals, first, last)
+    }
+
+class TestAvailabilityStore(unittest.IsolatedAsyncioTestCase):
+    def test_merge_days(self):
+        runs = merge_days({day(0): FREE, day(1): FREE, day(2): BOOKED, day(4): BOOKED})
+        self.assertEqual(runs, [(day(0), day(1), FREE), (day(2), day(2), BOOKED), (day(4), day(4), BOOKED)])
+
+    async def test_writes_merge_into_runs(self):
+        db = fake_db()
+        await write_availability(db, "v1", {day(offset): FREE for offset in range(10)})
+        await write_availability(db, "v1", {day(4): BOOKED})
+        await write_availability(db, "v1", {day(4): FREE})
+
+        self.assertEqual(len(db.vendor_availability_intervals.documents), 1)
+        self.assertEqual(calendar(db, "v1", day(0), day(20)), {day(offset): FREE for offset in range(10)})
+
+    async def test_concurrent_writes_keep_every_update(self):
+        """Writers that would diff against the same intervals take turns on the vendor's lease"""
+        db = fake_db()
+        await write_availability(db, "v1", {day(offset): FREE for offset in range(30)})
+
+        updates = [{day(offset): BOOKED} for offset in range(0, 30, 3)] + [{day(31): PEAK}, {day(32): PEAK}]
+        await asyncio.gather(*(write_availability(db, "v1", update) for update in updates))
+
+        expected = {day(offset): FREE for offset in range(30)}
+        for update in updates:
+            expected.update(update)
+        self.assertEqual(calendar(db, "v1", day(0), day(40)), expected)
+        self.assertEqual(db.vendor_availability_leases.documents[0]["token"], None)
+
+    async def test_overwrite_false_keeps_existing_days(self):
+        db = fake_db()
+        await write_availability(db, "v1", {day(1): BOOKED})
+        await write_availability(db, "v1", {day(0): FREE, day(1): FREE, day(2): FREE}, overwrite=False)
+        self.assertEqual(calendar(db, "v1", day(0), day(5)), {day(0): FREE, day(1): BOOKED, day(2): FREE})
+
+    async def test_migration_deletes_legacy_records_once_covered(self):
+        db = fake_db()
+        for offset, booked in ((0, False), (1, False), (2, True)):
+            db.vendor_availability._insert({
+                "vendor_id": "v1", "date": datetime.combine(day(offset), datetime.min.time()),
+                "is_available": True, "is_booked": booked
+            })
+
+        self.assertEqual(await migrate_daily_records(db), 3)
+        self.assertEqual(db.vendor_availability.documents, [])
+        self.assertEqual(calendar(db, "v1", day(0), day(5)), {day(0): FREE, day(1): FREE, day(2): BOOKED})
+
+    async def test_migration_keeps_legacy_records_when_write_fails(self):
+        db = fake_db()
+        db.vendor_availability._insert({"vendor_id": "v1", "date": datetime.combine(day(0), datetime.min.time())})
+
+        async def failing_write(*args, **kwargs):
+            raise ConnectionError("primary stepped down")
+        db.vendor_availability_intervals.bulk_write = failing_write
+
+        self.assertEqual(await migrate_daily_records(db), 0)
+        self.assertEqual(len(db.vendor_availability.documents), 1)
+
+if __name__ == "__main__":
+    unittest.main()
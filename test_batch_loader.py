@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import MagicMock
+import sys
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend.batch_loader import load_by_ids
+
+class AsyncCursor:
+    """Async-iterable stand-in for a Motor cursor"""
+
+    def __init__(self, documents):
+        self._documents = iter(list(documents))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._documents)
+        except StopIteration:
+            raise StopAsyncIteration
+
+def fake_collection(documents, key="id"):
+    def find(query, projection=None):
+        wanted = query[key]["$in"]
+        return AsyncCursor(document for document in documents if document[key] in wanted)
+    return MagicMock(find=MagicMock(side_effect=find))
+
+class TestLoadByIds(unittest.IsolatedAsyncioTestCase):
+    async def test_one_query_for_a_page_of_references(self):
+        collection = fake_collection([{"id": "v1", "name": "A"}, {"id": "v2", "name": "B"}, {"id": "v3", "name": "C"}])
+        loaded = await load_by_ids(collection, ["v1", None, "v2", "v1", "missing"])
+
+        self.assertEqual(loaded, {"v1": {"id": "v1", "name": "A"}, "v2": {"id": "v2", "name": "B"}})
+        collection.find.assert_called_once()
+        query, projection = collection.find.call_args.args
+        self.assertEqual(sorted(query["id"]["$in"]), ["missing", "v1", "v2"])
+        self.assertIsNone(projection)
+
+    async def test_empty_references_skip_the_query(self):
+        collection = fake_collection([])
+        self.assertEqual(await load_by_ids(collection, [None, None]), {})
+        collection.find.assert_not_called()
+
+    async def test_inclusion_projection_keeps_the_key(self):
+        collection = fake_collection([{"user_id": "u1"}], key="user_id")
+        await load_by_ids(collection, ["u1"], projection={"full_name": 1}, key="user_id")
+        self.assertEqual(collection.find.call_args.args[1], {"full_name": 1, "user_id": 1})
+
+    async def test_exclusion_projection_is_passed_through(self):
+        collection = fake_collection([{"id": "u1"}])
+        await load_by_ids(collection, ["u1"], projection={"_id": 0, "password": 0})
+        self.assertEqual(collection.find.call_args.args[1], {"_id": 0, "password": 0})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+import unittest
+import random
+import math
+from datetime import datetime, timedelta
+import sys
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend.catalog_index import VendorCatalogIndex, EARTH_RADIUS_KM
+
+CATEGORIES = ["photographer", "venue", "florist", "caterer"]
+STYLES = ["rustic", "modern", "boho", "classic"]
+AREAS = ["sydney", "melbourne", "brisbane"]
+
+def make_vendor(i, rng):
+    return {
+        "id": f"v{i:03d}",
+        "status": rng.choice(["approved", "approved", "pending"]),
+        "category": rng.choice(CATEGORIES),
+        "style_tags": rng.sample(STYLES, rng.randint(0, 2)),
+        "service_areas": rng.sample(AREAS, rng.randint(1, 2)),
+        "verified": rng.random() < 0.5,
+        "average_rating": rng.choice([None, 3.5, 4.0, 4.5, 4.8, 5.0]),
+        "total_reviews": rng.randint(0, 40),
+        "pricing_from": rng.choice([None, 800, 1500, 2500, 4000]),
+        "created_at": datetime(2024, 1, 1) + timedelta(days=rng.randint(0, 400))
+    }
+
+def rating_order(vendor):
+    return (
+        -(vendor.get("average_rating") or 0), -(vendor.get("total_reviews") or 0),
+        -vendor["created_at"].timestamp(), vendor["id"]
+    )
+
+class TestVendorCatalogIndex(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(3)
+        self.vendors = [make_vendor(i, rng) for i in range(200)]
+        self.index = VendorCatalogIndex()
+        self.index.load(self.vendors)
+
+    def brute_force(self, predicate):
+        return sorted((vendor for vendor in self.vendors if predicate(vendor)), key=rating_order)
+
+    def test_filters_match_brute_force(self):
+        """Equality, any-of and range filters return the same page and total as a full scan"""
+        page, total = self.index.search(
+            equals={"status": "approved", "category": "photographer"},
+            any_of={"service_areas": ["sydney", "brisbane"]},
+            ranges={"average_rating": (4.5, None), "pricing_from": (None, 2500)},
+            limit=10
+        )
+        expected = self.brute_force(lambda vendor: (
+            vendor["status"] == "approved" and vendor["category"] == "photographer"
+            and {"sydney", "brisbane"} & set(vendor["service_areas"])
+            and (vendor["average_rating"] or 0) >= 4.5
+            and vendor["pricing_from"] is not None and vendor["pricing_from"] <= 2500
+        ))
+        self.assertEqual(total, len(expected))
+        self.assertEqual([vendor["id"] for vendor in page], [vendor["id"] for vendor in expected[:10]])
+
+    def test_unfiltered_pages_follow_rating_order(self):
+        expected = [vendor["id"] for vendor in sorted(self.vendors, key=rating_order)]
+        page, total = self.index.search(offset=20, limit=15)
+        self.assertEqual(total, 200)
+        self.assertEqual([vendor["id"] for vendor in page], expected[20:35])
+
+    def test_keyset_pages_cover_results_once(self):
+        """Walking pages with ``after`` visits every match exactly once, in order"""
+        expected = [vendor["id"] for vendor in self.brute_force(lambda vendor: vendor["status"] == "approved")]
+        seen, after = [], None
+        while True:
+            page, _ = self.index.search(equals={"status": "approved"}, after=after, limit=7)
+            if not page:
+                break
+            seen += [vendor["id"] for vendor in page]
+            after = VendorCatalogIndex.sort_key(page[-1], "rating")
+        self.assertEqual(seen, expected)
+
+    def test_price_order_puts_unpriced_vendors_last(self):
+        page, _ = self.index.search(sort="price", limit=200)
+        prices = [vendor["pricing_from"] for vendor in page]
+        priced = [price for price in prices if price is not None]
+        self.assertEqual(priced, sorted(priced))
+        self.assertEqual(prices[len(priced):], [None] * (len(prices) - len(priced)))
+
+    def test_upsert_and_remove_keep_postings_and_order(self):
+        updated = dict(self.vendors[0], category="venue", average_rating=5.0, total_reviews=999)
+        self.index.upsert(updated)
+        page, _ = self.index.search(limit=1)
+        self.assertEqual(page[0]["id"], updated["id"])
+        if self.vendors[0]["category"] != "venue":
+            page, _ = self.index.search(equals={"category": self.vendors[0]["category"]}, limit=500)
+            self.assertNotIn(updated["id"], [vendor["id"] for vendor in page])
+
+        self.index.remove(updated["id"])
+        self.assertEqual(len(self.index), 199)
+        page, total = self.index.search(equals={"category": "venue"}, limit=500)
+        self.assertNotIn(updated["id"], [vendor["id"] for vendor in page])
+        self.assertEqual(total, len(page))
+
+    def test_results_are_copies(self):
+        page, _ = self.index.search(limit=1)
+        page[0]["category"] = "changed"
+        self.assertNotEqual(self.index.search(limit=1)[0][0]["category"], "changed")
+
+    def test_sort_requirements(self):
+        with self.assertRaises(ValueError):
+            self.index.search(sort="distance")
+        with self.assertRaises(ValueError):
+            self.index.search(sort="relevance")
+
+def great_circle_km(lat1, lng1, lat2, lng2):
+    """Scalar haversine used as the brute-force reference"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+class TestRadiusSearch(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(5)
+        self.vendors = []
+        for i in range(300):
+            vendor = make_vendor(i, rng)
+            if i % 10:
+                # Scattered around Sydney, plus a few far away
+                latitude = -33.87 + rng.uniform(-1.5, 1.5) if i % 7 else rng.uniform(-43, -12)
+                longitude = 151.21 + rng.uniform(-1.5, 1.5) if i % 7 else rng.uniform(113, 153)
+                vendor["geo"] = {"type": "Point", "coordinates": [longitude, latitude]}
+            self.vendors.append(vendor)
+        self.index = VendorCatalogIndex()
+        self.index.load(self.vendors)
+
+    def brute_force_within(self, latitude, longitude, radius_km):
+        distances = {
+            vendor["id"]: great_circle_km(latitude, longitude, vendor["geo"]["coordinates"][1], vendor["geo"]["coordinates"][0])
+            for vendor in self.vendors if "geo" in vendor
+        }
+        return {vendor_id: distance for vendor_id, distance in distances.items() if distance <= radius_km}
+
+    def test_within_matches_brute_force(self):
+        """The grid prefilter never drops a vendor that is inside the radius"""
+        for latitude, longitude, radius_km in ((-33.87, 151.21, 25), (-33.2, 150.4, 80), (-33.87, 151.21, 400)):
+            found = self.index.within(latitude, longitude, radius_km)
+            expected = self.brute_force_within(latitude, longitude, radius_km)
+            self.assertEqual(set(found), set(expected))
+            for vendor_id, distance in expected.items():
+                self.assertAlmostEqual(found[vendor_id], distance, places=6)
+
+    def test_distance_sort_and_filters(self):
+        near = (-33.87, 151.21, 60)
+        page, total = self.index.search(equals={"status": "approved"}, near=near, sort="distance", limit=300)
+        expected = self.brute_force_within(*near)
+        expected_ids = sorted(
+            (vendor["id"] for vendor in self.vendors if vendor["id"] in expected and vendor["status"] == "approved"),
+            key=lambda vendor_id: (expected[vendor_id], vendor_id)
+        )
+        self.assertEqual(total, len(expected_ids))
+        self.assertEqual([vendor["id"] for vendor in page], expected_ids)
+        for vendor in page:
+            self.assertEqual(vendor["distance_km"], round(expected[vendor["id"]], 2))
+
+    def test_vendors_without_coordinates_are_excluded(self):
+        ungeocoded = {vendor["id"] for vendor in self.vendors if "geo" not in vendor}
+        page, _ = self.index.search(near=(-33.87, 151.21, 20000), limit=300)
+        self.assertFalse(ungeocoded & {vendor["id"] for vendor in page})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+from unittest.mock import MagicMock, AsyncMock, patch
+import math
+import random
+from datetime import datetime, timedelta
+import sys
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend.co_engagement import CoEngagementService
+
+class AsyncCursor:
+    """Async-iterable stand-in for a Motor cursor"""
+
+    def __init__(self, documents):
+        self._documents = iter(list(documents))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._documents)
+        except StopIteration:
+            raise StopAsyncIteration
+
+class TestCoEngagement(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        rng = random.Random(12)
+        start = datetime(2025, 1, 1)
+        self.views = [
+            {"user_id": f"u{rng.randint(0, 40)}", "vendor_id": f"v{rng.randint(0, 15)}",
+             "viewed_at": start + timedelta(hours=rng.randint(0, 2000))}
+            for _ in range(400)
+        ]
+        self.wishlist = [
+            {"user_id": f"u{rng.randint(0, 40)}", "vendor_id": f"v{rng.randint(0, 15)}",
+             "added_at": start + timedelta(hours=rng.randint(0, 2000))}
+            for _ in range(100)
+        ]
+        self.mock_db = MagicMock()
+        self.mock_db.__getitem__.side_effect = lambda name: {
+            "recently_viewed": MagicMock(find=MagicMock(side_effect=lambda *args: AsyncCursor(self.views))),
+            "wishlist_items": MagicMock(find=MagicMock(side_effect=lambda *args: AsyncCursor(self.wishlist)))
+        }[name]
+        self.mock_db.vendor_neighbors.bulk_write = AsyncMock()
+        self.mock_db.vendor_neighbors.delete_many = AsyncMock()
+
+    def reference_neighbors(self):
+        """Cosine similarity over every couple's vendor set"""
+        users = {}
+        for row in self.views + self.wishlist:
+            users.setdefault(row["user_id"], set()).add(row["vendor_id"])
+        couples = {}
+        for user_id, vendors in users.items():
+            for vendor_id in vendors:
+                couples.setdefault(vendor_id, set()).add(user_id)
+        neighbors = {}
+        for vendor_id, vendor_users in couples.items():
+            scored = []
+            for other_id, other_users in couples.items():
+                shared = len(vendor_users & other_users)
+                if other_id != vendor_id and shared >= CoEngagementService.MIN_SHARED_USERS:
+                    score = round(shared / math.sqrt(len(vendor_users) * len(other_users)), 4)
+                    scored.append({"vendor_id": other_id, "score": score, "shared_users": shared})
+            scored.sort(key=lambda n: (-n["score"], -n["shared_users"], n["vendor_id"]))
+            neighbors[vendor_id] = scored[:CoEngagementService.NEIGHBORS_PER_VENDOR]
+        return neighbors
+
+    async def test_engagement_keeps_latest_time_per_vendor(self):
+        engaged = await CoEngagementService._engagement(self.mock_db, {})
+        for row in self.views:
+            self.assertGreaterEqual(engaged[row["user_id"]][row["vendor_id"]], row["viewed_at"])
+
+    async def test_rebuild_matches_cosine_reference(self):
+        """The rebuild, scored in a worker process, stores every vendor's cosine neighbours"""
+        rebuilt = await CoEngagementService.rebuild(self.mock_db)
+
+        stored = {}
+        for call in self.mock_db.vendor_neighbors.bulk_write.await_args_list:
+            for operation in call.args[0]:
+                document = operation._doc
+                stored[document["vendor_id"]] = document["neighbors"]
+        self.assertEqual(rebuilt, len(stored))
+        self.assertEqual(stored, self.reference_neighbors())
+        self.mock_db.vendor_neighbors.delete_many.assert_awaited_once()
+
+    def test_active_couples_keep_their_most_recent_vendors(self):
+        start = datetime(2025, 1, 1)
+        vendors = {f"v{i:03d}": start + timedelta(minutes=(i * 37) % 250) for i in range(250)}
+        with patch.object(CoEngagementService, "MAX_VENDORS_PER_USER", 10):
+            recent = CoEngagementService._recent_vendors(vendors)
+        expected = sorted(vendors, key=lambda vendor_id: vendors[vendor_id], reverse=True)[:10]
+        self.assertEqual(set(recent), set(expected))
+
+    def test_truncated_couples_still_count_towards_vendor_norms(self):
+        """Only pair counting is truncated; the cosine norm counts every couple"""
+        now = datetime(2025, 6, 1)
+        engaged = {
+            "u1": {"a": now, "b": now - timedelta(days=1), "c": now - timedelta(days=90)},
+            "u2": {"a": now, "b": now},
+            "u3": {"a": now, "c": now}
+        }
+        with patch.object(CoEngagementService, "MAX_VENDORS_PER_USER", 2):
+            neighbors = CoEngagementService._neighbors(engaged)
+        self.assertEqual(neighbors["a"], [{"vendor_id": "b", "score": round(2 / math.sqrt(3 * 2), 4), "shared_users": 2}])
+        self.assertEqual(neighbors["c"], [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import random
+import string
+import sys
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend.fuzzy_index import TrigramIndex, bounded_levenshtein, max_edits, MIN_WORD_LENGTH
+
+def levenshtein(a, b):
+    """Unbounded reference edit distance"""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+def typo(word, rng):
+    """Apply one random insert, delete or substitute"""
+    position = rng.randrange(len(word))
+    letter = rng.choice(string.ascii_lowercase)
+    return rng.choice([
+        word[:position] + letter + word[position:],
+        word[:position] + word[position + 1:],
+        word[:position] + letter + word[position + 1:]
+    ])
+
+class TestTrigramIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = TrigramIndex()
+        self.index.load([
+            {"id": "v1", "business_name": "Rustic Barn Photography", "location": "Parramatta"},
+            {"id": "v2", "business_name": "Blooming Florals", "location": "Newcastle", "service_areas": ["Hunter Valley"]},
+            {"id": "v3", "business_name": "Photography by Grace", "location": "Sydney"}
+        ])
+
+    def test_bounded_levenshtein_matches_reference(self):
+        rng = random.Random(11)
+        for _ in range(500):
+            a = "".join(rng.choice("abcde") for _ in range(rng.randint(0, 8)))
+            b = "".join(rng.choice("abcde") for _ in range(rng.randint(0, 8)))
+            distance = levenshtein(a, b)
+            for limit in range(4):
+                self.assertEqual(bounded_levenshtein(a, b, limit), distance if distance <= limit else None)
+
+    def test_corrects_vendor_and_place_words(self):
+        self.assertEqual(self.index.correct("photografy")[0], ("photography", 2))
+        self.assertEqual(self.index.correct("paramatta")[0], ("parramatta", 1))
+        self.assertEqual(self.index.correct("rustic"), [("rustic", 0)])
+        self.assertEqual(self.index.correct("xyzzyq"), [])
+        self.assertEqual(self.index.correct("brn"), [])
+
+    def test_correct_text_keeps_short_and_unknown_words(self):
+        self.assertEqual(self.index.correct_text("Rustik barn in Newcastel"), "rustic barn in newcastle")
+        self.assertEqual(self.index.correct_text("qwxzvb"), "qwxzvb")
+        self.assertIsNone(self.index.correct_text("  "))
+
+    def test_trigram_pruning_finds_every_match(self):
+        """Candidates pruned by shared trigrams equal a scan of the whole vocabulary"""
+        rng = random.Random(5)
+        vocabulary = sorted(self.index._term_vendors.keys() | self.index._static_terms)
+        for _ in range(300):
+            word = typo(rng.choice(vocabulary), rng)
+            if len(word) < MIN_WORD_LENGTH or word in vocabulary:
+                continue
+            budget = max_edits(word)
+            expected = {term for term in vocabulary if levenshtein(word, term) <= budget}
+            found = {term for term, _ in self.index.correct(word, limit=len(vocabulary))}
+            self.assertEqual(found, expected, word)
+
+    def test_remove_drops_vendor_words_but_keeps_places(self):
+        self.index.remove("v2")
+        self.assertEqual(self.index.correct("bloomng"), [])
+        # Newcastle is also a gazetteer place name
+        self.assertEqual(self.index.correct("newcastel")[0][0], "newcastle")
+
+        self.index.upsert({"id": "v2", "business_name": "Blooming Florals"})
+        self.assertEqual(self.index.correct("bloomng")[0], ("blooming", 1))
+
+if __name__ == "__main__":
+    unittest.main()
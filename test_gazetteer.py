@@ -0,0 +1,75 @@
+import unittest
+import sys
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend.gazetteer import Gazetteer, Place, normalize_text, LOCATION_TOKENS_VERSION
+
+PLACES = [
+    Place("Sydney", "2000", "Sydney", "NSW", -33.8688, 151.2093),
+    Place("Paddington", "2021", "Sydney", "NSW", -33.8840, 151.2310),
+    Place("Bondi", "2026", "Sydney", "NSW", -33.8930, 151.2630),
+    Place("Paddington", "4064", "Brisbane", "QLD", -27.4600, 152.9990),
+    Place("Byron Bay", "2481", "Northern Rivers", "NSW", -28.6474, 153.6020)
+]
+
+class TestGazetteer(unittest.TestCase):
+    def setUp(self):
+        self.gazetteer = Gazetteer(PLACES)
+
+    def test_normalize_text(self):
+        self.assertEqual(normalize_text("  Byron-Bay, NSW!! "), "byron bay nsw")
+        self.assertEqual(normalize_text(None), "")
+
+    def test_location_tokens_cover_terms_and_places(self):
+        tokens = self.gazetteer.location_tokens("Bondi, NSW", ["Northern Rivers"])
+        for token in (
+            "term:bondi", "term:bondi nsw", "suburb:nsw:bondi", "region:nsw:sydney",
+            "postcode:2026", "state:nsw", "term:northern rivers", "region:nsw:northern rivers"
+        ):
+            self.assertIn(token, tokens)
+        self.assertEqual(tokens, sorted(tokens))
+
+    def test_state_narrows_ambiguous_suburbs(self):
+        tokens = self.gazetteer.location_tokens("Paddington QLD")
+        self.assertIn("suburb:qld:paddington", tokens)
+        self.assertNotIn("suburb:nsw:paddington", tokens)
+
+    def test_query_for_city_matches_its_region(self):
+        """Searching "Sydney" matches vendors the gazetteer places anywhere in the metro region"""
+        tokens = self.gazetteer.query_tokens("Sydney")
+        self.assertEqual(tokens, ["region:nsw:sydney", "term:sydney"])
+        self.assertIn("region:nsw:sydney", self.gazetteer.location_tokens("Bondi"))
+
+    def test_query_tokens_for_states_and_unknown_places(self):
+        self.assertEqual(self.gazetteer.query_tokens("New South Wales"), ["state:nsw", "term:new south wales"])
+        self.assertEqual(self.gazetteer.query_tokens("Bondi Junction Mall"), [])
+        self.assertEqual(self.gazetteer.query_tokens(""), [])
+
+    def test_geocode(self):
+        self.assertEqual(self.gazetteer.geocode("Bondi"), (-33.8930, 151.2630))
+        self.assertEqual(self.gazetteer.geocode("4064"), (-27.4600, 152.9990))
+        self.assertEqual(self.gazetteer.geocode("Paddington, QLD"), (-27.4600, 152.9990))
+        self.assertEqual(self.gazetteer.geocode("-33.5, 151.25"), (-33.5, 151.25))
+        self.assertIsNone(self.gazetteer.geocode("-133.5, 151.25"))
+        self.assertIsNone(self.gazetteer.geocode("NSW"))
+        self.assertIsNone(self.gazetteer.geocode("Atlantis"))
+
+        latitude, longitude = self.gazetteer.geocode("Northern Rivers")
+        self.assertAlmostEqual(latitude, -28.6474)
+        self.assertAlmostEqual(longitude, 153.6020)
+
+    def test_location_fields(self):
+        fields = self.gazetteer.location_fields("Bondi")
+        self.assertEqual(fields["geo"], {"type": "Point", "coordinates": [151.2630, -33.8930]})
+        self.assertEqual(fields["location_tokens_version"], LOCATION_TOKENS_VERSION)
+        self.assertIsNone(self.gazetteer.location_fields("Atlantis")["geo"])
+
+    def test_bundled_data_loads(self):
+        bundled = Gazetteer.load()
+        self.assertTrue(bundled.places)
+        self.assertIsNotNone(bundled.geocode("Sydney"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import random
+from datetime import datetime, timedelta
+import sys
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend.pagination import decode_cursor, encode_cursor, keyset_query, next_cursor
+
+SORT = [("created_at", -1), ("id", 1)]
+
+def after_key(item, sort, values):
+    """Python reading of keyset_query: is ``item`` strictly after ``values`` in ``sort`` order?"""
+    for (field, direction), value in zip(sort, values):
+        if item[field] != value:
+            return item[field] < value if direction < 0 else item[field] > value
+    return False
+
+def matches(item, query):
+    """Evaluate the subset of Mongo query operators keyset_query produces"""
+    if "$and" in query:
+        return all(matches(item, clause) for clause in query["$and"])
+    if "$or" in query:
+        return any(matches(item, clause) for clause in query["$or"])
+    for field, condition in query.items():
+        if isinstance(condition, dict):
+            if "$lt" in condition and not item[field] < condition["$lt"]:
+                return False
+            if "$gt" in condition and not item[field] > condition["$gt"]:
+                return False
+        elif item[field] != condition:
+            return False
+    return True
+
+class TestCursorPagination(unittest.TestCase):
+    def test_cursor_round_trip(self):
+        """Cursors carry datetimes and strings back unchanged"""
+        values = [datetime(2025, 3, 1, 12, 30, 15), "review_abc"]
+        token = encode_cursor(SORT, values)
+        self.assertEqual(decode_cursor(token, SORT), values)
+        # URL safe and unpadded
+        self.assertNotIn("=", token)
+        self.assertNotIn("+", token)
+
+    def test_cursor_rejects_other_listing(self):
+        """A cursor minted for one sort is refused by another"""
+        token = encode_cursor(SORT, [datetime(2025, 1, 1), "x"])
+        with self.assertRaises(ValueError):
+            decode_cursor(token, [("average_rating", -1), ("id", 1)])
+        with self.assertRaises(ValueError):
+            decode_cursor("not-a-cursor!", SORT)
+
+    def test_keyset_query_matches_sort_order(self):
+        """keyset_query selects exactly the items after the cursor, ties broken by the last field"""
+        random.seed(9)
+        base = datetime(2025, 1, 1)
+        items = [
+            {"created_at": base + timedelta(days=random.randint(0, 5)), "id": f"r{i:03d}", "status": "verified"}
+            for i in range(60)
+        ]
+        ordered = sorted(items, key=lambda item: (-item["created_at"].timestamp(), item["id"]))
+        for position in (0, 7, 30, 59):
+            cursor_item = ordered[position]
+            values = [cursor_item[field] for field, _ in SORT]
+            query = keyset_query({"status": "verified"}, SORT, values)
+            selected = [item for item in ordered if matches(item, query)]
+            self.assertEqual(selected, ordered[position + 1:])
+            self.assertEqual(selected, [item for item in ordered if after_key(item, SORT, values)])
+
+    def test_keyset_query_without_base_query(self):
+        query = keyset_query({}, SORT, [datetime(2025, 1, 1), "r1"])
+        self.assertEqual(query, {"$or": [
+            {"created_at": {"$lt": datetime(2025, 1, 1)}},
+            {"created_at": datetime(2025, 1, 1), "id": {"$gt": "r1"}}
+        ]})
+
+    def test_next_cursor_only_for_full_pages(self):
+        page = [{"created_at": datetime(2025, 1, 2), "id": "a"}, {"created_at": datetime(2025, 1, 1), "id": "b"}]
+        self.assertIsNone(next_cursor(page, SORT, 3))
+        self.assertEqual(decode_cursor(next_cursor(page, SORT, 2), SORT), [datetime(2025, 1, 1), "b"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import random
+from datetime import date, timedelta
+import sys
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend.pricing_engine import IntervalTree, PriceEngine
+
+class TestIntervalTree(unittest.TestCase):
+    def test_stab_matches_brute_force(self):
+        """Every point returns exactly the intervals containing it, endpoints inclusive"""
+        random.seed(4)
+        intervals = []
+        for i in range(300):
+            start = random.randint(0, 1000)
+            intervals.append((start, start + random.randint(0, 80), i))
+        tree = IntervalTree(intervals)
+        for point in list(range(-5, 1090, 7)) + [start for start, _, _ in intervals[:20]] + [end for _, end, _ in intervals[:20]]:
+            expected = sorted(value for start, end, value in intervals if start <= point <= end)
+            self.assertEqual(sorted(tree.stab(point)), expected, point)
+
+    def test_empty_tree(self):
+        self.assertEqual(IntervalTree([]).stab(10), [])
+
+class TestPriceEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = PriceEngine()
+        self.engine.load(
+            [
+                {"id": "a1", "vendor_id": "a", "name": "Small", "base_price": 1000, "max_guests": 50},
+                {"id": "a2", "vendor_id": "a", "name": "Large", "base_price": 3000, "max_guests": 200},
+                {"id": "b1", "vendor_id": "b", "name": "Any size", "base_price": 2000, "max_guests": None}
+            ],
+            [
+                {"vendor_id": "a", "season_name": "Summer", "start_date": date(2025, 12, 1),
+                 "end_date": date(2026, 2, 28), "price_multiplier": 1.5},
+                {"vendor_id": "a", "season_name": "Christmas week", "start_date": date(2025, 12, 22),
+                 "end_date": date(2025, 12, 28), "price_multiplier": 2.0},
+                {"vendor_id": "b", "season_name": "Winter", "start_date": date(2025, 6, 1),
+                 "end_date": date(2025, 8, 31), "price_multiplier": 0.8}
+            ]
+        )
+
+    def test_cheapest_applies_narrowest_season(self):
+        """Overlapping seasons resolve to the narrowest one"""
+        quotes = self.engine.cheapest(date(2025, 12, 24))
+        self.assertEqual(quotes["a"]["package_id"], "a1")
+        self.assertEqual(quotes["a"]["season"], "Christmas week")
+        self.assertEqual(quotes["a"]["price"], 2000.0)
+        self.assertEqual(quotes["b"]["price"], 2000.0)
+        self.assertIsNone(quotes["b"]["season"])
+
+        quotes = self.engine.cheapest(date(2025, 12, 10))
+        self.assertEqual(quotes["a"]["season"], "Summer")
+        self.assertEqual(quotes["a"]["price"], 1500.0)
+
+    def test_cheapest_respects_guest_count_and_vendors(self):
+        quotes = self.engine.cheapest(date(2025, 7, 1), guests=100)
+        self.assertEqual(quotes["a"]["package_id"], "a2")
+        self.assertEqual(quotes["b"]["price"], 1600.0)
+
+        quotes = self.engine.cheapest(date(2025, 7, 1), vendor_ids=["b"], guests=500)
+        self.assertEqual(list(quotes), ["b"])
+        self.assertEqual(self.engine.cheapest(date(2025, 7, 1), vendor_ids=["a"], guests=500), {})
+
+    def test_vendor_edits_match_a_full_load(self):
+        """In-place vendor updates quote the same as an engine loaded from scratch"""
+        random.seed(11)
+        day = date(2025, 12, 24)
+        self.engine.cheapest(day)
+        for step in range(200):
+            vendor_id = f"v{random.randint(0, 30)}"
+            if random.random() < 0.2:
+                self.engine.remove_vendor(vendor_id)
+            else:
+                packages = [
+                    {"id": f"{vendor_id}-{step}-{i}", "vendor_id": vendor_id,
+                     "base_price": random.randint(100, 900), "max_guests": random.choice([None, 80, 150])}
+                    for i in range(random.randint(0, 4))
+                ]
+                start = date(2025, 12, 1) + timedelta(days=random.randint(0, 40))
+                seasons = [{"vendor_id": vendor_id, "season_name": "Peak", "start_date": start,
+                            "end_date": start + timedelta(days=random.randint(0, 30)), "price_multiplier": 1.25}]
+                self.engine.upsert_vendor(vendor_id, packages, seasons)
+
+            fresh = PriceEngine()
+            fresh.load(
+                [package for packages in self.engine._packages.values() for package in packages],
+                [season for seasons in self.engine._seasons.values() for season in seasons]
+            )
+            guests = random.choice([None, 100])
+            expected = {vendor: quote["price"] for vendor, quote in fresh.cheapest(day, guests=guests).items()}
+            actual = {vendor: quote["price"] for vendor, quote in self.engine.cheapest(day, guests=guests).items()}
+            self.assertEqual(actual, expected, step)
+
+        self.assertIsNone(self.engine.quote_package("a1-missing", day))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+from unittest.mock import MagicMock, AsyncMock, patch
+import asyncio
+import sys
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend.recommendation_cache import RecommendationCache
+from backend.search_service import AISearchService
+
+def vendors(*ids):
+    return [{"id": vendor_id} for vendor_id in ids]
+
+class TestRecommendationCache(unittest.IsolatedAsyncioTestCase):
+    async def test_refresh_fills_entry_once(self):
+        cache = RecommendationCache()
+        compute = AsyncMock(return_value=vendors("v1"))
+        cache.refresh("u1", compute)
+        cache.refresh("u1", compute)
+        self.assertIsNone(cache.get("u1"))
+
+        await asyncio.sleep(0)
+        compute.assert_awaited_once()
+        self.assertEqual(cache.get("u1"), vendors("v1"))
+        self.assertTrue(cache.is_fresh("u1"))
+
+    async def test_write_during_computation_leaves_entry_stale(self):
+        cache = RecommendationCache()
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def compute():
+            started.set()
+            await release.wait()
+            return vendors("v1")
+
+        cache.refresh("u1", compute)
+        await started.wait()
+        cache.invalidate("u1")
+        release.set()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+        self.assertEqual(cache.get("u1"), vendors("v1"))
+        self.assertFalse(cache.is_fresh("u1"))
+
+    async def test_lru_and_ttl(self):
+        cache = RecommendationCache(max_entries=2, ttl_seconds=60)
+        cache.set("u1", [])
+        cache.set("u2", [])
+        cache.get("u1")
+        cache.set("u3", [])
+        self.assertIsNone(cache.get("u2"))
+        self.assertEqual(len(cache), 2)
+
+        with patch("backend.recommendation_cache.time.monotonic", return_value=10 ** 9):
+            self.assertFalse(cache.is_fresh("u1"))
+        self.assertEqual(cache.get("u1"), [])
+
+class TestCachedRecommendations(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cache = RecommendationCache()
+        for target, replacement in (
+            ("backend.search_service.recommendation_cache", self.cache),
+            ("backend.search_service.AISearchService.get_ai_recommendations", AsyncMock(return_value=vendors("r1", "r2"))),
+            ("backend.search_service.AISearchService.get_trending_vendors", AsyncMock(return_value=vendors("t1", "t2", "t3")))
+        ):
+            patcher = patch(target, replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_cache_miss_serves_trending(self):
+        """A couple without cached recommendations gets trending vendors, minus the page"""
+        db = MagicMock()
+        recommendations = await AISearchService.cached_recommendations(db, "u1", exclude_vendor_ids=["t2"], limit=2)
+        self.assertEqual(recommendations, vendors("t1", "t3"))
+        AISearchService.get_trending_vendors.assert_awaited_once_with(db, limit=3)
+
+        # The background computation replaces the fallback
+        await asyncio.sleep(0)
+        self.assertEqual(await AISearchService.cached_recommendations(db, "u1", limit=2), vendors("r1", "r2"))
+        AISearchService.get_trending_vendors.assert_awaited_once()
+
+    async def test_empty_cached_list_is_served_as_is(self):
+        self.cache.set("u1", [])
+        self.assertEqual(await AISearchService.cached_recommendations(MagicMock(), "u1"), [])
+        AISearchService.get_trending_vendors.assert_not_awaited()
+
+if __name__ == "__main__":
+    unittest.main()
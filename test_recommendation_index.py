@@ -0,0 +1,92 @@
+import unittest
+import random
+import sys
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend.recommendation_index import VendorFeatureMatrix
+from backend.search_service import AISearchService
+
+CATEGORIES = ["venue", "florist", "photographer", "caterer"]
+STYLES = ["rustic", "boho", "modern", "classic", "garden"]
+
+def make_profiles(count, seed):
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"v{i:03d}",
+            "status": rng.choice(["approved", "approved", "approved", "pending"]),
+            "category": rng.choice(CATEGORIES),
+            "style_tags": rng.sample(STYLES, rng.randint(0, 3)),
+            "average_rating": rng.choice([0.0, 3.5, 4.0, 4.5, 5.0]),
+            "total_reviews": rng.randint(0, 50)
+        }
+        for i in range(count)
+    ]
+
+class TestVendorFeatureMatrix(unittest.TestCase):
+    def setUp(self):
+        self.profiles = make_profiles(300, 4)
+        self.matrix = VendorFeatureMatrix()
+        self.matrix.load(self.profiles)
+
+    def reference(self, profiles, categories, styles, exclude=(), boosts=None):
+        scored = [
+            (profile["id"], AISearchService._calculate_similarity_score(profile, categories, styles)
+             + (boosts or {}).get(profile["id"], 0.0))
+            for profile in profiles if profile["status"] == "approved" and profile["id"] not in exclude
+        ]
+        return sorted(scored, key=lambda pair: -pair[1])
+
+    def assertTopMatches(self, actual, expected, limit):
+        """Same scores in the same order; tied vendors may swap places"""
+        self.assertEqual(len(actual), min(limit, len(expected)))
+        for (_, score), (_, expected_score) in zip(actual, expected):
+            self.assertAlmostEqual(score, expected_score, places=5)
+        expected_scores = dict(expected)
+        for vendor_id, score in actual:
+            self.assertAlmostEqual(expected_scores[vendor_id], score, places=5)
+
+    def test_matrix_scores_match_per_vendor_scoring(self):
+        """One matrix product gives the same scores as the per-vendor Python scoring"""
+        categories, styles = {"florist", "venue"}, {"boho", "garden"}
+        top = self.matrix.top_k(categories, styles, limit=25)
+        self.assertTopMatches(top, self.reference(self.profiles, categories, styles), 25)
+
+    def test_exclusions_and_boosts(self):
+        exclude = {"v000", "v001", "v002"}
+        boosts = {"v010": 1.0, "v011": 0.5}
+        top = self.matrix.top_k({"caterer"}, {"rustic"}, exclude_ids=exclude, limit=10, boosts=boosts)
+        self.assertFalse(exclude & {vendor_id for vendor_id, _ in top})
+        self.assertTopMatches(top, self.reference(self.profiles, {"caterer"}, {"rustic"}, exclude, boosts), 10)
+
+    def test_incremental_writes_match_a_fresh_load(self):
+        """Upserts that add new columns, removals and row reuse leave the same scores"""
+        changed = list(self.profiles)
+        changed[5] = dict(changed[5], status="approved", style_tags=["industrial"], category="stylist")
+        changed[6] = dict(changed[6], status="pending")
+        removed = changed.pop(7)
+        added = {"id": "v999", "status": "approved", "category": "venue", "style_tags": ["industrial", "boho"],
+                 "average_rating": 4.8, "total_reviews": 12}
+        changed.append(added)
+
+        for profile in (changed[5], changed[6], added):
+            self.matrix.upsert(profile)
+        self.matrix.remove(removed["id"])
+
+        fresh = VendorFeatureMatrix()
+        fresh.load(changed)
+        for categories, styles in (({"stylist"}, {"industrial"}), ({"venue"}, {"boho", "industrial"}), (set(), set())):
+            self.assertTopMatches(
+                self.matrix.top_k(categories, styles, limit=40), fresh.top_k(categories, styles, limit=1000), 40
+            )
+        self.assertEqual(len(self.matrix), len(fresh))
+
+    def test_empty_and_exhausted(self):
+        self.assertEqual(VendorFeatureMatrix().top_k({"venue"}, set()), [])
+        approved = sum(profile["status"] == "approved" for profile in self.profiles)
+        self.assertEqual(len(self.matrix.top_k({"venue"}, set(), limit=1000)), approved)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import asyncio
+from unittest.mock import patch, MagicMock, AsyncMock
+from datetime import datetime, timedelta
+import sys
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend.recompute_queue import RecomputeQueue
+
+class TestRecomputeQueue(unittest.IsolatedAsyncioTestCase):
+    async def test_marks_within_window_coalesce(self):
+        """Repeated marks for one vendor in a window run its recompute once"""
+        queue = RecomputeQueue(window=0.05, workers=2)
+        calls = []
+
+        async def handler(db, vendor_id):
+            calls.append(vendor_id)
+
+        queue.register('vendor_rating', handler)
+        for _ in range(5):
+            queue.mark('vendor_rating', 'vendor_1')
+        queue.mark('vendor_rating', 'vendor_2')
+
+        runner = asyncio.create_task(queue.run(MagicMock()))
+        await asyncio.sleep(0.2)
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+        self.assertEqual(sorted(calls), ['vendor_1', 'vendor_2'])
+        metrics = queue.metrics()
+        self.assertEqual(metrics['marked'], 6)
+        self.assertEqual(metrics['coalesced'], 4)
+        self.assertEqual(metrics['completed'], 2)
+        self.assertEqual(metrics['depth'], 0)
+
+    async def test_mark_during_recompute_runs_again_later(self):
+        """A vendor marked mid-recompute is recomputed again, never concurrently"""
+        queue = RecomputeQueue(window=0.02, workers=2)
+        running = 0
+        peak = 0
+        calls = 0
+
+        async def handler(db, vendor_id):
+            nonlocal running, peak, calls
+            running += 1
+            peak = max(peak, running)
+            calls += 1
+            if calls == 1:
+                queue.mark('trust_score', vendor_id)
+            await asyncio.sleep(0.06)
+            running -= 1
+
+        queue.register('trust_score', handler)
+        queue.mark('trust_score', 'vendor_1')
+        runner = asyncio.create_task(queue.run(MagicMock()))
+        await asyncio.sleep(0.3)
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+        self.assertEqual(calls, 2)
+        self.assertEqual(peak, 1)
+
+    async def test_flush_runs_pending_immediately(self):
+        queue = RecomputeQueue(window=60)
+        handler = AsyncMock()
+        queue.register('review_stats', handler)
+        queue.mark('review_stats', 'vendor_1')
+        queue.mark('unknown_kind', 'vendor_1')
+
+        await queue.flush(MagicMock())
+
+        handler.assert_awaited_once()
+        self.assertEqual(handler.await_args.args[1], 'vendor_1')
+        self.assertEqual(queue.metrics()['depth'], 0)
+
+
+class TestStoredTrustScore(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        from backend.phase2_services import TrustScoreService
+
+        self.service = TrustScoreService
+        self.mock_db = MagicMock()
+        self.queue_patcher = patch('backend.phase2_services.recompute_queue')
+        self.mock_queue = self.queue_patcher.start()
+        self.calculate_patcher = patch.object(TrustScoreService, 'calculate_trust_score', new=AsyncMock())
+        self.mock_calculate = self.calculate_patcher.start()
+
+    def tearDown(self):
+        self.queue_patcher.stop()
+        self.calculate_patcher.stop()
+
+    def stored(self, age):
+        return {
+            'vendor_id': 'vendor_1', 'overall_score': 72.5, 'verification_score': 80.0,
+            'performance_score': 70.0, 'customer_satisfaction_score': 68.0, 'badges': [],
+            'last_calculated': datetime.utcnow() - age
+        }
+
+    async def test_fresh_score_is_served_without_recompute(self):
+        self.mock_db.vendor_trust_scores.find_one = AsyncMock(return_value=self.stored(timedelta(minutes=5)))
+        score = await self.service.get_trust_score(self.mock_db, 'vendor_1')
+        self.assertEqual(score.overall_score, 72.5)
+        self.mock_queue.mark.assert_not_called()
+        self.mock_calculate.assert_not_awaited()
+
+    async def test_stale_score_is_served_and_queued(self):
+        """A stale score is still returned; the recalculation runs off the request path"""
+        self.mock_db.vendor_trust_scores.find_one = AsyncMock(return_value=self.stored(timedelta(hours=3)))
+        score = await self.service.get_trust_score(self.mock_db, 'vendor_1')
+        self.assertEqual(score.overall_score, 72.5)
+        self.mock_queue.mark.assert_called_once_with('trust_score', 'vendor_1')
+        self.mock_calculate.assert_not_awaited()
+
+    async def test_unscored_vendor_is_calculated_once(self):
+        self.mock_db.vendor_trust_scores.find_one = AsyncMock(return_value=None)
+        self.assertIsNone(await self.service.get_stored_trust_score(self.mock_db, 'vendor_1'))
+        await self.service.get_trust_score(self.mock_db, 'vendor_1')
+        self.mock_calculate.assert_awaited_once_with(self.mock_db, 'vendor_1')
+
+if __name__ == "__main__":
+    unittest.main()
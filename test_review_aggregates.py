@@ -0,0 +1,190 @@
+import unittest
+from unittest.mock import patch, MagicMock, AsyncMock
+import sys
+
+from pymongo.errors import DuplicateKeyError
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+class AsyncCursor:
+    """Async-iterable stand-in for a Motor cursor"""
+
+    def __init__(self, documents):
+        self._documents = iter(documents)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._documents)
+        except StopIteration:
+            raise StopAsyncIteration
+
+def review(status='pending', **fields):
+    return {
+        'id': 'review_1',
+        'vendor_id': 'vendor_1',
+        'rating': 4,
+        'sentiment': 'positive',
+        'would_recommend': True,
+        'verified': False,
+        'status': status,
+        'category_ratings': [{'category': 'quality', 'rating': 5}, {'category': 'value', 'rating': 3}],
+        **fields
+    }
+
+class TestReviewAggregates(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        from backend.enhanced_review_service import EnhancedReviewService
+
+        self.mock_db = MagicMock()
+        self.mock_db.review_aggregates.update_one = AsyncMock()
+        self.mock_db.review_aggregates.find_one = AsyncMock(return_value=None)
+        self.mock_db.review_aggregates.insert_one = AsyncMock()
+        self.mock_db.review_aggregates.replace_one = AsyncMock(return_value=MagicMock(matched_count=1))
+        self.service = EnhancedReviewService(self.mock_db)
+
+        self.queue_patcher = patch('backend.enhanced_review_service.recompute_queue')
+        self.mock_queue = self.queue_patcher.start()
+        self.stats_patcher = patch(
+            'backend.enhanced_review_service.ReviewStatsService.record_review_change', new=AsyncMock()
+        )
+        self.stats_patcher.start()
+
+    def tearDown(self):
+        self.queue_patcher.stop()
+        self.stats_patcher.stop()
+
+    async def apply(self, before, after):
+        self.mock_db.review_aggregates.update_one.reset_mock()
+        await self.service._apply_review_change('vendor_1', before, after)
+        if not self.mock_db.review_aggregates.update_one.await_count:
+            return {}
+        update = self.mock_db.review_aggregates.update_one.await_args
+        self.assertTrue(update.kwargs['upsert'])
+        delta = dict(update.args[1]['$inc'])
+        self.assertEqual(delta.pop('version'), 1)
+        return delta
+
+    async def test_new_pending_review_counts_towards_rating(self):
+        """A new pending review adds to both the raw and the rated totals"""
+        delta = await self.apply(None, review())
+        self.assertEqual(delta['count'], 1)
+        self.assertEqual(delta['rating_sum'], 4)
+        self.assertEqual(delta['rating_hist.4'], 1)
+        self.assertEqual(delta['sentiment.positive'], 1)
+        self.assertEqual(delta['rated.count'], 1)
+        self.assertEqual(delta['rated.category_sums.quality'], 5)
+        self.assertEqual(delta['rated.category_counts.value'], 1)
+        self.mock_queue.mark.assert_called_with('review_stats', 'vendor_1')
+
+    async def test_increment_creates_aggregate_marked_for_rebuild(self):
+        """An aggregate first created by an increment only holds that delta, so it is rebuilt"""
+        await self.apply(None, review())
+        update = self.mock_db.review_aggregates.update_one.await_args.args[1]
+        self.assertEqual(update['$setOnInsert'], {'needs_rebuild': True})
+
+    async def test_verifying_only_moves_verified_count(self):
+        """pending -> verified keeps the review rated and only adds to the verified count"""
+        before = review()
+        delta = await self.apply(before, {**before, 'status': 'verified', 'verified': True})
+        self.assertEqual(delta, {'verified': 1})
+
+    async def test_flagging_removes_review_from_rating(self):
+        """verified -> flagged takes the review out of the rated totals but not the raw ones"""
+        before = review('verified', verified=True)
+        delta = await self.apply(before, {**before, 'status': 'flagged'})
+        self.assertEqual(delta, {
+            'rated.count': -1,
+            'rated.rating_sum': -4,
+            'rated.category_sums.quality': -5,
+            'rated.category_counts.quality': -1,
+            'rated.category_sums.value': -3,
+            'rated.category_counts.value': -1
+        })
+
+    async def test_unchanged_review_writes_nothing(self):
+        before = review('flagged')
+        self.assertEqual(await self.apply(before, dict(before)), {})
+        self.mock_db.review_aggregates.update_one.assert_not_awaited()
+
+    async def test_vendor_response_counts_once(self):
+        before = review('verified')
+        delta = await self.apply(before, {**before, 'vendor_response': {'content': 'Thank you'}})
+        self.assertEqual(delta, {'responded': 1})
+
+    async def test_rebuild_matches_incremental_deltas(self):
+        """Rebuilding from history gives the totals the incremental deltas add up to"""
+        reviews = [
+            review('verified', id='r1', rating=5, verified=True),
+            review('pending', id='r2', rating=3, sentiment='neutral', would_recommend=False),
+            review('flagged', id='r3', rating=1, sentiment='negative', vendor_response={'content': 'Sorry'})
+        ]
+        totals = {}
+        for item in reviews:
+            for field, value in (await self.apply(None, item)).items():
+                totals[field] = totals.get(field, 0) + value
+
+        self.mock_db.reviews.find = MagicMock(return_value=AsyncCursor(reviews))
+        aggregate = await self.service.rebuild_review_aggregate('vendor_1')
+
+        for field, value in totals.items():
+            target = aggregate
+            for part in field.split('.'):
+                target = target[part]
+            self.assertEqual(target, value, field)
+        self.assertEqual(aggregate['rated']['count'], 2)
+        self.assertEqual(aggregate['rated']['rating_sum'], 8)
+        self.assertEqual(aggregate['count'], 3)
+
+    async def test_rebuild_retries_when_an_increment_lands_mid_scan(self):
+        """A version change during the scan discards it; the stored aggregate is replaced only when unchanged"""
+        reviews = [review('verified', id='r1', rating=5), review('pending', id='r2', rating=3)]
+        self.mock_db.reviews.find = MagicMock(side_effect=[AsyncCursor(reviews[:1]), AsyncCursor(reviews)])
+        self.mock_db.review_aggregates.find_one = AsyncMock(side_effect=[{'version': 3}, {'version': 4}])
+        self.mock_db.review_aggregates.replace_one = AsyncMock(side_effect=[
+            MagicMock(matched_count=0), MagicMock(matched_count=1)
+        ])
+
+        aggregate = await self.service.rebuild_review_aggregate('vendor_1')
+
+        first, second = self.mock_db.review_aggregates.replace_one.await_args_list
+        self.assertEqual(first.args[0], {'vendor_id': 'vendor_1', 'version': 3})
+        self.assertEqual(second.args[0], {'vendor_id': 'vendor_1', 'version': 4})
+        self.assertEqual(aggregate['count'], 2)
+        self.assertEqual(aggregate['version'], 5)
+        self.assertNotIn('needs_rebuild', aggregate)
+
+    async def test_rebuild_retries_when_an_increment_creates_the_aggregate(self):
+        self.mock_db.reviews.find = MagicMock(side_effect=lambda query: AsyncCursor([review()]))
+        self.mock_db.review_aggregates.find_one = AsyncMock(side_effect=[None, {'version': 1, 'needs_rebuild': True}])
+        self.mock_db.review_aggregates.insert_one = AsyncMock(side_effect=DuplicateKeyError('dup'))
+
+        aggregate = await self.service.rebuild_review_aggregate('vendor_1')
+        self.mock_db.review_aggregates.replace_one.assert_awaited_once()
+        self.assertEqual(aggregate['version'], 2)
+
+    async def test_recompute_rebuilds_partial_aggregate_and_refreshes_catalog(self):
+        """Rating writes refresh the vendor in the search indexes"""
+        self.mock_db.review_aggregates.find_one = AsyncMock(side_effect=[
+            {'vendor_id': 'vendor_1', 'version': 1, 'needs_rebuild': True, 'count': 1}, {'version': 1}
+        ])
+        self.mock_db.reviews.find = MagicMock(return_value=AsyncCursor([review(), review(id='r2', rating=2)]))
+        self.mock_db.vendors.update_one = AsyncMock()
+        self.mock_db.review_analytics.update_one = AsyncMock()
+        self.mock_db.quality_scores.update_one = AsyncMock()
+        empty_window = {'count': 0, 'rating_sum': 0}
+
+        with patch('backend.enhanced_review_service.refresh_vendor', new=AsyncMock()) as mock_refresh, \
+                patch('backend.enhanced_review_service.ReviewBucketService.window', new=AsyncMock(return_value=empty_window)):
+            await self.service.recompute_review_stats('vendor_1')
+
+        self.mock_db.review_aggregates.replace_one.assert_awaited_once()
+        rating = self.mock_db.vendors.update_one.await_args_list[0].args[1]['$set']
+        self.assertEqual((rating['average_rating'], rating['review_count']), (3.0, 2))
+        mock_refresh.assert_awaited_once_with(self.mock_db, 'vendor_1')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import unittest
+from unittest.mock import MagicMock, AsyncMock
+from datetime import datetime, timedelta
+import sys
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend.review_buckets import ReviewBucketService, bucket_day
+
+class AsyncCursor:
+    """Async-iterable stand-in for a Motor cursor"""
+
+    def __init__(self, documents):
+        self._documents = iter(list(documents))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._documents)
+        except StopIteration:
+            raise StopAsyncIteration
+
+class FakeBuckets:
+    """review_buckets with the upserted $inc/$max writes and the reads the service uses"""
+
+    def __init__(self):
+        self.buckets = {}
+
+    async def update_one(self, query, update, upsert=False):
+        key = (query["vendor_id"], query["source"], query["day"])
+        if key not in self.buckets:
+            if not upsert:
+                return
+            self.buckets[key] = dict(query)
+        bucket = self.buckets[key]
+        for path, amount in update.get("$inc", {}).items():
+            target = bucket
+            *parents, field = path.split(".")
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[field] = target.get(field, 0) + amount
+        for field, value in update.get("$max", {}).items():
+            if bucket.get(field) is None or value > bucket[field]:
+                bucket[field] = value
+
+    async def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            await self.update_one(operation._filter, operation._doc)
+
+    def _selected(self, query):
+        for bucket in self.buckets.values():
+            if bucket["source"] != query["source"]:
+                continue
+            if "vendor_id" in query and isinstance(query["vendor_id"], dict):
+                if bucket["vendor_id"] not in query["vendor_id"]["$in"]:
+                    continue
+            elif bucket["vendor_id"] != query["vendor_id"]:
+                continue
+            day = query.get("day", {})
+            if "$gt" in day and not bucket["day"] > day["$gt"]:
+                continue
+            if "$gte" in day and not bucket["day"] >= day["$gte"]:
+                continue
+            if "$lte" in day and not bucket["day"] <= day["$lte"]:
+                continue
+            yield bucket
+
+    def find(self, query, projection=None):
+        return AsyncCursor(self._selected(query))
+
+    def aggregate(self, pipeline):
+        grouped = {}
+        for bucket in self._selected(pipeline[0]["$match"]):
+            row = grouped.setdefault(bucket["vendor_id"], {"_id": bucket["vendor_id"], "count": 0, "last_review_at": None})
+            row["count"] += bucket["count"]
+            if row["last_review_at"] is None or bucket["last_review_at"] > row["last_review_at"]:
+                row["last_review_at"] = bucket["last_review_at"]
+        return AsyncCursor(grouped.values())
+
+class TestReviewBuckets(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.now = datetime.utcnow()
+        self.mock_db = MagicMock()
+        self.mock_db.review_buckets = FakeBuckets()
+        self.reviews = [
+            ("v1", self.now - timedelta(hours=1), 5, "positive"),
+            ("v1", self.now - timedelta(days=3), 4, "positive"),
+            ("v1", self.now - timedelta(days=3, hours=2), 2, "negative"),
+            ("v1", self.now - timedelta(days=45), 3, "neutral"),
+            ("v1", self.now - timedelta(days=400), 1, "negative"),
+            ("v2", self.now - timedelta(days=500), 5, "positive")
+        ]
+
+    async def record_all(self):
+        for vendor_id, created_at, rating, sentiment in self.reviews:
+            await ReviewBucketService.record_review(self.mock_db, "reviews", vendor_id, created_at, rating, sentiment)
+
+    def reference(self, vendor_id, start_days_ago, end_days_ago=0):
+        today = bucket_day(self.now)
+        selected = [
+            (rating, sentiment) for review_vendor, created_at, rating, sentiment in self.reviews
+            if review_vendor == vendor_id
+            and today - timedelta(days=start_days_ago) < bucket_day(created_at) <= today - timedelta(days=end_days_ago)
+        ]
+        sentiment = {}
+        for _, label in selected:
+            sentiment[label] = sentiment.get(label, 0) + 1
+        return len(selected), sum(rating for rating, _ in selected), sentiment
+
+    async def test_windows_match_the_reviews_they_cover(self):
+        """Window totals from daily buckets equal totals over the individual reviews"""
+        await self.record_all()
+        for start, end in ((30, 0), (60, 30), (1000, 0), (2, 0)):
+            totals = await ReviewBucketService.window(self.mock_db, "reviews", "v1", start, end)
+            self.assertEqual((totals["count"], totals["rating_sum"], totals["sentiment"]), self.reference("v1", start, end))
+        totals = await ReviewBucketService.window(self.mock_db, "reviews", "v1", 30)
+        self.assertEqual(totals["last_review_at"], self.reviews[0][1])
+
+    async def test_one_bucket_per_vendor_day(self):
+        await self.record_all()
+        self.assertEqual(len(self.mock_db.review_buckets.buckets), 5)
+
+    async def test_recent_activity_all_time_and_windowed(self):
+        await self.record_all()
+        all_time = await ReviewBucketService.recent_activity(self.mock_db, "reviews", ["v1", "v2", "v3"])
+        self.assertEqual(all_time["v1"], {"count": 5, "last_review_at": self.reviews[0][1]})
+        self.assertEqual(all_time["v2"], {"count": 1, "last_review_at": self.reviews[5][1]})
+        self.assertNotIn("v3", all_time)
+
+        windowed = await ReviewBucketService.recent_activity(self.mock_db, "reviews", ["v1", "v2"], days=30)
+        self.assertEqual(windowed["v1"]["count"], 3)
+        self.assertNotIn("v2", windowed)
+
+    async def test_sentiment_shift_moves_counts(self):
+        await self.record_all()
+        vendor_id, created_at, _, _ = self.reviews[2]
+        await ReviewBucketService.shift_sentiment(self.mock_db, "reviews", [
+            (vendor_id, created_at, "negative", "neutral"),
+            ("v1", self.reviews[0][1], "positive", "positive")
+        ])
+        totals = await ReviewBucketService.window(self.mock_db, "reviews", "v1", 30)
+        self.assertEqual(totals["sentiment"], {"positive": 2, "negative": 0, "neutral": 1})
+
+    async def test_unchanged_sentiment_writes_nothing(self):
+        self.mock_db.review_buckets = MagicMock(bulk_write=AsyncMock())
+        await ReviewBucketService.shift_sentiment(self.mock_db, "reviews", [("v1", self.now, "positive", "positive")])
+        self.mock_db.review_buckets.bulk_write.assert_not_awaited()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+from unittest.mock import MagicMock, AsyncMock, patch
+import sys
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend.enhanced_review_service import EnhancedReviewService
+from backend.review_dedup import DUPLICATE_THRESHOLD, DuplicateClusters, lsh_bands, minhash, similarity
+
+class TestReviewDeduplication(unittest.TestCase):
+    ORIGINAL = (
+        "Our photographer was amazing from start to finish. She captured every moment of the "
+        "ceremony and reception, and the photos arrived two weeks early. Highly recommend!"
+    )
+    NEAR_COPY = (
+        "Our photographer was amazing from start to finish! She captured every moment of the "
+        "ceremony and reception, and the photos arrived two weeks early. Highly recommended"
+    )
+    UNRELATED = (
+        "The florist forgot the bridal bouquet and the centrepieces were wilted by the time the "
+        "guests sat down. We asked for a partial refund and never heard back from them."
+    )
+
+    def test_near_copies_share_bands(self):
+        """Near-identical texts estimate above the threshold and collide in at least one band"""
+        original, copy = minhash(self.ORIGINAL), minhash(self.NEAR_COPY)
+        self.assertGreaterEqual(similarity(original, copy), DUPLICATE_THRESHOLD)
+        self.assertTrue(set(lsh_bands(original)) & set(lsh_bands(copy)))
+
+    def test_different_reviews_stay_apart(self):
+        original, unrelated = minhash(self.ORIGINAL), minhash(self.UNRELATED)
+        self.assertLess(similarity(original, unrelated), 0.3)
+        self.assertFalse(set(lsh_bands(original)) & set(lsh_bands(unrelated)))
+
+    def test_signature_is_stable_and_case_insensitive(self):
+        self.assertEqual(minhash(self.ORIGINAL), minhash(self.ORIGINAL.upper()))
+        self.assertEqual(len(lsh_bands(minhash(self.ORIGINAL))), 16)
+
+    def test_short_text_has_no_signature(self):
+        self.assertIsNone(minhash("Great service!"))
+        self.assertIsNone(minhash(""))
+
+    def test_clusters_group_transitive_pairs(self):
+        clusters = DuplicateClusters()
+        clusters.union('r1', 'r2')
+        clusters.union('r3', 'r2')
+        clusters.union('r4', 'r5')
+        clusters.find('r6')
+        groups = sorted(sorted(group) for group in clusters.clusters())
+        self.assertEqual(groups, [['r1', 'r2', 'r3'], ['r4', 'r5']])
+        self.assertEqual(clusters.find('r1'), clusters.find('r3'))
+
+class FakeQuery:
+    """find() result over in-memory documents supporting sort and async iteration"""
+
+    def __init__(self, documents):
+        self._documents = list(documents)
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self._documents.sort(key=lambda document: document[field], reverse=direction < 0)
+        return self
+
+    def __aiter__(self):
+        self._iterator = iter(self._documents)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+class TestDuplicateScan(unittest.IsolatedAsyncioTestCase):
+    async def test_scan_flags_all_but_the_earliest_of_each_cluster(self):
+        original, copy, unrelated = (
+            TestReviewDeduplication.ORIGINAL, TestReviewDeduplication.NEAR_COPY, TestReviewDeduplication.UNRELATED
+        )
+        reviews = [
+            {'_id': 1, 'id': 'r1', 'title': '', 'content': original, 'status': 'verified', 'created_at': 1},
+            {'_id': 2, 'id': 'r2', 'title': '', 'content': unrelated, 'status': 'verified', 'created_at': 2},
+            {'_id': 3, 'id': 'r3', 'title': '', 'content': copy, 'status': 'verified', 'created_at': 3},
+            {'_id': 4, 'id': 'r4', 'title': '', 'content': original, 'status': 'flagged', 'created_at': 4},
+            {'_id': 5, 'id': 'r5', 'title': '', 'content': 'Great service!', 'status': 'verified', 'created_at': 5}
+        ]
+        mock_db = MagicMock()
+        mock_db.reviews.find_one = AsyncMock(return_value={'_id': 1})
+        mock_db.reviews.find = MagicMock(return_value=FakeQuery(reviews))
+        mock_db.reviews.bulk_write = AsyncMock()
+        service = EnhancedReviewService(mock_db)
+
+        with patch.object(service, 'flag_review', new=AsyncMock(return_value=True)) as mock_flag:
+            self.assertEqual(await service.detect_duplicate_reviews(), 1)
+
+        mock_flag.assert_awaited_once_with('r3', 'Near-duplicate of review r1')
+        # Every review without a signature gets one stored, including the short one
+        operations = mock_db.reviews.bulk_write.await_args.args[0]
+        self.assertEqual(len(operations), 5)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+from unittest.mock import patch, AsyncMock
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import base64
+import io
+import sys
+
+from PIL import Image
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend import review_photos
+from backend.review_photos import PhotoRejected, process_photo, process_review_photos
+
+def encoded_image(size=(400, 300), image_format="JPEG", mode="RGB", exif=None):
+    output = io.BytesIO()
+    options = {"exif": exif} if exif is not None else {}
+    Image.new(mode, size, "red" if mode == "RGB" else (255, 0, 0, 128)).save(output, format=image_format, **options)
+    return base64.b64encode(output.getvalue()).decode()
+
+def gps_exif(orientation=None):
+    exif = Image.Exif()
+    exif[0x010F] = "CameraMaker"
+    exif[0x8825] = {1: "N", 2: (51.0, 30.0, 0.0)}
+    if orientation:
+        exif[0x0112] = orientation
+    return exif.tobytes()
+
+class TestProcessPhoto(unittest.TestCase):
+    def test_resizes_and_encodes_webp(self):
+        photo, thumbnail, metadata = process_photo(encoded_image((3840, 2160)))
+        with Image.open(io.BytesIO(photo)) as img:
+            self.assertEqual(img.format, "WEBP")
+            self.assertEqual(img.size, (1920, 1080))
+        with Image.open(io.BytesIO(thumbnail)) as img:
+            self.assertLessEqual(max(img.size), 300)
+        self.assertEqual(metadata["original_format"], "JPEG")
+        self.assertEqual(metadata["original_dimensions"], {"width": 3840, "height": 2160})
+        self.assertEqual(metadata["optimized_dimensions"], {"width": 1920, "height": 1080})
+
+    def test_strips_metadata_and_applies_orientation(self):
+        """Camera and location EXIF is dropped; a rotated photo comes out upright"""
+        photo, _, _ = process_photo(encoded_image((400, 300), exif=gps_exif(orientation=6)))
+        with Image.open(io.BytesIO(photo)) as img:
+            self.assertEqual(img.size, (300, 400))
+            self.assertEqual(len(img.getexif()), 0)
+            self.assertNotIn("exif", img.info)
+
+    def test_keeps_transparency(self):
+        photo, _, _ = process_photo(encoded_image(image_format="PNG", mode="RGBA"))
+        with Image.open(io.BytesIO(photo)) as img:
+            self.assertEqual(img.mode, "RGBA")
+
+    def test_data_url_prefix(self):
+        _, _, metadata = process_photo("data:image/png;base64," + encoded_image(image_format="PNG"))
+        self.assertEqual(metadata["original_format"], "PNG")
+
+    def test_rejections(self):
+        cases = {
+            "not base64": "not*base64!",
+            "not an image": base64.b64encode(b"plain text, not pixels").decode(),
+            "unsupported format": encoded_image(image_format="BMP")
+        }
+        for name, encoded in cases.items():
+            with self.subTest(name), self.assertRaises(PhotoRejected):
+                process_photo(encoded)
+
+    def test_size_limits(self):
+        with patch.object(review_photos, "MAX_PHOTO_BYTES", 1024), self.assertRaises(PhotoRejected):
+            process_photo(encoded_image((800, 800)))
+        with patch.object(review_photos, "MAX_PHOTO_PIXELS", 100 * 100), self.assertRaises(PhotoRejected):
+            process_photo(encoded_image((200, 200)))
+
+class TestProcessReviewPhotos(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        # Threads stand in for the worker processes
+        pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(pool.shutdown)
+        patcher = patch.object(review_photos, "_executor", return_value=(pool, asyncio.Semaphore(4)))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.store_file = AsyncMock(side_effect=lambda db, **kwargs: {
+            "file_id": kwargs["file_path"], "public_url": "/files/photo.webp", "thumbnail_url": "/files/thumb.webp"
+        })
+        patcher = patch("backend.review_photos.FileUploadService.store_file", self.store_file)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_rejected_photos_are_skipped(self):
+        photos = [encoded_image(), "not*base64!", encoded_image((100, 50), image_format="PNG")]
+        processed = await process_review_photos(None, photos, "c1", "v1", "r1")
+
+        self.assertEqual([(photo["width"], photo["height"]) for photo in processed], [(400, 300), (100, 50)])
+        self.assertEqual(self.store_file.await_count, 2)
+        for call in self.store_file.await_args_list:
+            self.assertEqual(call.kwargs["mime_type"], "image/webp")
+            self.assertEqual(call.kwargs["tags"], ["review", "r1"])
+
+    async def test_photo_count_is_capped(self):
+        photos = [encoded_image((20, 20))] * (review_photos.MAX_PHOTOS_PER_REVIEW + 3)
+        processed = await process_review_photos(None, photos, "c1", "v1", "r1")
+        self.assertEqual(len(processed), review_photos.MAX_PHOTOS_PER_REVIEW)
+
+if __name__ == "__main__":
+    unittest.main()
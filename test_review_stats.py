@@ -0,0 +1,79 @@
+import unittest
+from unittest.mock import MagicMock, AsyncMock, patch
+import sys
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend.review_stats import ReviewStatsService
+
+def review(review_id, rating, sentiment, status='verified', photos=('p.jpg',)):
+    return {'id': review_id, 'vendor_id': 'v1', 'rating': rating, 'sentiment': sentiment,
+            'status': status, 'photos': list(photos)}
+
+class TestReviewStats(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        ReviewStatsService._cached = None
+        self.mock_db = MagicMock()
+        self.mock_db.platform_review_stats.update_one = AsyncMock()
+
+    def tearDown(self):
+        ReviewStatsService._cached = None
+
+    async def test_new_verified_review_increments_counts(self):
+        await ReviewStatsService.record_review_change(self.mock_db, None, review('r1', 5, 'positive'))
+        query, update = self.mock_db.platform_review_stats.update_one.await_args.args
+        self.assertEqual(query, {'_id': ReviewStatsService.SNAPSHOT_ID})
+        self.assertEqual(update['$inc'], {'verified_count': 1, 'rating_sum': 5, 'sentiment.positive': 1})
+        self.assertNotIn('$pull', update)
+
+    async def test_edit_moves_only_the_difference(self):
+        await ReviewStatsService.record_review_change(
+            self.mock_db, review('r1', 5, 'positive'), review('r1', 4, 'positive')
+        )
+        update = self.mock_db.platform_review_stats.update_one.await_args.args[1]
+        self.assertEqual(update['$inc'], {'rating_sum': -1})
+
+    async def test_flagged_review_leaves_counts_and_trending_pool(self):
+        before = review('r1', 5, 'positive')
+        await ReviewStatsService.record_review_change(self.mock_db, before, dict(before, status='flagged'))
+        update = self.mock_db.platform_review_stats.update_one.await_args.args[1]
+        self.assertEqual(update['$inc'], {'verified_count': -1, 'rating_sum': -5, 'sentiment.positive': -1})
+        self.assertEqual(update['$pull'], {'trending_reviews': {'id': 'r1'}})
+
+    async def test_unverified_change_writes_nothing(self):
+        await ReviewStatsService.record_review_change(
+            self.mock_db, review('r1', 5, 'positive', status='pending'), review('r1', 3, 'neutral', status='pending')
+        )
+        self.mock_db.platform_review_stats.update_one.assert_not_awaited()
+
+    async def test_statistics_from_snapshot(self):
+        self.mock_db.platform_review_stats.find_one = AsyncMock(return_value={
+            'verified_count': 4, 'rating_sum': 17.0,
+            'sentiment': {'positive': 3, 'neutral': 1, 'negative': 0},
+            'top_rated_vendors': [{'id': 'v1', 'business_name': 'Bloom', 'category': 'florist',
+                                   'average_rating': 4.9, 'review_count': 12}],
+            'trending_reviews': [review(f'r{i}', 5, 'positive') for i in range(5)]
+        })
+
+        statistics = await ReviewStatsService.get_statistics(self.mock_db)
+        self.assertEqual(statistics['total_reviews'], 4)
+        self.assertEqual(statistics['platform_average_rating'], 4.25)
+        self.assertEqual(statistics['sentiment_distribution'], {'positive': 3, 'neutral': 1})
+        self.assertEqual(statistics['top_rated_vendors'][0]['name'], 'Bloom')
+
+        trending = await ReviewStatsService.get_trending_reviews(self.mock_db, limit=2)
+        self.assertEqual([r['id'] for r in trending], ['r0', 'r1'])
+        # Both reads were served from the in-process copy
+        self.mock_db.platform_review_stats.find_one.assert_awaited_once()
+
+    async def test_missing_snapshot_is_built(self):
+        self.mock_db.platform_review_stats.find_one = AsyncMock(return_value=None)
+        with patch.object(ReviewStatsService, 'refresh', new=AsyncMock(return_value={'verified_count': 0})) as mock_refresh:
+            statistics = await ReviewStatsService.get_statistics(self.mock_db)
+        mock_refresh.assert_awaited_once_with(self.mock_db)
+        self.assertEqual(statistics['total_reviews'], 0)
+        self.assertEqual(statistics['platform_average_rating'], 0)
+
+if __name__ == "__main__":
+    unittest.main()
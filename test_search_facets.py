@@ -0,0 +1,144 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import random
+from bisect import bisect_right
+from collections import Counter
+import sys
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend.catalog_index import VendorCatalogIndex
+from backend.models import SearchFilter
+from backend.search_facets import (
+    FacetCache, PRICE_BANDS, RATING_BANDS, count_facets, format_mongo_facets, price_band, rating_band
+)
+from backend.search_service import AISearchService
+
+def bucket_rows(values, boundaries):
+    """What Mongo's $bucket emits: one row per lower boundary, "other" for the rest"""
+    counts = Counter()
+    for value in values:
+        if boundaries[0] <= value < float("inf"):
+            counts[boundaries[bisect_right(boundaries, value) - 1]] += 1
+        else:
+            counts["other"] += 1
+    return [{"_id": boundary, "count": count} for boundary, count in counts.items()]
+
+def mongo_facet_output(docs):
+    """Raw $facet output for the stages in mongo_facet_stages"""
+    return {
+        "category": [{"_id": key, "count": count} for key, count in Counter(doc.get("category") for doc in docs).items()],
+        "style_tags": [{"_id": key, "count": count} for key, count in Counter(
+            tag for doc in docs for tag in doc.get("style_tags", [])
+        ).items()],
+        "price_band": bucket_rows([doc["pricing_from"] for doc in docs if doc.get("pricing_from") is not None], PRICE_BANDS),
+        "rating": bucket_rows([doc.get("average_rating") or 0 for doc in docs], RATING_BANDS)
+    }
+
+class AsyncCursor:
+    def __init__(self, documents):
+        self._documents = list(documents)
+
+    async def to_list(self, length=None):
+        return self._documents
+
+class TestFacetHistograms(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(10)
+        self.docs = [
+            {
+                "id": f"v{i}",
+                "status": "approved",
+                "category": rng.choice(["venue", "florist", "photographer", None]),
+                "style_tags": rng.sample(["rustic", "boho", "modern"], rng.randint(0, 2)),
+                "pricing_from": rng.choice([None, 0, 999, 1000, 2400, 5000, 12000]),
+                "average_rating": rng.choice([None, 2.5, 3.0, 4.2, 4.5, 5.0])
+            }
+            for i in range(150)
+        ]
+
+    def test_band_labels(self):
+        self.assertEqual(price_band(999), "0-1000")
+        self.assertEqual(price_band(1000), "1000-2500")
+        self.assertEqual(price_band(20000), "10000+")
+        self.assertIsNone(price_band(None))
+        self.assertEqual(rating_band(4.5), "4.5+")
+        self.assertEqual(rating_band(0), "0-3")
+
+    def test_mongo_and_in_memory_counts_agree(self):
+        """The catalog index and the $facet fallback report identical histograms"""
+        self.assertEqual(format_mongo_facets(mongo_facet_output(self.docs)), count_facets(self.docs))
+
+    def test_catalog_facets_follow_filters(self):
+        index = VendorCatalogIndex()
+        index.load(self.docs)
+        facets = index.facet_counts(any_of={"style_tags": ["boho"]})
+        self.assertEqual(facets, count_facets(doc for doc in self.docs if "boho" in doc["style_tags"]))
+
+class TestFacetCache(unittest.TestCase):
+    def test_lru_eviction_and_invalidate(self):
+        cache = FacetCache(max_entries=2)
+        cache.set("a", {"category": {"venue": 1}})
+        cache.set("b", {})
+        cache.get("a")
+        cache.set("c", {})
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), {"category": {"venue": 1}})
+
+        cache.invalidate()
+        self.assertIsNone(cache.get("a"))
+
+    def test_entries_expire(self):
+        cache = FacetCache(ttl_seconds=300)
+        with patch("backend.search_facets.time.monotonic", return_value=1000.0):
+            cache.set("a", {})
+        with patch("backend.search_facets.time.monotonic", return_value=1299.0):
+            self.assertEqual(cache.get("a"), {})
+        with patch("backend.search_facets.time.monotonic", return_value=1301.0):
+            self.assertIsNone(cache.get("a"))
+
+class TestMongoSearchRoundTrip(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.mock_db = MagicMock()
+        self.mock_db.vendor_profiles.aggregate = MagicMock(return_value=AsyncCursor([{
+            "results": [{"id": "v1"}, {"id": "v2"}],
+            "total": [{"count": 42}],
+            "category": [{"_id": "venue", "count": 42}]
+        }]))
+        self.cache = FacetCache()
+        patcher = patch("backend.search_service.facet_cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def search(self, after=None):
+        return await AISearchService._execute_search(
+            self.mock_db, {"status": "approved"}, SearchFilter(), None, None, after, 2, 0, include_facets=True
+        )
+
+    async def test_page_total_and_facets_in_one_aggregate(self):
+        vendors, total, _, facets = await self.search()
+
+        self.mock_db.vendor_profiles.aggregate.assert_called_once()
+        self.mock_db.vendor_profiles.find.assert_not_called()
+        self.mock_db.vendor_profiles.count_documents.assert_not_called()
+        self.assertEqual([vendor["id"] for vendor in vendors], ["v1", "v2"])
+        self.assertEqual(total, 42)
+        self.assertEqual(facets["category"], {"venue": 42})
+
+        # $match and $sort precede $facet so the rating index serves them
+        match, sort, facet = self.mock_db.vendor_profiles.aggregate.call_args.args[0]
+        self.assertEqual(match, {"$match": {"status": "approved"}})
+        self.assertEqual(list(sort["$sort"]), [field for field, _ in AISearchService.RATING_SORT])
+        self.assertIn("price_band", facet["$facet"])
+
+    async def test_cached_facets_are_not_recomputed(self):
+        await self.search()
+        await self.search(after=[4.5, 10, None, "v9"])
+
+        stages = self.mock_db.vendor_profiles.aggregate.call_args.args[0][2]["$facet"]
+        self.assertEqual(set(stages), {"results", "total"})
+        self.assertIn("$or", stages["results"][0]["$match"])
+
+if __name__ == "__main__":
+    unittest.main()
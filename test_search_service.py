@@ -0,0 +1,198 @@
+import unittest
+from unittest.mock import MagicMock, AsyncMock
+from datetime import datetime, timedelta
+import sys
+
+from pymongo.errors import DuplicateKeyError
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend.search_service import AISearchService, TrendingService
+
+class AsyncCursor:
+    """Async-iterable stand-in for a Motor cursor"""
+
+    def __init__(self, documents):
+        self._documents = iter(list(documents))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._documents)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length=None):
+        return [document async for document in self]
+
+class FakeQuery:
+    """find() result over in-memory documents supporting sort/limit/to_list"""
+
+    def __init__(self, documents):
+        self._documents = list(documents)
+
+    def sort(self, field, direction=1):
+        self._documents.sort(key=lambda document: document[field], reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        self._documents = self._documents[:count]
+        return self
+
+    async def to_list(self, length=None):
+        return self._documents
+
+def mock_collection(rows=None):
+    """Collection whose find/aggregate return ``rows`` and record each call"""
+    collection = MagicMock()
+    collection.find = MagicMock(side_effect=lambda *args, **kwargs: AsyncCursor(rows or []))
+    collection.aggregate = MagicMock(side_effect=lambda *args, **kwargs: AsyncCursor(rows or []))
+    return collection
+
+class TestVendorEnrichment(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.last_review = datetime(2025, 3, 2, 9, 30)
+        self.mock_db = MagicMock()
+        self.mock_db.quote_requests = mock_collection([{"_id": "v1", "count": 2}])
+        self.mock_db.recently_viewed = mock_collection([{"_id": "v1", "count": 5}, {"_id": "v2", "count": 1}])
+        self.mock_db.vendor_trust_scores = mock_collection([{"vendor_id": "v2", "overall_score": 81.5}])
+        self.mock_db.wishlist_items = mock_collection([{"vendor_id": "v1"}])
+        self.mock_db.review_buckets = mock_collection([
+            {"_id": "v1", "count": 7, "last_review_at": self.last_review}
+        ])
+
+    def queries(self):
+        return sum(
+            collection.find.call_count + collection.aggregate.call_count
+            for collection in (
+                self.mock_db.quote_requests, self.mock_db.recently_viewed, self.mock_db.vendor_trust_scores,
+                self.mock_db.wishlist_items, self.mock_db.review_buckets
+            )
+        )
+
+    async def test_page_is_enriched_from_batched_lookups(self):
+        """Every vendor gets social proof, trust score, wishlist and activity fields"""
+        vendors = [{"id": "v1"}, {"id": "v2"}, {"id": "v3"}]
+        enhanced = await AISearchService._enhance_vendor_batch(self.mock_db, vendors, user_id="u1")
+
+        v1, v2, v3 = enhanced
+        self.assertEqual(v1["social_proof"], {"recent_bookings": 2, "recent_views": 5, "popularity_score": 30})
+        self.assertTrue(v1["in_wishlist"])
+        self.assertEqual(v1["recent_activity"], {"recent_reviews_count": 3, "last_review_date": self.last_review})
+        self.assertEqual(v2["trust_score"], 81.5)
+        self.assertFalse(v2["in_wishlist"])
+        self.assertEqual(v3["trust_score"], 0)
+        self.assertEqual(v3["recent_activity"], {"recent_reviews_count": 0, "last_review_date": None})
+
+        # The latest review date is taken over every bucket, not a recent window
+        pipeline = self.mock_db.review_buckets.aggregate.call_args.args[0]
+        self.assertNotIn("day", pipeline[0]["$match"])
+
+    async def test_query_count_does_not_grow_with_page_size(self):
+        await AISearchService._enhance_vendor_batch(self.mock_db, [{"id": "v1"}], user_id="u1")
+        single_page = self.queries()
+        self.setUp()
+        await AISearchService._enhance_vendor_batch(self.mock_db, [{"id": f"v{i}"} for i in range(50)], user_id="u1")
+        self.assertEqual(self.queries(), single_page)
+
+    async def test_anonymous_user_skips_wishlist_lookup(self):
+        await AISearchService._enhance_vendor_batch(self.mock_db, [{"id": "v1"}])
+        self.mock_db.wishlist_items.find.assert_not_called()
+
+    async def test_failure_keeps_response_shape(self):
+        """A failed lookup still returns every enrichment key, with defaults"""
+        self.mock_db.vendor_trust_scores.find = MagicMock(side_effect=Exception("connection reset"))
+        enhanced = await AISearchService._enhance_vendor_batch(self.mock_db, [{"id": "v1"}, {"id": "v2"}], "u1")
+
+        for vendor in enhanced:
+            self.assertEqual(vendor["trust_score"], 0)
+            self.assertFalse(vendor["in_wishlist"])
+            self.assertEqual(vendor["social_proof"]["popularity_score"], 0)
+            self.assertEqual(vendor["recent_activity"], {"recent_reviews_count": 0, "last_review_date": None})
+
+class TestTrendingLeaderboard(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        TrendingService._epoch = None
+        self.now = datetime.utcnow()
+        self.old_epoch = self.now - timedelta(days=35)
+        self.new_epoch = self.now - timedelta(days=7)
+
+    def entry(self, vendor_id, decayed_score, epoch):
+        """Leaderboard entry whose score decays to ``decayed_score`` now"""
+        return {
+            "vendor_id": vendor_id,
+            "score": decayed_score * TrendingService._growth_factor(self.now, epoch),
+            "epoch": epoch
+        }
+
+    def test_decayed_score_is_independent_of_epoch(self):
+        """The same activity stored under two epochs decays to the same value"""
+        event = self.now - timedelta(days=3)
+        for epoch in (TrendingService.TRENDING_EPOCH, self.old_epoch, self.new_epoch):
+            stored = {"score": 4.0 * TrendingService._growth_factor(event, epoch), "epoch": epoch}
+            # Three days into a seven day half-life
+            self.assertAlmostEqual(TrendingService._decayed_score(stored, self.now), 4.0 * 0.5 ** (3 / 7), places=6)
+
+        # Entries written before epochs were stored use the original epoch
+        legacy = {"score": TrendingService._growth_factor(self.now, TrendingService.TRENDING_EPOCH)}
+        self.assertAlmostEqual(TrendingService._decayed_score(legacy, self.now), 1.0, places=6)
+
+    async def test_ranking_spans_entries_on_different_epochs(self):
+        """Mid-rebase, entries on the old epoch rank by decayed score, not raw stored score"""
+        entries = [
+            # Large raw scores, small decayed scores
+            self.entry("old_small", 1.0, self.old_epoch),
+            self.entry("old_big", 6.0, self.old_epoch),
+            self.entry("new_mid", 3.0, self.new_epoch),
+            self.entry("new_top", 9.0, self.new_epoch)
+        ]
+        self.assertGreater(entries[0]["score"], entries[3]["score"])
+
+        mock_db = MagicMock()
+        mock_db.trending_vendors.distinct = AsyncMock(return_value=[self.old_epoch, self.new_epoch])
+        mock_db.trending_vendors.find = MagicMock(side_effect=lambda query, projection: FakeQuery(
+            entry for entry in entries if entry["epoch"] == query["epoch"]
+        ))
+        mock_db.vendor_profiles.find = MagicMock(side_effect=lambda query: FakeQuery(
+            {"id": vendor_id, "status": "approved", "average_rating": 0}
+            for vendor_id in query["id"]["$in"]
+        ))
+
+        vendors = await TrendingService.get_trending_vendors(mock_db, limit=3)
+        self.assertEqual([vendor["id"] for vendor in vendors], ["new_top", "old_big", "new_mid"])
+        self.assertEqual(vendors[0]["trending_score"], 9.0)
+
+    async def test_event_on_rebased_entry_retries_with_reloaded_epoch(self):
+        """A write scaled for a stale epoch is retried on the epoch the entry moved to"""
+        mock_db = MagicMock()
+        mock_db.trending_state.find_one_and_update = AsyncMock(side_effect=[
+            {"epoch": self.old_epoch}, {"epoch": self.new_epoch}
+        ])
+        mock_db.trending_vendors.update_one = AsyncMock(side_effect=[DuplicateKeyError("dup"), None])
+
+        await TrendingService.record_review(mock_db, "v1", at=self.now)
+
+        first, second = mock_db.trending_vendors.update_one.await_args_list
+        self.assertEqual(first.args[0], {"vendor_id": "v1", "epoch": self.old_epoch})
+        self.assertEqual(second.args[0], {"vendor_id": "v1", "epoch": self.new_epoch})
+        self.assertAlmostEqual(
+            second.args[1]["$inc"]["score"],
+            TrendingService.REVIEW_WEIGHT * TrendingService._growth_factor(self.now, self.new_epoch)
+        )
+        self.assertEqual(TrendingService._epoch, self.new_epoch)
+
+    async def test_cached_epoch_is_reread_after_reload_interval(self):
+        mock_db = MagicMock()
+        mock_db.trending_state.find_one_and_update = AsyncMock(side_effect=[
+            {"epoch": self.old_epoch}, {"epoch": self.new_epoch}
+        ])
+        self.assertEqual(await TrendingService._current_epoch(mock_db), self.old_epoch)
+        self.assertEqual(await TrendingService._current_epoch(mock_db), self.old_epoch)
+        TrendingService._epoch_loaded_at -= TrendingService.EPOCH_RELOAD_SECONDS + 1
+        self.assertEqual(await TrendingService._current_epoch(mock_db), self.new_epoch)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+from unittest.mock import patch, MagicMock, AsyncMock
+from datetime import datetime
+import sys
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend.sentiment import score_text, score_texts
+
+class TestSentiment(unittest.TestCase):
+    def test_plain_terms(self):
+        self.assertEqual(score_text("The venue was amazing and the staff were wonderful")['sentiment'], 'positive')
+        self.assertEqual(score_text("Rude staff and an overpriced menu")['sentiment'], 'negative')
+        self.assertEqual(score_text("")['sentiment'], 'neutral')
+
+    def test_negation_flips_next_term(self):
+        """A negator flips the next sentiment term within its scope"""
+        result = score_text("The photographer was not professional")
+        self.assertEqual((result['positive_words'], result['negative_words']), (0, 1))
+        self.assertEqual(score_text("Honestly the band wasn't bad")['sentiment'], 'positive')
+        self.assertEqual(score_text("They didn't disappoint, not rude at all")['sentiment'], 'positive')
+
+    def test_negation_stops_at_clause_and_scope(self):
+        # The comma ends the negated clause, so "amazing" stays positive
+        result = score_text("Not cheap, but amazing")
+        self.assertEqual((result['positive_words'], result['negative_words']), (1, 0))
+        # Only the first term after the negator is flipped
+        result = score_text("Not late and very helpful")
+        self.assertEqual((result['positive_words'], result['negative_words']), (2, 0))
+        # Beyond the scope the term keeps its polarity
+        result = score_text("No one could have been more or less helpful")
+        self.assertEqual(result['positive_words'], 1)
+
+    def test_phrases_match_before_words(self):
+        result = score_text("A total waste of money")
+        self.assertEqual((result['positive_words'], result['negative_words']), (0, 1))
+        self.assertEqual(score_text("Highly recommend, worth every penny")['sentiment'], 'positive')
+        self.assertEqual(score_text("Definitely not worth it")['sentiment'], 'negative')
+
+    def test_batch_scoring_matches_single(self):
+        texts = ["Not cheap, but amazing", "", "A total waste of money", "Rude staff"]
+        self.assertEqual(score_texts(texts), [score_text(text) for text in texts])
+
+class TestSentimentRescore(unittest.IsolatedAsyncioTestCase):
+    async def test_changed_sentiment_moves_vendor_counts(self):
+        """Only reviews whose label changed shift their vendor's aggregate and daily buckets"""
+        from backend.enhanced_review_service import EnhancedReviewService
+
+        mock_db = MagicMock()
+        mock_db.reviews.bulk_write = AsyncMock()
+        mock_db.review_aggregates.bulk_write = AsyncMock()
+        service = EnhancedReviewService(mock_db)
+        created = datetime(2025, 5, 1)
+        batch = [
+            {'_id': 1, 'vendor_id': 'vendor_1', 'sentiment': 'positive', 'created_at': created},
+            {'_id': 2, 'vendor_id': 'vendor_1', 'sentiment': 'neutral', 'created_at': created},
+            {'_id': 3, 'vendor_id': 'vendor_2', 'sentiment': 'negative', 'created_at': created}
+        ]
+        scores = [
+            {'sentiment': 'negative', 'score': -0.5},
+            {'sentiment': 'negative', 'score': -0.4},
+            {'sentiment': 'negative', 'score': -0.6}
+        ]
+
+        with patch('backend.enhanced_review_service.recompute_queue') as mock_queue, \
+                patch('backend.enhanced_review_service.ReviewBucketService.shift_sentiment', new=AsyncMock()) as mock_shift:
+            self.assertEqual(await service._store_sentiment(batch, scores), 3)
+
+        (update,) = mock_db.review_aggregates.bulk_write.await_args.args[0]
+        self.assertEqual(update._filter, {'vendor_id': 'vendor_1'})
+        self.assertTrue(update._upsert)
+        self.assertEqual(update._doc['$inc'], {
+            'sentiment.positive': -1, 'sentiment.neutral': -1, 'sentiment.negative': 2, 'version': 1
+        })
+        self.assertEqual(len(mock_shift.await_args.args[2]), 2)
+        mock_queue.mark.assert_called_once_with('review_stats', 'vendor_1')
+
+if __name__ == "__main__":
+    unittest.main()
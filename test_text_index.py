@@ -0,0 +1,97 @@
+import unittest
+import math
+from collections import defaultdict
+import sys
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend.text_index import VendorTextIndex, tokenize
+
+PROFILES = [
+    {"id": "v1", "business_name": "Rustic Lens Photography", "category": "photographer",
+     "style_tags": ["rustic", "boho"], "location": "Byron Bay", "description": "Barn and farm weddings"},
+    {"id": "v2", "business_name": "Harbour Views", "category": "venue",
+     "style_tags": ["modern"], "location": "Sydney", "description": "Waterfront venue with rustic timber ceilings"},
+    {"id": "v3", "business_name": "Petal & Stem", "category": "florist",
+     "style_tags": ["boho"], "location": "Melbourne", "description": "Seasonal flowers"},
+    {"id": "v4", "business_name": "Golden Hour Photographers", "category": "photographer",
+     "style_tags": ["classic"], "location": "Sydney", "description": "Candid photography"}
+]
+
+PACKAGES = {
+    "v3": [{"name": "Bridal bouquet", "description": "Rustic wildflower bouquet", "inclusions": ["Buttonholes"]}]
+}
+
+def reference_scores(index, query):
+    """Plain-Python BM25F over the same boosted fields"""
+    docs = {}
+    for profile in PROFILES:
+        weights = defaultdict(float)
+        for field, text in index._field_text(profile, PACKAGES.get(profile["id"], [])).items():
+            for term in tokenize(text):
+                weights[term] += index.FIELD_BOOSTS[field]
+        docs[profile["id"]] = weights
+    average_length = sum(sum(weights.values()) for weights in docs.values()) / len(docs)
+
+    scores = defaultdict(float)
+    for term in set(tokenize(query)):
+        matching = [vendor_id for vendor_id, weights in docs.items() if term in weights]
+        idf = math.log(1 + (len(docs) - len(matching) + 0.5) / (len(matching) + 0.5))
+        for vendor_id in matching:
+            tf = docs[vendor_id][term]
+            norm = index.K1 * (1 - index.B + index.B * sum(docs[vendor_id].values()) / average_length)
+            scores[vendor_id] += idf * tf * (index.K1 + 1) / (tf + norm)
+    return dict(scores)
+
+class TestVendorTextIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = VendorTextIndex()
+        self.index.load(PROFILES, PACKAGES)
+
+    def assertScoresEqual(self, actual, expected):
+        self.assertEqual(set(actual), set(expected))
+        for vendor_id, score in expected.items():
+            self.assertAlmostEqual(actual[vendor_id], score, places=9)
+
+    def test_tokenize_stems_and_drops_stopwords(self):
+        self.assertEqual(tokenize("The Photographers of Byron galleries"), ["photographer", "byron", "gallery"])
+        self.assertEqual(tokenize(None), [])
+
+    def test_scores_match_reference_bm25(self):
+        for query in ("rustic photographer", "boho sydney", "bouquet", "photography"):
+            scores, truncated = self.index.search(query)
+            self.assertFalse(truncated)
+            self.assertScoresEqual(scores, reference_scores(self.index, query))
+
+    def test_boosted_fields_rank_higher(self):
+        """A term in the business name outranks the same term in a description"""
+        scores, _ = self.index.search("rustic")
+        self.assertEqual(max(scores, key=scores.get), "v1")
+        self.assertIn("v3", scores)
+
+    def test_unknown_and_stopword_queries(self):
+        self.assertEqual(self.index.search("the and of"), ({}, False))
+        self.assertEqual(self.index.search("zeppelin"), ({}, False))
+        self.assertEqual(VendorTextIndex().search("rustic"), ({}, False))
+
+    def test_upsert_and_remove_match_a_fresh_load(self):
+        changed = dict(PROFILES[1], description="Glasshouse venue for boho weddings")
+        self.index.remove("v3")
+        self.index.upsert(changed, [])
+
+        fresh = VendorTextIndex()
+        fresh.load([PROFILES[0], changed, PROFILES[3]], {})
+        self.assertEqual(len(self.index), 3)
+        for query in ("rustic", "boho wedding", "bouquet"):
+            self.assertScoresEqual(self.index.search(query)[0], fresh.search(query)[0])
+
+    def test_budget_cuts_common_terms_first(self):
+        self.index.SEARCH_BUDGET_MS = -1
+        scores, truncated = self.index.search("sydney bouquet")
+        self.assertTrue(truncated)
+        # Only the rarest term was scored
+        self.assertEqual(set(scores), {"v3"})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import MagicMock, AsyncMock
+import asyncio
+import sys
+
+from pymongo.errors import BulkWriteError
+
+# Add the app directory to the path
+sys.path.append('/app')
+
+from backend.vote_buffer import HelpfulVoteBuffer
+
+class TestHelpfulVoteBuffer(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.mock_db = MagicMock()
+        self.mock_db.reviews.find_one = AsyncMock(return_value={'_id': 1})
+        self.mock_db.reviews.bulk_write = AsyncMock()
+        self.buffer = HelpfulVoteBuffer()
+        # Buffer rather than write through, as when the background flusher runs
+        self.buffer.running = True
+
+    def written(self):
+        operations = self.mock_db.reviews.bulk_write.await_args.args[0]
+        return {op._filter['id']: op._doc['$inc'] for op in operations}
+
+    async def test_votes_merge_per_review_and_repeat_voters_are_dropped(self):
+        await self.buffer.add(self.mock_db, 'r1', True, user_id='u1')
+        await self.buffer.add(self.mock_db, 'r1', True, user_id='u1')
+        await self.buffer.add(self.mock_db, 'r1', False, user_id='u2')
+        await self.buffer.add(self.mock_db, 'r2', True, user_id='u1')
+
+        self.assertEqual(await self.buffer.flush(self.mock_db), 2)
+        self.assertEqual(self.written(), {
+            'r1': {'helpful_votes': 1, 'total_votes': 2},
+            'r2': {'helpful_votes': 1, 'total_votes': 1}
+        })
+        # Existence lookups are cached per review
+        self.assertEqual(self.mock_db.reviews.find_one.await_count, 2)
+
+    async def test_repeat_vote_counts_after_window(self):
+        self.buffer.dedupe_window = 0
+        await self.buffer.add(self.mock_db, 'r1', True, user_id='u1')
+        await self.buffer.add(self.mock_db, 'r1', True, user_id='u1')
+        await self.buffer.flush(self.mock_db)
+        self.assertEqual(self.written(), {'r1': {'helpful_votes': 2, 'total_votes': 2}})
+
+    async def test_missing_review_is_rejected(self):
+        self.mock_db.reviews.find_one = AsyncMock(return_value=None)
+        self.assertFalse(await self.buffer.add(self.mock_db, 'missing', True, user_id='u1'))
+        self.assertEqual(await self.buffer.flush(self.mock_db), 0)
+
+    async def test_failed_flush_is_requeued(self):
+        """Votes from a failed write are merged back and written by the next flush"""
+        await self.buffer.add(self.mock_db, 'r1', True, user_id='u1')
+        self.mock_db.reviews.bulk_write = AsyncMock(side_effect=Exception("connection reset"))
+        self.assertEqual(await self.buffer.flush(self.mock_db), 0)
+
+        await self.buffer.add(self.mock_db, 'r1', False, user_id='u2')
+        self.mock_db.reviews.bulk_write = AsyncMock()
+        self.assertEqual(await self.buffer.flush(self.mock_db), 1)
+        self.assertEqual(self.written(), {'r1': {'helpful_votes': 1, 'total_votes': 2}})
+
+    async def test_partial_bulk_failure_requeues_only_failed_reviews(self):
+        for review_id in ('r1', 'r2', 'r3'):
+            await self.buffer.add(self.mock_db, review_id, True, user_id='u1')
+        self.mock_db.reviews.bulk_write = AsyncMock(side_effect=BulkWriteError({
+            'writeErrors': [{'index': 1, 'code': 11000, 'errmsg': 'write conflict'}]
+        }))
+        self.assertEqual(await self.buffer.flush(self.mock_db), 2)
+
+        self.mock_db.reviews.bulk_write = AsyncMock()
+        await self.buffer.flush(self.mock_db)
+        self.assertEqual(self.written(), {'r2': {'helpful_votes': 1, 'total_votes': 1}})
+
+    async def test_cancelled_flush_keeps_votes(self):
+        await self.buffer.add(self.mock_db, 'r1', True, user_id='u1')
+        self.mock_db.reviews.bulk_write = AsyncMock(side_effect=asyncio.CancelledError())
+        with self.assertRaises(asyncio.CancelledError):
+            await self.buffer.flush(self.mock_db)
+
+        self.mock_db.reviews.bulk_write = AsyncMock()
+        await self.buffer.flush(self.mock_db)
+        self.assertEqual(self.written(), {'r1': {'helpful_votes': 1, 'total_votes': 1}})
+
+
+if __name__ == "__main__":
+    unittest.main()